@@ -0,0 +1,60 @@
+# FILENAME: fleet.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+"""Compares the per-robot cost of a simulation and kinematics frame for
+Robot objects against RobotFleet, for increasing robot counts. No GL calls
+are made; the object path computes the same link transforms as Robot.render.
+
+Run from the repository root with: python -m benchmarks.fleet [max robots]
+"""
+
+import sys
+import time
+from etgg2801 import Matrix4, RobotFleet, Scara, Viper
+
+def makeRobots(count):
+    # the kinematics never touch the model, so any object will do
+    model = object()
+    return [Scara(model) if i % 2 else Viper(model) for i in range(count)]
+
+def objectFrame(robots, dtime):
+    for r in robots:
+        r.update(dtime)
+        
+        matrix_ow = Matrix4.getTranslation(*r.position.getXYZ()) * Matrix4.getRotation(*r.orientation.getXYZ())
+        for j in r.joints:
+            matrix_ow *= j.getTransformation()
+
+def fleetFrame(fleet, dtime):
+    fleet.update(dtime)
+    fleet.computeTransforms()
+
+def timeFrames(func, arg, frames):
+    start = time.perf_counter()
+    for i in range(frames):
+        func(arg, 10)
+    
+    return (time.perf_counter() - start) / frames
+
+def main(maxRobots=10000):
+    maxRobots = int(maxRobots)
+    
+    print("%8s %14s %14s %8s" % ("robots", "objects us/bot", "fleet us/bot", "speedup"))
+    count = 1
+    while count <= maxRobots:
+        robots = makeRobots(count)
+        fleet = RobotFleet()
+        for r in makeRobots(count):
+            fleet.addRobot(r)
+        fleetFrame(fleet, 10)
+        
+        frames = max(3, 2000 // count)
+        objectTime = timeFrames(objectFrame, robots, max(1, frames // 10))
+        fleetTime = timeFrames(fleetFrame, fleet, frames)
+        
+        print("%8d %14.2f %14.2f %7.1fx" % (count, objectTime / count * 1e6, fleetTime / count * 1e6, objectTime / fleetTime))
+        count *= 10
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,91 @@
+# FILENAME: glcalls.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+"""Counts the GL calls issued per frame by Robot.render and
+Robot.renderMulti for robots with an increasing number of links, and by
+RobotFleet.render and RobotFleet.renderInstanced for an increasing number
+of robots. GL is replaced by a RecordingGL, so no context is needed. Counts
+are for a steady-state frame (the second of two identical frames), and the
+calls GLState elided in it are listed separately.
+
+Run from the repository root with:
+    python -m benchmarks.glcalls [max links] [max robots]
+"""
+
+import sys
+import numpy
+from etgg2801 import Frustum, GLState, Model, ModelPart, RecordingGL, Robot, RevoluteJoint, RobotFleet
+
+def makeModel(numParts):
+    """Returns a Model with numParts one-triangle parts named L0, L1, ...
+    """
+    model = Model()
+    for i in range(numParts):
+        part = ModelPart()
+        part.setName('L%d' % i)
+        part.setData(
+            numpy.array([0, 0, i, 1, 0, i, 0, 1, i], dtype=numpy.float32),
+            numpy.array([3 * i, 3 * i + 1, 3 * i + 2], dtype=numpy.uint32),
+            [], [])
+        model.addPart(part)
+    model.generateNormals()
+    
+    return model
+
+def makeRobot(model, numLinks):
+    robot = Robot(model)
+    for i in range(numLinks - 1):
+        robot.addJoint(RevoluteJoint('L%d' % i, 'L%d' % (i + 1), offset=(0, 0.1, 0)))
+    robot.modelview_loc = 0
+    robot.partTransforms_loc = 1
+    robot.frustum = Frustum()
+    
+    return robot
+
+def countCalls(recorder, func):
+    """Returns (issued, elided) call counts for the second of two calls of
+    func, starting from an unknown GL state.
+    """
+    GLState.reset()
+    func()
+    GLState.beginFrame()
+    recorder.endFrame()
+    func()
+    GLState.beginFrame()
+    
+    return recorder.endFrame()['calls'], sum([e for i, e in GLState.getFrameStats().values()])
+
+def main(maxLinks=12, maxRobots=1000):
+    recorder = RecordingGL(trace=False)
+    recorder.install()
+    
+    print("%6s %16s %16s" % ("links", "render (elided)", "renderMulti (elided)"))
+    for numLinks in range(2, int(maxLinks) + 1, 2):
+        model = makeModel(numLinks)
+        model.loadToVRAM()
+        robot = makeRobot(model, numLinks)
+        
+        renderCalls = countCalls(recorder, robot.render)
+        multiCalls = countCalls(recorder, robot.renderMulti)
+        print("%6d %10d (%3d) %14d (%3d)" % ((numLinks,) + renderCalls + multiCalls))
+    
+    print()
+    print("%6s %16s %16s" % ("robots", "render (elided)", "instanced (elided)"))
+    model = makeModel(4)
+    model.loadToVRAM()
+    numRobots = 1
+    while numRobots <= int(maxRobots):
+        fleet = RobotFleet()
+        fleet.modelview_loc = 0
+        fleet.frustum = Frustum()
+        for i in range(numRobots):
+            fleet.addRobot(makeRobot(model, 4))
+        
+        renderCalls = countCalls(recorder, fleet.render)
+        instancedCalls = countCalls(recorder, fleet.renderInstanced)
+        print("%6d %10d (%3d) %12d (%3d)" % ((numRobots,) + renderCalls + instancedCalls))
+        numRobots *= 10
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
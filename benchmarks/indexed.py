@@ -0,0 +1,39 @@
+# FILENAME: indexed.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+"""Reports the vertex count and buffer sizes uploaded by Model.loadToVRAM
+before (fully de-indexed) and after (welded and indexed) vertex welding.
+
+Run from the repository root with: python -m benchmarks.indexed [file.obj]
+"""
+
+import sys
+import time
+from OpenGL import GL
+from etgg2801 import OBJReader
+
+def main(file='scara.obj'):
+    model = OBJReader.readFile(file)
+    
+    # de-indexed upload: every index gets its own position, uv, and normal
+    vertexCount = model.getNumIndices()
+    deindexedBytes = vertexCount * (3 + 2 + 3) * 4
+    
+    start = time.perf_counter()
+    positions, uvs, normals, indices, drawRanges, lodDrawRanges = model.buildIndexedBuffers()
+    elapsed = time.perf_counter() - start
+    
+    weldedCount = len(positions) // 3
+    weldedBytes = positions.nbytes + uvs.nbytes + normals.nbytes
+    
+    print("file: %s, %d triangles" % (file, vertexCount // 3))
+    print("de-indexed: %8d vertices, %9d bytes" % (vertexCount, deindexedBytes))
+    print("welded:     %8d vertices, %9d bytes + %d index bytes" % (weldedCount, weldedBytes, len(indices)))
+    print("total:      %.1f%% of de-indexed size" % (100.0 * (weldedBytes + len(indices)) / deindexedBytes))
+    print("weld time:  %.3f s" % elapsed)
+    for p, (count, indexType, offset, baseVertex) in zip(model.parts, drawRanges):
+        print("  %-4s %7d indices, %s" % (p.name, count, "uint16" if indexType == GL.GL_UNSIGNED_SHORT else "uint32"))
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,54 @@
+# FILENAME: lod.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+"""Generates the levels of detail of an .obj file's parts (see
+Model.generateLODs) and reports the triangles and error of every level, the
+distance beyond which a level is drawn, and the time taken. With -c the
+levels are stored in the file's mesh cache, so that later
+OBJReader.readFile(file, cache=True, lods=True) calls load them instead of
+simplifying.
+
+Run from the repository root with:
+    python -m benchmarks.lod [-c] [-v height] [file.obj] [ratio ...]
+"""
+
+import argparse
+import time
+from etgg2801 import Frustum, Matrix4, Model, OBJReader
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.lod', description=__doc__.split('\n\n')[0])
+    parser.add_argument('file', nargs='?', default='scara.obj', help=".obj file to simplify (default: scara.obj)")
+    parser.add_argument('ratios', nargs='*', type=float, help="fractions of triangles kept (default: Model.LOD_RATIOS)")
+    parser.add_argument('-c', '--cache', action='store_true', help="store the levels in the mesh cache")
+    parser.add_argument('-v', '--viewport', type=int, default=600, help="viewport height for the distances (default: 600)")
+    args = parser.parse_args(argv)
+    
+    ratios = tuple(args.ratios) or Model.LOD_RATIOS
+    
+    start = time.perf_counter()
+    if args.cache:
+        model = OBJReader.readFile(args.file, cache=True, lods=ratios)
+    else:
+        model = OBJReader.readFile(args.file)
+        model.generateLODs(ratios)
+    elapsed = time.perf_counter() - start
+    
+    # the distance at which an error spans Model.LOD_PIXEL_ERROR pixels
+    # through a 60 degree perspective projection
+    frustum = Frustum(Matrix4.getPerspective(60.0, 1.0, 0.1, 100.0))
+    frustum.viewportHeight = args.viewport
+    pixelsAtUnit = frustum.getPixelsPerUnit([(0.0, 0.0, -1.0)])[0]
+    
+    print("file: %s, ratios: %s" % (args.file, ", ".join(["%g" % r for r in ratios])))
+    print("%-6s %6s %10s %12s %12s" % ("part", "level", "triangles", "error", "drawn from"))
+    for p in model.parts:
+        print("%-6s %6d %10d %12s %12s" % (p.name, 0, p.getNumIndices() // 3, "-", "-"))
+        for k, (indices, error) in enumerate(p.lods):
+            distance = error * pixelsAtUnit / Model.LOD_PIXEL_ERROR
+            print("%-6s %6d %10d %12.6f %12.3f" % (p.name, k + 1, len(indices) // 3, error, distance))
+    print("%s time: %.3f s" % ("load" if args.cache else "simplify", elapsed))
+
+if __name__ == '__main__':
+    main()
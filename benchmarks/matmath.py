@@ -0,0 +1,108 @@
+# FILENAME: matmath.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+"""Micro-benchmarks for Matrix4 multiply, inverse, getCType, and getRotation,
+compared with the previous nested-list implementation (reproduced below as
+ListMatrix4).
+
+Run from the repository root with: python -m benchmarks.matmath
+"""
+
+import timeit
+from ctypes import c_float
+from math import cos, sin, radians
+from etgg2801 import Matrix4
+
+class ListVector4(object):
+    """The subset of the nested-list Vector4 used by ListMatrix4.inverse.
+    """
+    def __init__(self, data):
+        self.data = list(data) + [1,] * (4 - len(data))
+    
+    def __mul__(self, other):
+        return ListVector4([self.data[i] * other for i in range(4)])
+
+class ListMatrix4(object):
+    """The nested-list Matrix4 that preceded the array-backed class.
+    """
+    @staticmethod
+    def getRotation(ax=0.0, ay=0.0, az=0.0):
+        caz = cos(radians(az))
+        saz = sin(radians(az))
+        zm = ListMatrix4(((caz, -saz, 0, 0), (saz, caz, 0, 0), (0, 0, 1, 0), (0, 0, 0, 1)))
+        
+        cay = cos(radians(ay))
+        say = sin(radians(ay))
+        ym = ListMatrix4(((cay, 0, say, 0), (0, 1, 0, 0), (-say, 0, cay, 0), (0, 0, 0, 1)))
+        
+        cax = cos(radians(ax))
+        sax = sin(radians(ax))
+        xm = ListMatrix4(((1, 0, 0, 0), (0, cax, -sax, 0), (0, sax, cax, 0), (0, 0, 0, 1)))
+        
+        return xm * ym * zm
+    
+    def __init__(self, data):
+        self.data = [list(row) for row in data]
+        if len(data) == 3:
+            self.data[0] += [0]
+            self.data[1] += [0]
+            self.data[2] += [0]
+            self.data.append([0, 0, 0, 1])
+    
+    def setPosition(self, pos):
+        for idx in range(3):
+            self.data[idx][3] = pos.data[idx]
+    
+    def inverseRotation(self):
+        return ListMatrix4([[self.data[i][j] for i in range(3)] for j in range(3)])
+    
+    def position(self):
+        return ListVector4([self.data[i][3] for i in range(3)])
+    
+    def inverse(self):
+        invRot = self.inverseRotation()
+        pos = (invRot * self.position()) * -1
+        invRot.setPosition(pos)
+        
+        return invRot
+    
+    def getCType(self):
+        tmparray = (c_float * 16)()
+        for i in range(16):
+            tmparray[i] = self.data[i % 4][i // 4]
+        
+        return tmparray
+    
+    def __mul__(self, other):
+        if isinstance(other, ListVector4):
+            return ListVector4([sum([self.data[j][i] * other.data[i] for i in range(4)]) for j in range(4)])
+        elif isinstance(other, ListMatrix4):
+            return ListMatrix4([[sum([self.data[k][j] * other.data[j][i] for j in range(4)]) for i in range(4)] for k in range(4)])
+
+def perCall(func, number=20000):
+    """Returns the best time per call of func in microseconds.
+    """
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+def main():
+    m = Matrix4.getTranslation(1, 2, 3) * Matrix4.getRotation(10, 20, 30)
+    n = Matrix4.getRotation(30, 20, 10)
+    listM = ListMatrix4(m.data.tolist())
+    listN = ListMatrix4(n.data.tolist())
+    
+    results = [
+        ("mul", perCall(lambda: listM * listN), perCall(lambda: m * n)),
+        ("imul", perCall(lambda: listM * listN), perCall(lambda: m.imul(n))),
+        ("inverse", perCall(lambda: listM.inverse()), perCall(lambda: m.inverse())),
+        ("getCType", perCall(lambda: listM.getCType()), perCall(lambda: m.getCType())),
+        ("rotate1", perCall(lambda: ListMatrix4.getRotation(0, 30, 0)), perCall(lambda: Matrix4.getRotation(0, 30, 0))),
+        ("rotate3", perCall(lambda: ListMatrix4.getRotation(10, 20, 30)), perCall(lambda: Matrix4.getRotation(10, 20, 30))),
+    ]
+    
+    print("%-10s %10s %10s %8s" % ("op", "list (us)", "array (us)", "speedup"))
+    for name, listTime, arrayTime in results:
+        print("%-10s %10.2f %10.2f %7.1fx" % (name, listTime, arrayTime, listTime / arrayTime))
+
+if __name__ == '__main__':
+    main()
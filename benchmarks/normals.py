@@ -0,0 +1,59 @@
+# FILENAME: normals.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+"""Times Model.generateNormals against the original per-triangle Vector4 loop
+for flat normals and for smooth normals with a crease angle.
+
+Run from the repository root with:
+    python -m benchmarks.normals [file.obj] [crease angle]
+"""
+
+import sys
+import time
+import numpy
+from etgg2801 import OBJReader, Vector4
+
+def generateNormalsLoop(model):
+    """The original flat normal generation, one Vector4 triple per triangle.
+    """
+    vertexList = model.getVertexList().tolist()
+    normals = []
+    for i in range(0, len(vertexList), 9):
+        v0 = Vector4(vertexList[i : i + 3])
+        v1 = Vector4(vertexList[i + 3 : i + 6])
+        v2 = Vector4(vertexList[i + 6 : i + 9])
+        
+        u = v1 - v0
+        v = v2 - v1
+        n = u.cross(v).normalize()
+        
+        normals += n.getXYZ() * 3
+    
+    return normals
+
+def main(file='scara.obj', creaseAngle=30.0):
+    creaseAngle = float(creaseAngle)
+    model = OBJReader.readFile(file)
+    
+    start = time.perf_counter()
+    loopNormals = generateNormalsLoop(model)
+    loopTime = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    model.generateNormals()
+    flatTime = time.perf_counter() - start
+    assert numpy.allclose(model.getNormalList(), loopNormals, atol=1e-5)
+    
+    start = time.perf_counter()
+    model.generateNormals(creaseAngle)
+    smoothTime = time.perf_counter() - start
+    assert len(model.getNormalList()) == len(loopNormals)
+    
+    print("file: %s, %d triangles" % (file, model.getNumIndices() // 3))
+    print("Vector4 loop (flat):      %.3f s" % loopTime)
+    print("generateNormals (flat):   %.3f s (%.0fx)" % (flatTime, loopTime / flatTime))
+    print("generateNormals (%g deg): %.3f s (%.0fx)" % (creaseAngle, smoothTime, loopTime / smoothTime))
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,47 @@
+# FILENAME: objreader.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+"""Compares OBJReader.readFile against the line-by-line reader.
+
+Run from the repository root with: python -m benchmarks.objreader [file.obj]
+"""
+
+import sys
+import time
+import numpy
+from etgg2801 import OBJReader
+
+def timeCall(func, *args, repeat=3):
+    """Returns (best time in seconds, last result) over repeat calls.
+    """
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    
+    return best, result
+
+def main(file='scara.obj'):
+    slowTime, slowModel = timeCall(OBJReader.readFileByLine, file)
+    fastTime, fastModel = timeCall(OBJReader.readFile, file)
+    
+    # both readers must produce the same parts
+    assert [p.name for p in slowModel.parts] == [p.name for p in fastModel.parts]
+    for a, b in zip(slowModel.parts, fastModel.parts):
+        assert numpy.allclose(a.vertices, b.vertices)
+        assert numpy.array_equal(a.indices, b.indices)
+        assert numpy.allclose(a.uvs, b.uvs)
+        assert numpy.array_equal(a.uvIndices, b.uvIndices)
+    
+    print("file:", file)
+    print("parts:", fastModel.getNumParts(), "indices:", fastModel.getNumIndices())
+    print("readFileByLine: %.3f s" % slowTime)
+    print("readFile:       %.3f s" % fastTime)
+    print("speedup:        %.1fx" % (slowTime / fastTime))
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
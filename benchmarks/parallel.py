@@ -0,0 +1,42 @@
+# FILENAME: parallel.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+"""Reports the scaling of OBJReader.readPartsParallel from 1 to N worker
+processes and checks its output against the serial reader.
+
+Run from the repository root with:
+    python -m benchmarks.parallel [file.obj] [max workers]
+"""
+
+import os
+import sys
+import time
+import numpy
+from etgg2801 import OBJReader
+
+def main(file='scara.obj', maxWorkers=None):
+    maxWorkers = int(maxWorkers or os.cpu_count() or 1)
+    
+    start = time.perf_counter()
+    serial = list(OBJReader.iterParts(file))
+    serialTime = time.perf_counter() - start
+    
+    print("file: %s (%d MB)" % (file, os.path.getsize(file) // 2 ** 20))
+    print("serial:     %.3f s" % serialTime)
+    for workers in range(1, maxWorkers + 1):
+        start = time.perf_counter()
+        parts = OBJReader.readPartsParallel(file, workers)
+        elapsed = time.perf_counter() - start
+        
+        assert [p.name for p in parts] == [p.name for p in serial]
+        for a, b in zip(parts, serial):
+            assert numpy.array_equal(a.vertices, b.vertices)
+            assert numpy.array_equal(a.indices, b.indices)
+            assert numpy.array_equal(a.uvs, b.uvs)
+            assert numpy.array_equal(a.uvIndices, b.uvIndices)
+        
+        print("%2d workers: %.3f s (%.2fx)" % (workers, elapsed, serialTime / elapsed))
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,96 @@
+# FILENAME: streaming.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+"""Checks that OBJReader.iterParts keeps peak memory bounded by the largest
+part, using a synthetic .obj file made of many equally sized parts.
+
+Run from the repository root with:
+    python -m benchmarks.streaming [size in MB] [part size in MB]
+The defaults write a 2048 MB file of 16 MB parts to the temp directory.
+"""
+
+import os
+import resource
+import sys
+import tempfile
+import time
+from etgg2801 import OBJReader
+
+def writeSyntheticOBJ(file, size, partSize):
+    """Writes an .obj file of roughly size bytes split into parts of roughly
+    partSize bytes. Each part is a strip of triangles.
+    """
+    row = b'v 0.123456 0.654321 0.333333\nv 0.223456 0.654321 0.333333\n'
+    numVertices = 0
+    written = 0
+    partNum = 0
+    with open(file, 'wb') as fp:
+        while written < size:
+            lines = [b'o part%d\n' % partNum]
+            first = numVertices + 1
+            partBytes = 0
+            while partBytes < partSize:
+                lines.append(row)
+                partBytes += len(row)
+                numVertices += 2
+            for i in range(first, numVertices - 1):
+                face = b'f %d %d %d\n' % (i, i + 1, i + 2)
+                lines.append(face)
+                partBytes += len(face)
+            
+            chunk = b''.join(lines)
+            fp.write(chunk)
+            written += len(chunk)
+            partNum += 1
+
+def peakRSS():
+    """Returns the peak resident set size of this process in bytes.
+    """
+    # on Linux, ru_maxrss carries over the parent's peak through fork and
+    # exec, while VmHWM only covers this process's own address space
+    try:
+        with open('/proc/self/status') as fp:
+            for line in fp:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def main(size=2048, partSize=16):
+    size = int(size) * 2 ** 20
+    partSize = int(partSize) * 2 ** 20
+    
+    fd, file = tempfile.mkstemp(suffix='.obj')
+    os.close(fd)
+    try:
+        writeSyntheticOBJ(file, size, partSize)
+        fileSize = os.path.getsize(file)
+        
+        baseline = peakRSS()
+        start = time.perf_counter()
+        numParts = 0
+        largestPart = 0
+        for part in OBJReader.iterParts(file):
+            numParts += 1
+            largestPart = max(largestPart, part.vertices.nbytes + part.indices.nbytes)
+        elapsed = time.perf_counter() - start
+        growth = peakRSS() - baseline
+    finally:
+        os.remove(file)
+    
+    print("file size:       %d MB" % (fileSize // 2 ** 20))
+    print("parts:           %d" % numParts)
+    print("time:            %.2f s" % elapsed)
+    print("peak RSS growth: %d MB" % (growth // 2 ** 20))
+    
+    # parsing a part holds its text, its tokens, and its arrays at once, so
+    # allow a generous constant factor of the raw part size
+    limit = 16 * partSize
+    assert growth < limit, "peak memory %d exceeds bound %d" % (growth, limit)
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,291 @@
+# FILENAME: suite.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+"""Times the hot paths of loading, math, kinematics, and render submission
+without a GPU (GL is replaced by a RecordingGL), writes the results as
+JSON, and compares them against stored baselines.
+
+The GL submission of a steady-state frame of each render path is the hard
+gate: it regresses if any of its counts (calls, draws, state changes,
+uniform uploads, bytes) grows past the committed baseline
+(benchmarks/baseline.json). The counts do not depend on the machine.
+
+Timings only compare meaningfully on the same machine, so they are kept
+in a separate, uncommitted per-machine file (--save-timings) and compared
+only when it was saved in the same environment. A benchmark whose best
+time per call is more than threshold (a fraction) slower is reported, but
+only fails the run with --strict-timings. The exit status is 1 if anything
+failed.
+
+Run from the repository root with:
+    python -m benchmarks.suite [-o results.json] [-b baseline.json]
+                               [--timings timings.json] [-t threshold]
+                               [-k name] [--save-baseline] [--save-timings]
+                               [--strict-timings]
+
+Save the timings (--save-timings) before making changes and compare
+against them after. Update the committed baseline (--save-baseline) when
+a change is meant to alter the submission counts.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+import numpy
+from etgg2801 import Frustum, GLState, Matrix4, OBJReader, RecordingGL, RobotFleet, Scara, Vector4
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+TIMINGS = 'benchmark_timings.json'
+SUBMISSION_COUNTS = ('calls', 'draws', 'stateChanges', 'uniformUploads', 'uniformBytes', 'bufferBytes')
+
+def getBenchmarks(file):
+    """Returns [(name, setup)], where setup() returns the function to time.
+    Setting up is not timed.
+    """
+    def readFile():
+        return lambda: OBJReader.readFile(file)
+    
+    def generateNormals():
+        model = OBJReader.readFile(file)
+        return model.generateNormals
+    
+    def getVertexList():
+        model = OBJReader.readFile(file)
+        return model.getVertexList
+    
+    def matrixMul():
+        m = Matrix4.getTranslation(1, 2, 3) * Matrix4.getRotation(10, 20, 30)
+        n = Matrix4.getRotation(30, 20, 10)
+        return lambda: m * n
+    
+    def matrixInverse():
+        m = Matrix4.getTranslation(1, 2, 3) * Matrix4.getRotation(10, 20, 30)
+        return m.inverse
+    
+    def matrixGetCType():
+        m = Matrix4.getTranslation(1, 2, 3) * Matrix4.getRotation(10, 20, 30)
+        return m.getCType
+    
+    def robotUpdate():
+        robot = Scara(object())
+        return lambda: robot.update(10)
+    
+    def robotRender():
+        model = OBJReader.readFile(file)
+        model.loadToVRAM()
+        robot = Scara(model)
+        robot.modelview_loc = 0
+        robot.frustum = Frustum()
+        GLState.reset()
+        
+        def render():
+            robot.update(10)
+            robot.render()
+        
+        return render
+    
+    return [
+        ('OBJReader.readFile', readFile),
+        ('Model.generateNormals', generateNormals),
+        ('Model.getVertexList', getVertexList),
+        ('Matrix4.__mul__', matrixMul),
+        ('Matrix4.inverse', matrixInverse),
+        ('Matrix4.getCType', matrixGetCType),
+        ('Robot.update', robotUpdate),
+        ('Robot.update+render', robotRender),
+    ]
+
+def timeFunction(func, repeat):
+    """Returns {best, median, number, repeat}: the best and median seconds
+    per call over repeat runs of number calls, with number chosen so each
+    run takes at least 0.2 seconds.
+    """
+    timer = timeit.Timer(func)
+    number = timer.autorange()[0]
+    times = numpy.array(timer.repeat(repeat=repeat, number=number)) / number
+    
+    return {
+        'best': float(times.min()),
+        'median': float(numpy.median(times)),
+        'number': number,
+        'repeat': repeat}
+
+def runBenchmarks(file, repeat=5, pattern=None):
+    """Returns {name: timing (see timeFunction)} for every benchmark whose
+    name contains pattern.
+    """
+    recorder = RecordingGL(trace=False)
+    recorder.install()
+    try:
+        results = {}
+        for name, setup in getBenchmarks(file):
+            if pattern and pattern not in name:
+                continue
+            results[name] = timeFunction(setup(), repeat)
+    finally:
+        recorder.uninstall()
+    
+    return results
+
+def recordSubmission(file):
+    """Returns {render path: frame statistics (see
+    RecordingGL.getFrameStats)} for the second of two identical frames of
+    a Scara robot, a fleet of ten, and a 10 x 10 grid of robots seen through
+    a perspective frustum that culls about half of their links.
+    """
+    recorder = RecordingGL(trace=False)
+    recorder.install()
+    try:
+        model = OBJReader.readFile(file)
+        model.loadToVRAM()
+        robot = Scara(model)
+        robot.modelview_loc = 0
+        robot.partTransforms_loc = 1
+        robot.frustum = Frustum()
+        fleet = RobotFleet()
+        fleet.modelview_loc = 0
+        fleet.frustum = Frustum()
+        for i in range(10):
+            fleet.addRobot(Scara(model))
+        
+        grid = RobotFleet()
+        grid.modelview_loc = 0
+        grid.frustum = Frustum(Matrix4.getPerspective(60.0, 1.0, 0.1, 50.0))
+        for i in range(100):
+            r = Scara(model)
+            r.position = Vector4((i % 10 * 4.0 - 18.0, -1.0, i // 10 * -4.0 - 2.0))
+            grid.addRobot(r)
+        
+        results = {}
+        for name, render in (
+                ('Robot.render', robot.render),
+                ('Robot.renderMulti', robot.renderMulti),
+                ('RobotFleet.render', fleet.render),
+                ('RobotFleet.renderInstanced', fleet.renderInstanced),
+                ('RobotFleet.render culled', grid.render),
+                ('RobotFleet.renderInstanced culled', grid.renderInstanced)):
+            GLState.reset()
+            render()
+            recorder.endFrame()
+            render()
+            stats = recorder.endFrame()
+            results[name] = dict([(key, stats[key]) for key in SUBMISSION_COUNTS])
+            results[name]['byName'] = dict(stats['byName'])
+    finally:
+        recorder.uninstall()
+    
+    return results
+
+def compare(results, baseline, threshold):
+    """Returns [(name, current, baseline, ratio, regressed)] for every
+    benchmark in both results and baseline, comparing best times.
+    """
+    rows = []
+    for name, entry in results.items():
+        if name not in baseline:
+            continue
+        
+        ratio = entry['best'] / baseline[name]['best']
+        rows.append((name, entry['best'], baseline[name]['best'], ratio, ratio > 1.0 + threshold))
+    
+    return rows
+
+def getEnvironment():
+    return {
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'system': platform.platform()}
+
+def loadJSON(file):
+    """Returns the document stored in file, or {} if there is none.
+    """
+    if not os.path.exists(file):
+        return {}
+    
+    with open(file) as fp:
+        return json.load(fp)
+
+def saveJSON(file, document):
+    with open(file, 'w') as fp:
+        json.dump(document, fp, indent=2)
+        fp.write('\n')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.suite', description=__doc__.split('\n\n')[0])
+    parser.add_argument('-f', '--file', default='scara.obj', help=".obj file to load (default: scara.obj)")
+    parser.add_argument('-o', '--output', default='benchmark_results.json', help="results file to write")
+    parser.add_argument('-b', '--baseline', default=BASELINE, help="submission baseline to compare against")
+    parser.add_argument('--timings', default=TIMINGS, help="this machine's timings to compare against (default: %s)" % TIMINGS)
+    parser.add_argument('-t', '--threshold', type=float, default=0.10, help="allowed slowdown as a fraction (default: 0.10)")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="timed runs per benchmark (default: 5)")
+    parser.add_argument('-k', dest='pattern', help="only run benchmarks whose name contains this")
+    parser.add_argument('--save-baseline', action='store_true', help="store the submission counts as the new baseline")
+    parser.add_argument('--save-timings', action='store_true', help="store the timings as this machine's new timings")
+    parser.add_argument('--strict-timings', action='store_true', help="fail when a timing regresses")
+    args = parser.parse_args(argv)
+    
+    environment = getEnvironment()
+    results = runBenchmarks(args.file, args.repeat, args.pattern)
+    submission = recordSubmission(args.file)
+    saveJSON(args.output, {'environment': environment, 'file': args.file, 'benchmarks': results, 'submission': submission})
+    
+    # compare against the previous baselines, even when replacing them
+    baselineSubmission = loadJSON(args.baseline).get('submission', {})
+    timings = loadJSON(args.timings)
+    baseline = {}
+    if timings.get('environment') == environment:
+        baseline = timings['benchmarks']
+    elif timings:
+        print("timings in %s come from another environment, not compared" % args.timings)
+    
+    if args.save_baseline:
+        saveJSON(args.baseline, {'file': args.file, 'submission': submission})
+        print("baseline saved to", args.baseline)
+    if args.save_timings:
+        saveJSON(args.timings, {'environment': environment, 'file': args.file, 'benchmarks': results})
+        print("timings saved to", args.timings)
+    
+    rows = dict([(row[0], row) for row in compare(results, baseline, args.threshold)])
+    print("%-24s %12s %12s %12s" % ("benchmark", "best (us)", "median (us)", "vs timings"))
+    for name, entry in results.items():
+        change = ""
+        if name in rows:
+            change = "%+.1f%%%s" % ((rows[name][3] - 1.0) * 100.0, " SLOWER" if rows[name][4] else "")
+        print("%-24s %12.2f %12.2f %12s" % (name, entry['best'] * 1e6, entry['median'] * 1e6, change))
+    
+    slower = [row[0] for row in rows.values() if row[4]]
+    regressions = []
+    print()
+    print("%-36s" % "submission per frame" + "".join(["%15s" % key for key in SUBMISSION_COUNTS]))
+    for name, counts in submission.items():
+        line = "%-36s" % name
+        for key in SUBMISSION_COUNTS:
+            previous = baselineSubmission.get(name, {}).get(key)
+            if previous is not None and counts[key] > previous:
+                regressions.append("%s %s" % (name, key))
+                line += "%15s" % ("%d (was %d)" % (counts[key], previous))
+            else:
+                line += "%15d" % counts[key]
+        print(line)
+    print("results written to", args.output)
+    
+    if slower:
+        print("%d benchmark(s) more than %.0f%% slower than this machine's timings%s: %s" % (
+            len(slower), args.threshold * 100.0, "" if args.strict_timings else " (advisory)", ", ".join(slower)))
+        if args.strict_timings:
+            regressions.extend(slower)
+    
+    if regressions:
+        print("%d regression(s): %s" % (len(regressions), ", ".join(regressions)))
+        return 1
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,13 @@
 from .glwindow import *
+from .glstate import *
 from .matmath import *
+from .meshcache import *
 from .model import *
-from .robot import *
\ No newline at end of file
+from .robot import *
+from .fleet import *
+from .shader import *
+from .texture import *
+from .profiler import *
+from .simulation import *
+from .glrecorder import *
+from .simplify import *
\ No newline at end of file
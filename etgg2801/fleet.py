@@ -0,0 +1,249 @@
+# FILENAME: fleet.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+import numpy
+from OpenGL import GL
+from . import GLWindow, Matrix4Array
+from .glstate import GLState
+from .robot import RevoluteJoint
+
+class RobotFleet(object):
+    """Simulates and renders many robots at once. Robots added to a fleet are
+    grouped by joint layout (robot class, model, and joints), and each group
+    keeps its joint values, velocities, limits, and link transforms in NumPy
+    arrays so that update and computeTransforms run once per group instead
+    of once per joint.
+    
+    After a robot is added, the fleet owns its joint state: call
+    syncToRobots to copy the state back to the Robot and Joint objects.
+    
+    Both render methods skip the links whose bounds are outside the
+    window's frustum (see GLWindow.frustum). render also draws each link at
+    the level of detail its distance allows (see Model.selectLevels);
+    renderInstanced always draws the full parts.
+    """
+    def __init__(self):
+        self.groups = {}
+        self.modelview_loc = None
+        self.frustum = None
+    
+    def addRobot(self, robot):
+        """Adds a robot, copying its position, orientation, and joint state.
+        Returns (group, index) locating the robot in the fleet.
+        """
+        key = FleetGroup.getLayoutKey(robot)
+        group = self.groups.get(key)
+        if group is None:
+            group = FleetGroup(robot)
+            self.groups[key] = group
+        
+        return group, group.addRobot(robot)
+    
+    def getNumRobots(self):
+        return sum([len(g.robots) for g in self.groups.values()])
+    
+    def cleanup(self):
+        # several groups can share a model, which must be cleaned up once
+        models = {}
+        for g in self.groups.values():
+            g.cleanup()
+            models[id(g.model)] = g.model
+        for model in models.values():
+            model.cleanup()
+    
+    def update(self, dtime):
+        for g in self.groups.values():
+            g.update(dtime)
+    
+    def computeTransforms(self):
+        """Computes the object to world transform of every link of every robot.
+        """
+        for g in self.groups.values():
+            g.computeTransforms()
+    
+    def syncToRobots(self):
+        """Copies the fleet's joint values and directions back to the Robot
+        and Joint objects.
+        """
+        for g in self.groups.values():
+            g.syncToRobots()
+    
+    def render(self):
+        if self.modelview_loc is None:
+            self.modelview_loc = GLWindow.getInstance().renderDelegate.modelview_loc
+        if self.frustum is None:
+            self.frustum = GLWindow.getInstance().frustum
+        
+        self.computeTransforms()
+        for g in self.groups.values():
+            g.render(self.modelview_loc, self.frustum)
+    
+    def renderInstanced(self):
+        """Renders every group with hardware instancing: each group streams
+        its link transforms into one instance buffer and draws each part once
+        for all of its robots (see Model.renderPartsInstanced). The number of
+        GL calls depends on the number of parts, not robots.
+        """
+        if self.frustum is None:
+            self.frustum = GLWindow.getInstance().frustum
+        
+        self.computeTransforms()
+        for g in self.groups.values():
+            g.renderInstanced(self.frustum)
+
+class FleetGroup(object):
+    """The robots of a fleet that share a joint layout, stored as arrays with
+    one row per robot and one column per joint.
+    """
+    @staticmethod
+    def getLayoutKey(robot):
+        return (type(robot), id(robot.model), tuple([
+            (type(j), j.partA, j.partB, tuple(j.axis), tuple(j.offset)) for j in robot.joints]))
+    
+    def __init__(self, robot):
+        joints = robot.joints
+        self.model = robot.model
+        self.parts = [joints[0].partA] + [j.partB for j in joints]
+        self.revolute = [isinstance(j, RevoluteJoint) for j in joints]
+        self.axes = numpy.array([j.axis for j in joints], dtype=numpy.float64)
+        self.offsets = numpy.array([j.offset for j in joints], dtype=numpy.float64)
+        
+        self.robots = []
+        self.dirty = True
+        self.instanceBuffer = None
+    
+    def addRobot(self, robot):
+        # keep the state already simulated for the group's other robots
+        if not self.dirty:
+            self.syncToRobots()
+        
+        self.robots.append(robot)
+        self.dirty = True
+        
+        return len(self.robots) - 1
+    
+    def build(self):
+        """(Re)creates the state arrays from the group's Robot objects.
+        """
+        joints = [r.joints for r in self.robots]
+        self.values = numpy.array([[j.value for j in js] for js in joints], dtype=numpy.float64)
+        self.velocities = numpy.array([[j.velocity for j in js] for js in joints], dtype=numpy.float64)
+        self.valueMins = numpy.array([[j.valueMin for j in js] for js in joints], dtype=numpy.float64)
+        self.valueMaxs = numpy.array([[j.valueMax for j in js] for js in joints], dtype=numpy.float64)
+        self.directions = numpy.array([[1.0 if j.dfunc == j.increaseValue else -1.0 for j in js] for js in joints])
+        self.positions = numpy.array([r.position.getXYZ() for r in self.robots], dtype=numpy.float64)
+        self.orientations = numpy.array([r.orientation.getXYZ() for r in self.robots], dtype=numpy.float64)
+        
+        # transforms holds each robot's links back to back, so that one
+        # robot's link transforms are contiguous
+        self.transforms = Matrix4Array(len(self.robots) * len(self.parts))
+        self.linkData = self.transforms.getBuffer().reshape(len(self.robots), len(self.parts), 4, 4).transpose(0, 1, 3, 2)
+        
+        self.dirty = False
+    
+    def update(self, dtime):
+        """Advances every joint like Joint.increaseValue/decreaseValue: values
+        move toward a limit and reverse direction on reaching it.
+        """
+        if self.dirty:
+            self.build()
+        
+        values = self.values + self.directions * self.velocities * dtime
+        numpy.clip(values, self.valueMins, self.valueMaxs, out=self.values)
+        
+        self.directions[(self.directions > 0) & (self.values == self.valueMaxs)] = -1.0
+        self.directions[(self.directions < 0) & (self.values == self.valueMins)] = 1.0
+    
+    def computeTransforms(self):
+        if self.dirty:
+            self.build()
+        
+        base = Matrix4Array.getTranslation(*self.positions.T) * Matrix4Array.getRotation(*self.orientations.T)
+        self.linkData[:, 0] = base.data
+        
+        for k in range(len(self.revolute)):
+            if self.revolute[k]:
+                local = Matrix4Array.getTranslationRotation(self.offsets[k], self.axes[k], self.values[:, k])
+            else:
+                offsets = self.offsets[k] + self.axes[k] * self.values[:, k, numpy.newaxis]
+                local = Matrix4Array.getTranslation(*offsets.T)
+            
+            numpy.matmul(self.linkData[:, k], local.data, out=self.linkData[:, k + 1])
+    
+    def syncToRobots(self):
+        if self.dirty:
+            return
+        
+        for r, values, directions in zip(self.robots, self.values.tolist(), self.directions.tolist()):
+            for j, value, direction in zip(r.joints, values, directions):
+                j.value = value
+                j.dfunc = j.increaseValue if direction > 0 else j.decreaseValue
+    
+    def cleanup(self):
+        """Deletes the group's instance buffer. The model is left to
+        RobotFleet.cleanup, since other groups may share it.
+        """
+        if self.instanceBuffer is not None:
+            GLState.deleteBuffer(self.instanceBuffer)
+            self.instanceBuffer = None
+    
+    def cull(self, frustum):
+        """Returns a (robots, parts) boolean array telling which links are at
+        least partly inside the frustum.
+        """
+        centers, extents, radii = self.model.getPartBounds(self.parts)
+        numRobots = len(self.robots)
+        visible = numpy.empty((numRobots, len(self.parts)), dtype=bool)
+        for k in range(len(self.parts)):
+            visible[:, k] = frustum.testBounds(
+                self.linkData[:, k],
+                numpy.broadcast_to(centers[k], (numRobots, 3)),
+                numpy.broadcast_to(extents[k], (numRobots, 3)),
+                numpy.broadcast_to(radii[k], (numRobots,)))
+        
+        return visible
+    
+    def renderInstanced(self, frustum=None):
+        if self.instanceBuffer is None:
+            self.instanceBuffer = GL.glGenBuffers(1)
+        
+        matrixSize = 16 * 4
+        numParts = len(self.parts)
+        if frustum is not None and frustum.isEnabled():
+            # the visible transforms of each part back to back
+            visible = self.cull(frustum)
+            counts = visible.sum(axis=0)
+            if not counts.any():
+                return
+            buffer = self.transforms.getBuffer().reshape(len(self.robots), numParts, 16).transpose(1, 0, 2)[visible.T]
+            offsets = ((numpy.cumsum(counts) - counts) * matrixSize).tolist()
+            stride = matrixSize
+        else:
+            # robot i's link k is matrix i * numParts + k of the buffer
+            buffer = self.transforms.getBuffer()
+            counts = len(self.robots)
+            offsets = [k * matrixSize for k in range(numParts)]
+            stride = numParts * matrixSize
+        
+        # respecify the whole buffer each frame so the driver can orphan the
+        # storage still in use by the previous frame
+        GLState.bindBuffer(GL.GL_ARRAY_BUFFER, self.instanceBuffer)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, buffer.nbytes, buffer, GL.GL_STREAM_DRAW)
+        
+        self.model.renderPartsInstanced(self.parts, counts, self.instanceBuffer, stride, offsets)
+    
+    def render(self, modelview_loc, frustum=None):
+        buffer = self.transforms.getBuffer()
+        numParts = len(self.parts)
+        if frustum is None or not frustum.isEnabled():
+            for i in range(len(self.robots)):
+                self.model.renderParts(self.parts, modelview_loc, buffer[i * numParts:(i + 1) * numParts])
+            return
+        
+        visible = self.cull(frustum)
+        levels = self.model.selectLevels(self.parts, self.linkData, frustum)
+        for i in numpy.flatnonzero(visible.any(axis=1)).tolist():
+            links = numpy.flatnonzero(visible[i])
+            self.model.renderParts([self.parts[k] for k in links], modelview_loc, buffer[i * numParts + links],
+                                   None if levels is None else levels[i, links].tolist())
@@ -0,0 +1,342 @@
+# FILENAME: glrecorder.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+import base64
+import collections
+import ctypes
+import gzip
+import json
+import numpy
+from OpenGL import GL
+from OpenGL.GL.KHR import parallel_shader_compile as KHRParallel
+
+class RecordingGL(object):
+    """Stands in for OpenGL.GL, recording every gl* call with its arguments
+    and the number of bytes of data they pass, and keeping statistics per
+    frame (see endFrame). Constants come from the real module.
+    
+    With gl=None (the default) calls go nowhere: the recorder returns
+    plausible results (new names from glGen*, successful compile and link
+    status, ...), so that code can run without an OpenGL context. Given a
+    module (OpenGL.GL), calls are recorded and then forwarded to it.
+    
+    install makes the etgg2801 modules call the recorder instead of GL;
+    GLWindow does that itself when given a recorder (or when the
+    ETGG2801_GL environment variable is "record") and ends a frame on every
+    swap.
+    
+    If trace is True the calls are kept (with copies of their array data if
+    keepData is True) and can be saved, loaded, and replayed into another
+    GL. Otherwise only the statistics are kept.
+    """
+    VERSION = 1
+    
+    DRAW_PREFIXES = ('glDraw', 'glMultiDraw')
+    STATE_PREFIXES = (
+        'glBind', 'glUseProgram', 'glActiveTexture', 'glEnable', 'glDisable', 'glBlend', 'glDepth',
+        'glCullFace', 'glViewport', 'glPixelStore', 'glVertexAttrib', 'glTexParameter', 'glClearColor')
+    UNIFORM_PREFIXES = ('glUniform', 'glProgramUniform')
+    UPLOAD_PREFIXES = ('glBufferData', 'glBufferSubData', 'glTexImage', 'glTexSubImage', 'glCompressedTex')
+    
+    # the status queries a mock program or shader always passes
+    STATUS_QUERIES = (GL.GL_COMPILE_STATUS, GL.GL_LINK_STATUS, KHRParallel.GL_COMPLETION_STATUS_KHR)
+    
+    @staticmethod
+    def load(file):
+        """Returns the trace saved in file (see save).
+        """
+        opener = gzip.open if file.endswith('.gz') else open
+        with opener(file, 'rt') as fp:
+            trace = json.load(fp)
+        
+        if trace.get('version') != RecordingGL.VERSION:
+            raise Exception("Unsupported GL trace version: %s" % trace.get('version'))
+        
+        return trace
+    
+    @staticmethod
+    def replay(trace, gl):
+        """Issues the calls of a loaded trace to gl (a RecordingGL or, with a
+        current context, OpenGL.GL), ending a frame wherever the recording
+        did, the last one included, if gl is a RecordingGL. Arrays recorded
+        without their data are replayed as zeros. Object names are passed as
+        recorded, which match the ones a fresh context hands out since both
+        allocate in order.
+        """
+        frame = 0
+        for callFrame, name, args, numBytes in trace['calls']:
+            while frame < callFrame:
+                if isinstance(gl, RecordingGL):
+                    gl.endFrame()
+                frame += 1
+            getattr(gl, name)(*[_decodeArgument(a) for a in args])
+        
+        # end the last frame, and any empty ones after it, as well
+        if isinstance(gl, RecordingGL):
+            while frame < len(trace['frames']):
+                gl.endFrame()
+                frame += 1
+    
+    def __init__(self, gl=None, trace=True, keepData=False):
+        self.gl = gl
+        self.trace = trace
+        self.keepData = keepData
+        self.calls = []
+        self.frames = []
+        self.frame = self.__newFrame()
+        self.installed = None
+        
+        self.names = collections.Counter()
+        self.locations = {}
+    
+    def __getattr__(self, name):
+        if not name.startswith('gl'):
+            return getattr(GL, name)
+        
+        function = self.wrap(name, self.gl)
+        setattr(self, name, function)
+        return function
+    
+    def wrap(self, name, module):
+        """Returns a function that records a call of name and then calls
+        name in module (or, if module is None, returns a mock result).
+        """
+        category = self.__getCategory(name)
+        target = None if module is None else getattr(module, name)
+        
+        def call(*args):
+            numBytes = sum([_getByteCount(a) for a in args])
+            self.__count(name, category, numBytes)
+            if self.trace:
+                self.calls.append((len(self.frames), name, [_encodeArgument(a, self.keepData) for a in args], numBytes))
+            
+            if target is None:
+                return self.__mockResult(name, args)
+            return target(*args)
+        
+        return call
+    
+    def install(self):
+        """Makes the etgg2801 modules call the recorder instead of GL (and
+        the raw compressed texture functions) until uninstall is called.
+        """
+        from . import fleet, glstate, glwindow, model, shader, texture
+        
+        if self.installed is not None:
+            return
+        
+        self.installed = []
+        for module in (fleet, glstate, glwindow, model, shader, texture):
+            self.installed.append((module, 'GL', module.GL))
+            module.GL = self
+        self.installed.append((texture, 'RawGL13', texture.RawGL13))
+        texture.RawGL13 = _RecordingModule(self, None if self.gl is None else texture.RawGL13)
+        
+        # the extension queries would need a real context
+        if self.gl is None:
+            self.installed.append((shader.ShaderProgram, 'parallelCompile', shader.ShaderProgram.parallelCompile))
+            shader.ShaderProgram.parallelCompile = False
+    
+    def uninstall(self):
+        if self.installed is None:
+            return
+        
+        for owner, name, value in reversed(self.installed):
+            setattr(owner, name, value)
+        self.installed = None
+    
+    def endFrame(self):
+        """Finishes the current frame and returns its statistics (see
+        getFrameStats).
+        """
+        stats = self.frame
+        self.frames.append(stats)
+        self.frame = self.__newFrame()
+        
+        return stats
+    
+    def getFrameStats(self, frame=-1):
+        """Returns the statistics of a finished frame (the last by default):
+        a dictionary of the number of calls, draws (glDraw*, glMultiDraw*),
+        stateChanges (binds and other state setting), uniformUploads,
+        uniformBytes, bufferBytes (buffer and texture data uploaded), and
+        byName, a Counter of the calls of each function.
+        """
+        return self.frames[frame]
+    
+    def reset(self):
+        """Forgets the recorded calls and frames.
+        """
+        self.calls = []
+        self.frames = []
+        self.frame = self.__newFrame()
+    
+    def save(self, file):
+        """Writes the recorded calls and frame statistics as JSON (gzipped if
+        file ends with .gz). The current, unfinished frame is not included.
+        """
+        if not self.trace:
+            raise Exception("RecordingGL created without trace cannot save!")
+        
+        numCalls = sum([f['calls'] for f in self.frames])
+        trace = {
+            'version': RecordingGL.VERSION,
+            'frames': self.frames,
+            'calls': self.calls[:numCalls]}
+        
+        opener = gzip.open if file.endswith('.gz') else open
+        with opener(file, 'wt') as fp:
+            json.dump(trace, fp, default=_encodeBytes)
+    
+    def __newFrame(self):
+        return {
+            'calls': 0,
+            'draws': 0,
+            'stateChanges': 0,
+            'uniformUploads': 0,
+            'uniformBytes': 0,
+            'bufferBytes': 0,
+            'byName': collections.Counter()}
+    
+    def __getCategory(self, name):
+        for category, prefixes in (
+                ('draws', RecordingGL.DRAW_PREFIXES),
+                ('stateChanges', RecordingGL.STATE_PREFIXES),
+                ('uniformUploads', RecordingGL.UNIFORM_PREFIXES),
+                ('bufferBytes', RecordingGL.UPLOAD_PREFIXES)):
+            if name.startswith(prefixes):
+                return category
+        
+        return None
+    
+    def __count(self, name, category, numBytes):
+        frame = self.frame
+        frame['calls'] += 1
+        frame['byName'][name] += 1
+        if category == 'uniformUploads':
+            frame['uniformUploads'] += 1
+            frame['uniformBytes'] += numBytes
+        elif category == 'bufferBytes':
+            frame['bufferBytes'] += numBytes
+        elif category is not None:
+            frame[category] += 1
+    
+    def __mockResult(self, name, args):
+        if name.startswith('glGen'):
+            # each kind of object has its own names, starting at 1
+            count = args[0] if args else 1
+            first = self.names[name] + 1
+            self.names[name] += count
+            return first if count == 1 else numpy.arange(first, first + count, dtype=numpy.uint32)
+        elif name in ('glCreateProgram', 'glCreateShader'):
+            self.names['program'] += 1
+            return self.names['program']
+        elif name in ('glGetUniformLocation', 'glGetAttribLocation'):
+            key = (name,) + tuple(args)
+            if key not in self.locations:
+                self.locations[key] = len([k for k in self.locations if k[:2] == key[:2]])
+            return self.locations[key]
+        elif name in ('glGetProgramiv', 'glGetShaderiv'):
+            return GL.GL_TRUE if args[1] in RecordingGL.STATUS_QUERIES else 0
+        elif name in ('glGetProgramInfoLog', 'glGetShaderInfoLog'):
+            return b''
+        elif name == 'glGetString':
+            return b'RecordingGL'
+        elif name == 'glReadPixels':
+            return bytes(args[2] * args[3] * 4)
+        elif name.startswith('glGet'):
+            return 0
+        
+        return None
+
+class _RecordingModule(object):
+    """Records calls to the gl* functions of another module (such as the raw
+    entry points) into a RecordingGL.
+    """
+    def __init__(self, recorder, module):
+        self.recorder = recorder
+        self.module = module
+    
+    def __getattr__(self, name):
+        if not name.startswith('gl'):
+            return getattr(GL, name)
+        
+        function = self.recorder.wrap(name, self.module)
+        setattr(self, name, function)
+        return function
+
+# longer byte strings, or ones that are not printable text, are data (e.g.
+# index blocks) and only kept with keepData
+_MAX_TEXT_BYTES = 1 << 16
+_TEXT_CHARACTERS = bytes(range(32, 127)) + b'\t\n\r\f\v'
+
+def _getByteCount(arg):
+    """Returns the number of bytes of data arg passes to GL (0 for scalars
+    and pointers).
+    """
+    if isinstance(arg, numpy.ndarray):
+        return arg.nbytes
+    elif isinstance(arg, (bytes, bytearray)):
+        return len(arg)
+    elif isinstance(arg, memoryview):
+        return arg.nbytes
+    elif isinstance(arg, ctypes.Array):
+        return ctypes.sizeof(arg)
+    
+    return 0
+
+def _encodeArgument(arg, keepData):
+    """Returns a JSON compatible copy of a call argument. Short text byte
+    strings (names, sources) become {'bytes'}, other byte strings and arrays
+    {'array': bytes or None, 'dtype', 'shape'}, pointers {'pointer'}, and
+    arrays of pointers (such as multi-draw offsets) {'pointers'}.
+    """
+    if arg is None or isinstance(arg, (bool, int, float, str)):
+        return arg
+    elif isinstance(arg, numpy.generic):
+        return arg.item()
+    elif isinstance(arg, ctypes.c_void_p):
+        return {'pointer': arg.value or 0}
+    elif isinstance(arg, bytes) and len(arg) <= _MAX_TEXT_BYTES and not arg.translate(None, _TEXT_CHARACTERS):
+        return {'bytes': arg}
+    elif isinstance(arg, (bytes, bytearray, memoryview)):
+        arg = numpy.frombuffer(bytes(arg), dtype=numpy.uint8)
+    elif isinstance(arg, ctypes.Array) and arg._type_ is ctypes.c_void_p:
+        return {'pointers': [p or 0 for p in arg]}
+    elif isinstance(arg, ctypes.Array):
+        arg = numpy.ctypeslib.as_array(arg)
+    
+    if isinstance(arg, numpy.ndarray):
+        return {
+            'array': arg.tobytes() if keepData else None,
+            'dtype': arg.dtype.str,
+            'shape': list(arg.shape)}
+    
+    return {'repr': repr(arg)}
+
+def _encodeBytes(value):
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    
+    raise TypeError("Cannot encode %r in a GL trace" % (value,))
+
+def _decodeArgument(arg):
+    if not isinstance(arg, dict):
+        return arg
+    elif 'pointer' in arg:
+        return ctypes.c_void_p(arg['pointer'])
+    elif 'pointers' in arg:
+        return (ctypes.c_void_p * len(arg['pointers']))(*arg['pointers'])
+    elif 'bytes' in arg:
+        data = arg['bytes']
+        return base64.b64decode(data) if isinstance(data, str) else data
+    elif 'array' in arg:
+        dtype = numpy.dtype(arg['dtype'])
+        if arg['array'] is None:
+            return numpy.zeros(arg['shape'], dtype=dtype)
+        data = arg['array']
+        data = base64.b64decode(data) if isinstance(data, str) else data
+        return numpy.frombuffer(data, dtype=dtype).reshape(arg['shape']).copy()
+    
+    raise Exception("Cannot replay GL argument %s" % arg['repr'])
@@ -0,0 +1,169 @@
+# FILENAME: glstate.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+import collections
+from OpenGL import GL
+
+class GLState(object):
+    """Caches the OpenGL state set through it (current program, bound vertex
+    array, buffers and textures, and uniform values) and skips calls that
+    would not change it. Every call is counted as issued or elided, and the
+    counts of the last finished frame are kept (see beginFrame).
+    
+    The cache is only correct if the state it tracks is always changed
+    through GLState. Call reset after changing it directly with GL calls.
+    """
+    program = None
+    vertexArray = None
+    activeTexture = None
+    buffers = {}
+    textures = {}
+    uniforms = {}
+    
+    issued = collections.Counter()
+    elided = collections.Counter()
+    lastFrame = {}
+    
+    @staticmethod
+    def reset():
+        """Forgets all cached state, so that the next call of each kind is
+        issued.
+        """
+        GLState.program = None
+        GLState.vertexArray = None
+        GLState.activeTexture = None
+        GLState.buffers = {}
+        GLState.textures = {}
+        GLState.uniforms = {}
+    
+    @staticmethod
+    def beginFrame():
+        """Saves the counts of the frame that just ended (see getFrameStats)
+        and starts counting a new frame.
+        """
+        names = set(GLState.issued) | set(GLState.elided)
+        GLState.lastFrame = dict([(name, (GLState.issued[name], GLState.elided[name])) for name in names])
+        GLState.issued.clear()
+        GLState.elided.clear()
+    
+    @staticmethod
+    def getFrameStats():
+        """Returns {call name: (issued, elided)} for the last finished frame.
+        """
+        return GLState.lastFrame
+    
+    @staticmethod
+    def useProgram(program):
+        if program == GLState.program:
+            GLState.elided['glUseProgram'] += 1
+            return
+        
+        GL.glUseProgram(program)
+        GLState.program = program
+        GLState.issued['glUseProgram'] += 1
+    
+    @staticmethod
+    def bindVertexArray(vertexArray):
+        if vertexArray == GLState.vertexArray:
+            GLState.elided['glBindVertexArray'] += 1
+            return
+        
+        GL.glBindVertexArray(vertexArray)
+        GLState.vertexArray = vertexArray
+        GLState.issued['glBindVertexArray'] += 1
+    
+    @staticmethod
+    def bindBuffer(target, buffer):
+        # the element array binding belongs to the bound vertex array
+        key = (target, GLState.vertexArray) if target == GL.GL_ELEMENT_ARRAY_BUFFER else target
+        if GLState.buffers.get(key) == buffer:
+            GLState.elided['glBindBuffer'] += 1
+            return
+        
+        GL.glBindBuffer(target, buffer)
+        GLState.buffers[key] = buffer
+        GLState.issued['glBindBuffer'] += 1
+    
+    @staticmethod
+    def bindTexture(target, texture, unit=0):
+        """Binds texture to target on texture unit (0 for GL_TEXTURE0, ...).
+        """
+        if GLState.textures.get((unit, target)) == texture:
+            GLState.elided['glBindTexture'] += 1
+            return
+        
+        if GLState.activeTexture != unit:
+            GL.glActiveTexture(GL.GL_TEXTURE0 + unit)
+            GLState.activeTexture = unit
+            GLState.issued['glActiveTexture'] += 1
+        
+        GL.glBindTexture(target, texture)
+        GLState.textures[(unit, target)] = texture
+        GLState.issued['glBindTexture'] += 1
+    
+    @staticmethod
+    def deleteProgram(program):
+        """Deletes program and forgets its cached state, since GL may reuse
+        its name.
+        """
+        GL.glDeleteProgram(program)
+        if GLState.program == program:
+            GLState.program = None
+        GLState.uniforms = dict([(k, v) for k, v in GLState.uniforms.items() if k[0] != program])
+    
+    @staticmethod
+    def deleteVertexArray(vertexArray):
+        GL.glDeleteVertexArrays(1, vertexArray)
+        if GLState.vertexArray == vertexArray:
+            GLState.vertexArray = None
+        GLState.buffers.pop((GL.GL_ELEMENT_ARRAY_BUFFER, vertexArray), None)
+    
+    @staticmethod
+    def deleteBuffer(buffer):
+        GL.glDeleteBuffers(1, buffer)
+        GLState.buffers = dict([(k, v) for k, v in GLState.buffers.items() if v != buffer])
+    
+    @staticmethod
+    def deleteTexture(texture):
+        GL.glDeleteTextures(1, texture)
+        GLState.textures = dict([(k, v) for k, v in GLState.textures.items() if v != texture])
+    
+    @staticmethod
+    def uniform1i(location, value):
+        if GLState.__unchanged('glUniform1i', location, value):
+            return
+        
+        GL.glUniform1i(location, value)
+    
+    @staticmethod
+    def uniform1f(location, value):
+        if GLState.__unchanged('glUniform1f', location, value):
+            return
+        
+        GL.glUniform1f(location, value)
+    
+    @staticmethod
+    def uniformMatrix4fv(location, count, transpose, value):
+        """Like glUniformMatrix4fv; value may be anything exposing the buffer
+        protocol (ctypes arrays, NumPy arrays).
+        """
+        if GLState.__unchanged('glUniformMatrix4fv', location, (transpose, memoryview(value).tobytes())):
+            return
+        
+        GL.glUniformMatrix4fv(location, count, transpose, value)
+    
+    @staticmethod
+    def __unchanged(name, location, value):
+        """Records value as the current value of the uniform at location in
+        the current program. Returns True (and counts the call as elided) if
+        it was already the current value.
+        """
+        key = (GLState.program, location)
+        if GLState.uniforms.get(key) == value:
+            GLState.elided[name] += 1
+            return True
+        
+        GLState.uniforms[key] = value
+        GLState.issued[name] += 1
+        return False
@@ -2,14 +2,66 @@
 # BY: Andrew Holbrook
 # DATE: 9/24/2015
 
+import ctypes
+import inspect
+import os
+import time
+import numpy
 import sdl2
 from sdl2 import sdlimage
 from ctypes import byref, c_int
 from OpenGL import GL
+from .glrecorder import RecordingGL
+from .glstate import GLState
+from .matmath import Frustum
+from .profiler import FrameProfiler
+from .simulation import SimulationThread
 
 class GLWindow(object):
     """A window for use with OpenGL.
+    
+    A headless GLWindow has no window: it renders into an offscreen
+    framebuffer of the same size on an EGL (surfaceless Mesa, e.g. llvmpipe)
+    or OSMesa context, and needs no display or GPU. PyOpenGL must load GL
+    through the same library, which it does when the PYOPENGL_PLATFORM
+    environment variable is "egl" or "osmesa" before OpenGL is first
+    imported; by default a GLWindow is headless exactly when it is. The
+    render delegate is driven the same way in both modes. Since a headless
+    window gets no quit event, maxFrames (or the ETGG2801_FRAMES environment
+    variable) limits the number of frames mainLoop renders.
+    
+    mainLoop runs the delegate's update at a fixed timeStep (milliseconds)
+    measured with the high-resolution performance counter. At most
+    maxUpdateSteps steps run per frame; time beyond that is dropped, so a
+    slow frame cannot snowball into ever longer catch-up. If maxFPS is set,
+    the loop sleeps off the rest of each frame's time. Otherwise a window
+    swaps with vsync where the driver allows it, and without vsync (e.g.
+    headless) the loop sleeps until the next update step is due rather than
+    spinning.
+    
+    If threadedUpdate is set, update runs on a SimulationThread instead,
+    and before each render the latest snapshot of the delegate's state is
+    stored in GLWindow.snapshot (see GLWindowRenderDelegate).
+    
+    Given a RecordingGL as gl (or with the ETGG2801_GL environment variable
+    set to "record"), every GL call of the window and the etgg2801 modules
+    is recorded, with statistics for each frame. The delegate's own calls
+    are recorded only if it makes them through window.gl (the recorder, or
+    OpenGL.GL when there is none) rather than OpenGL.GL directly. A
+    recorder that forwards to no GL needs no context at all, so the window
+    is headless without one. If the ETGG2801_TRACE environment variable
+    names a file, the trace is saved to it on cleanup.
+    
+    Robots and fleets skip drawing the links whose bounds lie outside
+    frustum. It culls nothing until the delegate gives it the projection *
+    view matrix, e.g. with window.frustum.setMatrix(projMatrix) in render.
+    The number culled each frame is included in the printFPS summary. The
+    same matrix picks the level of detail of models loaded with LODs (see
+    Model.selectLevels).
     """
+    HEADLESS_PLATFORMS = ('egl', 'osmesa')
+    EGL_PLATFORM_SURFACELESS_MESA = 0x31DD
+    
     instance = None
     
     @staticmethod
@@ -19,7 +71,7 @@ class GLWindow(object):
         
         return GLWindow.instance
     
-    def __init__(self, size=(600, 600), major=4, minor=0, fullscreen=False):
+    def __init__(self, size=(600, 600), major=4, minor=0, fullscreen=False, headless=None, maxFrames=None, gl=None):
         if GLWindow.instance:
             raise Exception("Window already created!")
         
@@ -27,46 +79,88 @@ class GLWindow(object):
         self.major = major
         self.minor = minor
         
+        # the calls are only kept when there is a trace file to save them to
+        self.traceFile = os.environ.get('ETGG2801_TRACE')
+        if gl is None and os.environ.get('ETGG2801_GL', '').lower() == 'record':
+            gl = RecordingGL(trace=bool(self.traceFile))
+        self.recorder = gl
+        self.gl = GL if gl is None else gl
+        # a recorder that only records needs no context
+        self.contextless = gl is not None and gl.gl is None
+        
+        self.platform = os.environ.get('PYOPENGL_PLATFORM', '').lower()
+        if headless is None:
+            headless = self.contextless or self.platform in GLWindow.HEADLESS_PLATFORMS
+        elif headless and not self.contextless and self.platform not in GLWindow.HEADLESS_PLATFORMS:
+            raise Exception("Headless mode needs PYOPENGL_PLATFORM set to egl or osmesa!")
+        self.headless = headless
+        
+        if maxFrames is None and os.environ.get('ETGG2801_FRAMES'):
+            maxFrames = int(os.environ['ETGG2801_FRAMES'])
+        self.maxFrames = maxFrames
+        
+        # print the profiler's summary every fpsPeriod milliseconds
         self.printFPS = False
-        self.periodTime = 0
         self.fpsPeriod = 1000
-        self.fpsDelay = self.fpsPeriod
-        self.numFrames = 0
+        self.profiler = FrameProfiler()
+        
         self.timeStep = 10
+        self.maxUpdateSteps = 5
+        self.maxFPS = None
+        self.vsync = False
+        self.alpha = 0.0
+        self.threadedUpdate = False
+        self.simulation = None
+        self.snapshot = None
+        self.frustum = Frustum()
+        self.frustum.viewportHeight = self.size[1]
+        
+        if self.recorder:
+            self.recorder.install()
         
-        self.__buildWindow()
+        if self.headless:
+            self.__buildHeadlessContext()
+        else:
+            self.__buildWindow()
         
-        if fullscreen:
+        if fullscreen and not self.headless:
             sdl2.SDL_SetWindowFullscreen(self.window, sdl2.SDL_WINDOW_FULLSCREEN)
         
         GLWindow.instance = self
     
     def setRenderDelegate(self, renderDelegate):
         self.renderDelegate = renderDelegate
+        
+        # delegates whose render takes an argument get the interpolation alpha
+        try:
+            self.renderWithAlpha = len(inspect.signature(renderDelegate.render).parameters) > 0
+        except (TypeError, ValueError):
+            self.renderWithAlpha = False
     
     def mainLoop(self):
         if not hasattr(self, "renderDelegate"):
             raise Exception("GLWindow's render delegate not set!")
         
-        dtime = 0
+        profiler = self.profiler
+        clock = time.perf_counter
+        lag = 0.0
         event = sdl2.SDL_Event()
         running = True
-        startTime = sdl2.SDL_GetTicks()
+        frame = 0
+        printTime = previousTime = clock()
+        if self.threadedUpdate:
+            self.simulation = SimulationThread(self.renderDelegate, self.timeStep, self.maxUpdateSteps)
+            self.simulation.start()
         while running:
-            stopTime = sdl2.SDL_GetTicks()
-            dtime += stopTime - startTime
-            startTime = stopTime
+            frameStart = clock()
+            lag += (frameStart - previousTime) * 1000.0
+            previousTime = frameStart
             
-            if self.printFPS:
-                self.periodTime += dtime
-                self.fpsDelay -= dtime
-                self.numFrames += 1
-                if self.fpsDelay <= 0:
-                    self.fpsDelay = self.fpsPeriod
-                    print("FPS:", (self.numFrames / (self.periodTime / 1000.0)))
-                    self.numFrames = 0
-                    self.periodTime = 0
-                
+            # drop the time that more than maxUpdateSteps steps would take
+            lag = min(lag, self.maxUpdateSteps * self.timeStep)
+            
+            GLState.beginFrame()
+            self.frustum.beginFrame()
             
             while sdl2.SDL_PollEvent(byref(event)) != 0:
                 if event.type == sdl2.SDL_QUIT:
@@ -74,22 +168,98 @@ class GLWindow(object):
                 else:
                     pass
                     # self.renderDelegate.addEvent(event)
+            phaseStart = clock()
+            profiler.record('events', phaseStart - frameStart)
+            
+            if self.simulation:
+                self.simulation.checkError()
+                self.snapshot, snapshotTime = self.simulation.getSnapshot()
+                lag = min(max((phaseStart - snapshotTime) * 1000.0, 0.0), self.timeStep)
             
-            while dtime >= self.timeStep:
-                dtime -= self.timeStep
+            while lag >= self.timeStep and not self.simulation:
+                lag -= self.timeStep
                 self.renderDelegate.update(self.timeStep)
-            self.renderDelegate.render()
+                phaseEnd = clock()
+                profiler.record('update', phaseEnd - phaseStart)
+                phaseStart = phaseEnd
             
-            sdl2.SDL_GL_SwapWindow(self.window)
+            # how far the render time is between the last update and the next
+            self.alpha = lag / self.timeStep
+            nextUpdate = frameStart + (self.timeStep - lag) / 1000.0
+            if self.renderWithAlpha:
+                self.renderDelegate.render(self.alpha)
+            else:
+                self.renderDelegate.render()
+            phaseEnd = clock()
+            profiler.record('render', phaseEnd - phaseStart)
+            
+            self.swap()
+            frameEnd = clock()
+            profiler.record('swap', frameEnd - phaseEnd)
+            profiler.record('frame', frameEnd - frameStart)
+            profiler.endFrame()
+            
+            if self.printFPS and (frameEnd - printTime) * 1000.0 >= self.fpsPeriod:
+                printTime = frameEnd
+                summary = profiler.getSummary()
+                if self.frustum.isEnabled():
+                    summary += ", culled %d/%d parts" % self.frustum.getFrameStats()
+                print(summary)
+            
+            frame += 1
+            if self.maxFrames is not None and frame >= self.maxFrames:
+                running = False
             
+            # without vsync, nothing is worth drawing before the next update
+            wakeTime = None
+            if self.maxFPS:
+                wakeTime = frameStart + 1.0 / self.maxFPS
+            elif not self.vsync:
+                wakeTime = nextUpdate
+            if wakeTime is not None:
+                remaining = wakeTime - clock()
+                if remaining > 0:
+                    time.sleep(remaining)
+                    profiler.record('sleep', remaining)
+        
+        if self.simulation:
+            self.simulation.stop()
+            self.simulation = None
         self.cleanup()
     
+    def swap(self):
+        if self.headless:
+            GL.glFlush()
+        else:
+            sdl2.SDL_GL_SwapWindow(self.window)
+        
+        if self.recorder:
+            self.recorder.endFrame()
+    
+    def readPixels(self):
+        """Returns the current frame as a (height, width, 4) array of RGBA
+        bytes, top row first.
+        """
+        width, height = self.size
+        GL.glPixelStorei(GL.GL_PACK_ALIGNMENT, 1)
+        pixels = GL.glReadPixels(0, 0, width, height, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE)
+        
+        return numpy.frombuffer(pixels, dtype=numpy.uint8).reshape(height, width, 4)[::-1]
+    
     def cleanup(self):
         self.renderDelegate.cleanup()
-        sdl2.SDL_GL_DeleteContext(self.glcontext)
-        sdl2.SDL_DestroyWindow(self.window)
+        if self.headless:
+            self.__destroyHeadlessContext()
+        else:
+            sdl2.SDL_GL_DeleteContext(self.glcontext)
+            sdl2.SDL_DestroyWindow(self.window)
         sdlimage.IMG_Quit()
         sdl2.SDL_Quit()
+        
+        if self.recorder:
+            if self.traceFile:
+                self.recorder.save(self.traceFile)
+            self.recorder.uninstall()
     
     def __buildWindow(self):
         if sdl2.SDL_Init(sdl2.SDL_INIT_VIDEO) != 0:
@@ -111,12 +281,111 @@ class GLWindow(object):
             sdl2.SDL_DestroyWindow(self.window)
             raise Exception(sdl2.SDL_GetError())
         
+        # swap waits for the display, which also keeps mainLoop from spinning
+        self.vsync = sdl2.SDL_GL_SetSwapInterval(1) == 0
+        
         # keep application from receiving text input events
         sdl2.SDL_StopTextInput()
+    
+    def __buildHeadlessContext(self):
+        # SDL still provides the clock, events (quit on SIGINT), and images
+        if sdl2.SDL_Init(sdl2.SDL_INIT_TIMER | sdl2.SDL_INIT_EVENTS) != 0:
+            raise Exception(sdl2.SDL_GetError())
+        
+        sdlimage.IMG_Init(sdlimage.IMG_INIT_PNG | sdlimage.IMG_INIT_JPG)
+        
+        self.window = None
+        if self.contextless:
+            return
+        elif self.platform == 'egl':
+            self.__buildEGLContext()
+        else:
+            self.__buildOSMesaContext()
+    
+    def __buildEGLContext(self):
+        from OpenGL import EGL
+        
+        # Mesa's surfaceless platform needs neither a display nor a GPU
+        try:
+            self.display = EGL.eglGetPlatformDisplay(GLWindow.EGL_PLATFORM_SURFACELESS_MESA, EGL.EGL_DEFAULT_DISPLAY, None)
+        except Exception:
+            self.display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        major, minor = EGL.EGLint(), EGL.EGLint()
+        if not self.display or not EGL.eglInitialize(self.display, ctypes.pointer(major), ctypes.pointer(minor)):
+            raise Exception("Unable to initialize EGL!")
+        
+        configAttributes = GLWindow.__attributeList(EGL.EGLint,
+            EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT,
+            EGL.EGL_RENDERABLE_TYPE, EGL.EGL_OPENGL_BIT,
+            EGL.EGL_RED_SIZE, 8,
+            EGL.EGL_GREEN_SIZE, 8,
+            EGL.EGL_BLUE_SIZE, 8,
+            EGL.EGL_ALPHA_SIZE, 8,
+            EGL.EGL_DEPTH_SIZE, 24,
+            EGL.EGL_NONE)
+        config = EGL.EGLConfig()
+        numConfigs = EGL.EGLint()
+        if not EGL.eglChooseConfig(self.display, configAttributes, ctypes.pointer(config), 1, ctypes.pointer(numConfigs)) \
+                or numConfigs.value == 0:
+            raise Exception("No EGL config for offscreen OpenGL rendering!")
+        
+        # the pbuffer is the offscreen framebuffer
+        self.surface = EGL.eglCreatePbufferSurface(self.display, config, GLWindow.__attributeList(EGL.EGLint,
+            EGL.EGL_WIDTH, self.size[0],
+            EGL.EGL_HEIGHT, self.size[1],
+            EGL.EGL_NONE))
+        
+        EGL.eglBindAPI(EGL.EGL_OPENGL_API)
+        self.glcontext = EGL.eglCreateContext(self.display, config, EGL.EGL_NO_CONTEXT, GLWindow.__attributeList(EGL.EGLint,
+            EGL.EGL_CONTEXT_MAJOR_VERSION, self.major,
+            EGL.EGL_CONTEXT_MINOR_VERSION, self.minor,
+            EGL.EGL_CONTEXT_OPENGL_PROFILE_MASK, EGL.EGL_CONTEXT_OPENGL_CORE_PROFILE_BIT,
+            EGL.EGL_NONE))
+        if not self.glcontext or not EGL.eglMakeCurrent(self.display, self.surface, self.surface, self.glcontext):
+            raise Exception("Unable to create an EGL OpenGL %d.%d context!" % (self.major, self.minor))
+    
+    def __buildOSMesaContext(self):
+        from OpenGL import osmesa
+        
+        self.glcontext = osmesa.OSMesaCreateContextAttribs(GLWindow.__attributeList(c_int,
+            osmesa.OSMESA_FORMAT, osmesa.OSMESA_RGBA,
+            osmesa.OSMESA_DEPTH_BITS, 24,
+            osmesa.OSMESA_PROFILE, osmesa.OSMESA_CORE_PROFILE,
+            osmesa.OSMESA_CONTEXT_MAJOR_VERSION, self.major,
+            osmesa.OSMESA_CONTEXT_MINOR_VERSION, self.minor,
+            0), None)
+        if not self.glcontext:
+            raise Exception("Unable to create an OSMesa OpenGL %d.%d context!" % (self.major, self.minor))
+        
+        # OSMesa renders into this buffer
+        self.buffer = (ctypes.c_ubyte * (self.size[0] * self.size[1] * 4))()
+        if not osmesa.OSMesaMakeCurrent(self.glcontext, self.buffer, GL.GL_UNSIGNED_BYTE, self.size[0], self.size[1]):
+            raise Exception("Unable to make the OSMesa context current!")
+    
+    def __destroyHeadlessContext(self):
+        if self.contextless:
+            return
+        elif self.platform == 'egl':
+            from OpenGL import EGL
+            EGL.eglMakeCurrent(self.display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, EGL.EGL_NO_CONTEXT)
+            EGL.eglDestroySurface(self.display, self.surface)
+            EGL.eglDestroyContext(self.display, self.glcontext)
+            EGL.eglTerminate(self.display)
+        else:
+            from OpenGL import osmesa
+            osmesa.OSMesaDestroyContext(self.glcontext)
+    
+    @staticmethod
+    def __attributeList(ctype, *values):
+        return (ctype * len(values))(*values)
 
 class GLWindowRenderDelegate(object):
     """This class will receive cleanup, update, and render calls from the
     GLWindow.
+    
+    render may take one argument, alpha: the fraction of a time step that
+    has passed since the last update, for interpolating between the last
+    two updated states.
     """
     def __init__(self):
         if type(self) == GLWindowRenderDelegate:
@@ -130,3 +399,15 @@ class GLWindowRenderDelegate(object):
     
     def render(self):
         raise Exception("MUST IMPLEMENT 'render' METHOD!")
+    
+    def createSnapshot(self):
+        """Needed only with GLWindow.threadedUpdate: returns a new snapshot
+        object able to hold the state render needs.
+        """
+        raise Exception("MUST IMPLEMENT 'createSnapshot' METHOD FOR THREADED UPDATES!")
+    
+    def writeSnapshot(self, snapshot):
+        """Needed only with GLWindow.threadedUpdate: copies the current state
+        into snapshot. Called on the simulation thread after update steps.
+        """
+        raise Exception("MUST IMPLEMENT 'writeSnapshot' METHOD FOR THREADED UPDATES!")
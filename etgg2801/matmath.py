@@ -2,10 +2,17 @@
 # BY: Andrew Holbrook
 # DATE: 9/24/2016
 
+import numbers
+import numpy
 from ctypes import c_float
-from math import cos, sin, radians
+from math import cos, sin, tan, radians
 
 class Matrix4(object):
+    """A 4x4 float32 matrix. The values live in a ctypes array in column-major
+    order (the layout glUniformMatrix4fv expects), and data is a (4, 4) NumPy
+    view of that array indexed as data[row, col].
+    """
+    __slots__ = ('ctype', 'data')
     
     @staticmethod
     def getIdentity():
@@ -13,23 +20,126 @@ class Matrix4(object):
     
     @staticmethod
     def getRotation(ax=0.0, ay=0.0, az=0.0):
-        caz = cos(radians(az))
-        saz = sin(radians(az))
-        zm = Matrix4(((caz, -saz, 0, 0), (saz, caz, 0, 0), (0, 0, 1, 0), (0, 0, 0, 1)))
+        """Returns the rotation about x, then y, then z (angles in degrees),
+        i.e. getRotationX(ax) * getRotationY(ay) * getRotationZ(az).
+        """
+        if not ay and not az:
+            return Matrix4.getRotationX(ax)
+        elif not ax and not az:
+            return Matrix4.getRotationY(ay)
+        elif not ax and not ay:
+            return Matrix4.getRotationZ(az)
+        
+        cx, sx = cos(radians(ax)), sin(radians(ax))
+        cy, sy = cos(radians(ay)), sin(radians(ay))
+        cz, sz = cos(radians(az)), sin(radians(az))
         
-        cay = cos(radians(ay))
-        say = sin(radians(ay))
-        ym = Matrix4(((cay, 0, say, 0), (0, 1, 0, 0), (-say, 0, cay, 0), (0, 0, 0, 1)))
+        return Matrix4._fromRigid(
+            cy * cz, -cy * sz, sy,
+            cx * sz + sx * sy * cz, cx * cz - sx * sy * sz, -sx * cy,
+            sx * sz - cx * sy * cz, sx * cz + cx * sy * sz, cx * cy)
+    
+    @staticmethod
+    def getRotationX(angle):
+        c, s = cos(radians(angle)), sin(radians(angle))
+        return Matrix4._fromRigid(1, 0, 0, 0, c, -s, 0, s, c)
+    
+    @staticmethod
+    def getRotationY(angle):
+        c, s = cos(radians(angle)), sin(radians(angle))
+        return Matrix4._fromRigid(c, 0, s, 0, 1, 0, -s, 0, c)
+    
+    @staticmethod
+    def getRotationZ(angle):
+        c, s = cos(radians(angle)), sin(radians(angle))
+        return Matrix4._fromRigid(c, -s, 0, s, c, 0, 0, 0, 1)
+    
+    @staticmethod
+    def getAxisRotation(axis, angle):
+        """Returns the rotation of angle degrees about axis (a sequence of
+        three numbers, normalized here).
+        """
+        return Matrix4.getTranslationRotation((0, 0, 0), axis, angle)
+    
+    @staticmethod
+    def getTranslationRotation(offset, axis, angle):
+        """Returns getTranslation(*offset) * getAxisRotation(axis, angle)
+        without building either matrix.
+        """
+        x, y, z = axis[0], axis[1], axis[2]
+        length = (x * x + y * y + z * z) ** 0.5
+        if length != 1.0 and length != 0.0:
+            x, y, z = x / length, y / length, z / length
         
-        cax = cos(radians(ax))
-        sax = sin(radians(ax))
-        xm = Matrix4(((1, 0, 0, 0), (0, cax, -sax, 0), (0, sax, cax, 0), (0, 0, 0, 1)))
+        c, s = cos(radians(angle)), sin(radians(angle))
+        t = 1.0 - c
         
-        return xm * ym * zm
+        return Matrix4._fromRigid(
+            t * x * x + c, t * x * y - s * z, t * x * z + s * y,
+            t * x * y + s * z, t * y * y + c, t * y * z - s * x,
+            t * x * z - s * y, t * y * z + s * x, t * z * z + c,
+            offset[0], offset[1], offset[2])
+    
+    @staticmethod
+    def getLookAt(eye, target, up=None):
+        """Returns the view matrix of a camera at eye (a Vector4) looking at
+        target, with up (default +y) as the approximate up direction. The
+        camera looks down its -z axis, as with gluLookAt.
+        """
+        ex, ey, ez = eye.getXYZ()
+        tx, ty, tz = target.getXYZ()
+        ux, uy, uz = up.getXYZ() if up else (0.0, 1.0, 0.0)
+        
+        # z points from the target back to the eye
+        zx, zy, zz = _normalized(ex - tx, ey - ty, ez - tz)
+        xx, xy, xz = _normalized(uy * zz - uz * zy, uz * zx - ux * zz, ux * zy - uy * zx)
+        yx, yy, yz = zy * xz - zz * xy, zz * xx - zx * xz, zx * xy - zy * xx
+        
+        return Matrix4._fromRigid(
+            xx, xy, xz,
+            yx, yy, yz,
+            zx, zy, zz,
+            -(xx * ex + xy * ey + xz * ez),
+            -(yx * ex + yy * ey + yz * ez),
+            -(zx * ex + zy * ey + zz * ez))
+    
+    @staticmethod
+    def getPerspective(fovy=60.0, aspect=1.0, near=0.1, far=100.0):
+        """Returns a perspective projection with a vertical field of view of
+        fovy degrees, as with gluPerspective.
+        """
+        f = 1.0 / tan(radians(fovy) / 2.0)
+        
+        m = Matrix4.__new__(Matrix4)
+        m.ctype = _CMatrix()
+        m.ctype[:] = (
+            f / aspect, 0, 0, 0,
+            0, f, 0, 0,
+            0, 0, (far + near) / (near - far), -1,
+            0, 0, 2 * far * near / (near - far), 0)
+        m.data = numpy.ndarray((4, 4), numpy.float32, m.ctype, order='F')
+        
+        return m
+    
+    @staticmethod
+    def _fromRigid(r00, r01, r02, r10, r11, r12, r20, r21, r22, tx=0.0, ty=0.0, tz=0.0):
+        """Builds a matrix from a 3x3 rotation (given row by row) and a
+        translation, filling the ctypes array directly.
+        """
+        m = Matrix4.__new__(Matrix4)
+        m.ctype = _CMatrix()
+        m.ctype[:] = (
+            r00, r10, r20, 0,
+            r01, r11, r21, 0,
+            r02, r12, r22, 0,
+            tx, ty, tz, 1)
+        m.data = numpy.ndarray((4, 4), numpy.float32, m.ctype, order='F')
+        
+        return m
     
     @staticmethod
     def getTranslation(dx=0.0, dy=0.0, dz=0.0):
-        return Matrix4(((1, 0, 0, dx), (0, 1, 0, dy), (0, 0, 1, dz), (0, 0, 0, 1)))
+        return Matrix4._fromRigid(1, 0, 0, 0, 1, 0, 0, 0, 1, dx, dy, dz)
     
     @staticmethod
     def getScale(sx=1.0, sy=1.0, sz=1.0):
@@ -47,34 +157,32 @@ class Matrix4(object):
         return Matrix4(((a, 0, 0, -b), (0, c, 0, -d), (0, 0, -e, -f), (0, 0, 0, 1)))
     
     def __init__(self, data=None):
-        if not data:
-            self.data = [[0] * i + [1] + [0] * (3 - i) for i in range(4)]
-        elif isinstance(data, tuple) or isinstance(data, list):
-            if len(data) == 4:
-                self.data = [list(row) for row in data]
-            elif len(data) == 3:
-                self.data = [list(row) for row in data]
-                self.data[0] += [0]
-                self.data[1] += [0]
-                self.data[2] += [0]
-                self.data.append([0, 0, 0, 1])
+        self.ctype = _CMatrix()
+        self.data = numpy.ndarray((4, 4), numpy.float32, self.ctype, order='F')
+        
+        if data is None or len(data) == 0:
+            self.data[...] = _IDENTITY
+        elif len(data) == 4:
+            self.data[...] = data
+        elif len(data) == 3:
+            self.data[...] = _IDENTITY
+            self.data[0:3, 0:3] = data
     
     def __str__(self):
         tmpstr = ''
-        for row in self.data:
+        for row in self.data.tolist():
             tmpstr += str(row) + '\n'
         
         return tmpstr
     
     def get(self, row, col):
-        return self.data[row][col]
+        return float(self.data[row, col])
     
     def set(self, row, col, value):
-        self.data[row][col] = value
+        self.data[row, col] = value
     
     def setColumn(self, col, v):
-        for idx in range(3):
-            self.data[idx][col] = v.data[idx]
+        self.data[0:3, col] = v.data[0:3]
     
     def setPosition(self, pos):
         self.setColumn(3, pos)
@@ -85,83 +193,118 @@ class Matrix4(object):
         self.setColumn(2, z)
     
     def rotation(self):
-        return Matrix4([[self.data[j][i] for i in range(3)] for j in range(3)])
+        return Matrix4(self.data[0:3, 0:3])
     
     def inverseRotation(self):
-        return Matrix4([[self.data[i][j] for i in range(3)] for j in range(3)])
+        return Matrix4(self.data[0:3, 0:3].T)
     
     def position(self):
-        return Vector4([self.data[i][3] for i in range(3)])
+        return Vector4(self.data[0:3, 3])
     
     def inverse(self):
-        invRot = self.inverseRotation()
-        pos = (invRot * self.position()) * -1
-        invRot.setPosition(pos)
+        """Returns the inverse of this matrix, assuming it is a rigid transform
+        (rotation and translation only).
+        """
+        r00, r10, r20, _, r01, r11, r21, _, r02, r12, r22, _, tx, ty, tz, _ = self.ctype[:]
         
-        return invRot
+        return Matrix4._fromRigid(
+            r00, r10, r20,
+            r01, r11, r21,
+            r02, r12, r22,
+            -(r00 * tx + r10 * ty + r20 * tz),
+            -(r01 * tx + r11 * ty + r21 * tz),
+            -(r02 * tx + r12 * ty + r22 * tz))
     
     def getCType(self):
-        """Returns a ctypes-compatible array representing this matrix.
+        """Returns a ctypes-compatible array representing this matrix. The
+        array shares memory with the matrix (no copy is made).
+        """
+        return self.ctype
+    
+    def imul(self, other):
+        """Post-multiplies this matrix by other in place and returns self.
         """
-        tmparray = (c_float * 16)()
-        for i in range(16):
-            tmparray[i] = self.data[i % 4][i // 4]
+        # matmul cannot write over an operand; a per-call temporary (rather
+        # than a shared buffer) keeps this safe across threads
+        self.data[...] = numpy.matmul(self.data, other.data)
         
-        return tmparray
+        return self
     
     def __add__(self, other):
-        return Matrix4([[self.data[i][j] + other.data[i][j] for j in range(4)] for i in range(4)])
+        result = Matrix4()
+        numpy.add(self.data, other.data, out=result.data)
+        
+        return result
     
     def __sub__(self, other):
-        return Matrix4([[self.data[i][j] - other.data[i][j] for j in range(4)] for i in range(4)])
+        result = Matrix4()
+        numpy.subtract(self.data, other.data, out=result.data)
+        
+        return result
     
     def __mul__(self, other):
         if isinstance(other, Vector4):
-            return Vector4([sum([self.data[j][i] * other.data[i] for i in range(4)]) for j in range(4)])
+            result = Vector4()
+            numpy.matmul(self.data, other.data, out=result.data)
+            return result
         elif isinstance(other, Matrix4):
-            return Matrix4([[sum([self.data[k][j] * other.data[j][i] for j in range(4)]) for i in range(4)] for k in range(4)])
+            result = Matrix4()
+            numpy.matmul(self.data, other.data, out=result.data)
+            return result
+        
+        return NotImplemented
+    
+    __imul__ = imul
 
 class Vector4(object):
+    """A 4 component float32 vector. Like Matrix4, data is a NumPy view of the
+    ctypes array returned by getCType.
+    """
+    __slots__ = ('ctype', 'data')
+    
     def __init__(self, data=None):
-        if not data:
-            self.data = [0.0, 0.0, 0.0, 1.0]
-        elif isinstance(data, tuple) or isinstance(data, list):
-            self.data = list(data) + [1,] * (4 - len(data))
+        if data is None or len(data) == 0:
+            self.ctype = (c_float * 4)(0.0, 0.0, 0.0, 1.0)
+            self.data = numpy.ndarray(4, numpy.float32, self.ctype)
+        else:
+            # missing components are filled with 1
+            self.ctype = (c_float * 4)(1.0, 1.0, 1.0, 1.0)
+            self.data = numpy.ndarray(4, numpy.float32, self.ctype)
+            self.data[0:len(data)] = data
     
     def __str__(self):
-        return str(self.data)
+        return str(self.data.tolist())
     
     def __add__(self, other):
-        if isinstance(other, int) or isinstance(other, float):
-            return Vector4([self.data[i] + other for i in range(4)])
+        if isinstance(other, numbers.Real):
+            return Vector4(self.data + other)
         elif isinstance(other, Vector4):  
-            return Vector4([self.data[i] + other.data[i] for i in range(4)])
+            return Vector4(self.data + other.data)
     
     def __sub__(self, other):
-        if isinstance(other, int) or isinstance(other, float):
-            return Vector4([self.data[i] - other for i in range(4)])
+        if isinstance(other, numbers.Real):
+            return Vector4(self.data - other)
         elif isinstance(other, Vector4):  
-            return Vector4([self.data[i] - other.data[i] for i in range(4)])
+            return Vector4(self.data - other.data)
     
     def __mul__(self, other):
-        if isinstance(other, int) or isinstance(other, float):
-            return Vector4([self.data[i] * other for i in range(4)])
+        if isinstance(other, numbers.Real):
+            return Vector4(self.data * other)
         elif isinstance(other, Vector4):
-            return sum([self.data[i] * other.data[i] for i in range(4)])
+            return float(numpy.dot(self.data, other.data))
     
     def dot(self, other):
         if isinstance(other, Vector4):
-            return self.getX() * other.getX() + self.getY() * other.getY() + self.getZ() * other.getZ()
+            return float(numpy.dot(self.data[0:3], other.data[0:3]))
     
     def cross(self, other):
         if isinstance(other, Vector4):
-            x = self.getY() * other.getZ() - self.getZ() * other.getY()
-            y = self.getZ() * other.getX() - self.getX() * other.getZ()
-            z = self.getX() * other.getY() - self.getY() * other.getX()
-            return Vector4((x, y, z, 0.0))
+            ax, ay, az = self.getXYZ()
+            bx, by, bz = other.getXYZ()
+            return Vector4((ay * bz - az * by, az * bx - ax * bz, ax * by - ay * bx, 0.0))
     
     def length2(self):
-        return self.getX() ** 2 + self.getY() ** 2 + self.getZ() ** 2
+        return float(numpy.dot(self.data[0:3], self.data[0:3]))
     
     def length(self):
         return self.length2() ** 0.5
@@ -169,36 +312,30 @@ class Vector4(object):
     def normalize(self):
         tmplen = self.length2()
         if tmplen != 0:
-            tmplen = 1.0 / tmplen ** 0.5
-            self.data[0] *= tmplen
-            self.data[1] *= tmplen
-            self.data[2] *= tmplen
+            self.data[0:3] *= 1.0 / tmplen ** 0.5
         
         return self
     
     def getCType(self):
-        """Returns a ctypes-compatible array representing this Vector4.
+        """Returns a ctypes-compatible array representing this Vector4. The
+        array shares memory with the vector (no copy is made).
         """
-        tmparray = (c_float * 4)()
-        for i in range(4):
-            tmparray[i] = self.data[i]
-        
-        return tmparray
+        return self.ctype
     
     def getXYZ(self):
-        return self.data[0:-1]
+        return self.data[0:3].tolist()
     
     def getX(self):
-        return self.data[0]
+        return float(self.data[0])
     
     def getY(self):
-        return self.data[1]
+        return float(self.data[1])
     
     def getZ(self):
-        return self.data[2]
+        return float(self.data[2])
     
     def getW(self):
-        return self.data[3]
+        return float(self.data[3])
     
     def setX(self, x):
         self.data[0] = x
@@ -210,4 +347,354 @@ class Vector4(object):
         self.data[2] = z
     
     def setW(self, w):
-        self.data[3] = w
\ No newline at end of file
+        self.data[3] = w
+
+class Matrix4Array(object):
+    """A block of N 4x4 float32 matrices for transforming many objects at once.
+    The matrices are stored back to back in column-major order (see getCType),
+    and data is an (N, 4, 4) view of them indexed as data[i, row, col].
+    Single elements are read and written as Matrix4 objects.
+    """
+    __slots__ = ('buffer', 'data')
+    
+    @staticmethod
+    def getIdentity(n):
+        return Matrix4Array(n)
+    
+    @staticmethod
+    def getRotation(ax=0.0, ay=0.0, az=0.0):
+        """Returns the rotations for arrays (or scalars) of angles in degrees,
+        using the same x * y * z order as Matrix4.getRotation.
+        """
+        ax, ay, az = numpy.broadcast_arrays(*[numpy.radians(numpy.asarray(a, dtype=numpy.float64)) for a in (ax, ay, az)])
+        cx, sx = numpy.cos(ax).ravel(), numpy.sin(ax).ravel()
+        cy, sy = numpy.cos(ay).ravel(), numpy.sin(ay).ravel()
+        cz, sz = numpy.cos(az).ravel(), numpy.sin(az).ravel()
+        
+        result = Matrix4Array(len(cx))
+        r = result.data
+        r[:, 0, 0] = cy * cz
+        r[:, 0, 1] = -cy * sz
+        r[:, 0, 2] = sy
+        r[:, 1, 0] = cx * sz + sx * sy * cz
+        r[:, 1, 1] = cx * cz - sx * sy * sz
+        r[:, 1, 2] = -sx * cy
+        r[:, 2, 0] = sx * sz - cx * sy * cz
+        r[:, 2, 1] = sx * cz + cx * sy * sz
+        r[:, 2, 2] = cx * cy
+        
+        return result
+    
+    @staticmethod
+    def getTranslation(dx=0.0, dy=0.0, dz=0.0):
+        """Returns the translations for arrays (or scalars) of offsets.
+        """
+        dx, dy, dz = numpy.broadcast_arrays(dx, dy, dz)
+        
+        result = Matrix4Array(dx.size)
+        result.data[:, 0, 3] = dx.ravel()
+        result.data[:, 1, 3] = dy.ravel()
+        result.data[:, 2, 3] = dz.ravel()
+        
+        return result
+    
+    @staticmethod
+    def getTranslationRotation(offset, axis, angle):
+        """Returns getTranslation(offset) * (rotation of angle degrees about
+        axis) for arrays of offsets (N, 3), axes (N, 3), and angles (N,). Any
+        argument may instead be a single value shared by all N matrices.
+        """
+        angle = numpy.radians(numpy.asarray(angle, dtype=numpy.float64)).ravel()
+        offset = numpy.asarray(offset, dtype=numpy.float64).reshape(-1, 3)
+        axis = numpy.asarray(axis, dtype=numpy.float64).reshape(-1, 3)
+        axis = _normalizeRows(axis)
+        n = max(len(angle), len(offset), len(axis))
+        
+        x, y, z = axis[:, 0], axis[:, 1], axis[:, 2]
+        c, s = numpy.cos(angle), numpy.sin(angle)
+        t = 1.0 - c
+        
+        result = Matrix4Array(n)
+        r = result.data
+        r[:, 0, 0] = t * x * x + c
+        r[:, 0, 1] = t * x * y - s * z
+        r[:, 0, 2] = t * x * z + s * y
+        r[:, 1, 0] = t * x * y + s * z
+        r[:, 1, 1] = t * y * y + c
+        r[:, 1, 2] = t * y * z - s * x
+        r[:, 2, 0] = t * x * z - s * y
+        r[:, 2, 1] = t * y * z + s * x
+        r[:, 2, 2] = t * z * z + c
+        r[:, 0:3, 3] = offset
+        
+        return result
+    
+    @staticmethod
+    def fromMatrices(matrices):
+        """Returns a Matrix4Array holding copies of a sequence of Matrix4s.
+        """
+        result = Matrix4Array(len(matrices))
+        for i, m in enumerate(matrices):
+            result.data[i] = m.data
+        
+        return result
+    
+    def __init__(self, n=0, data=None):
+        """Creates n identity matrices, or copies data (an array-like of
+        shape (N, 4, 4) indexed as [i, row, col]) if it is given.
+        """
+        if data is not None:
+            data = numpy.asarray(data, dtype=numpy.float32)
+            n = len(data)
+        
+        self.buffer = numpy.empty((n, 16), dtype=numpy.float32)
+        self.data = self.buffer.reshape((n, 4, 4)).transpose(0, 2, 1)
+        self.data[...] = _IDENTITY if data is None else data
+    
+    def __len__(self):
+        return len(self.buffer)
+    
+    def __getitem__(self, i):
+        return Matrix4(self.data[i])
+    
+    def __setitem__(self, i, m):
+        self.data[i] = m.data
+    
+    def inverse(self):
+        """Returns the inverses of all matrices, assuming they are rigid
+        transforms (rotation and translation only).
+        """
+        result = Matrix4Array(len(self))
+        invRot = self.data[:, 0:3, 0:3].transpose(0, 2, 1)
+        result.data[:, 0:3, 0:3] = invRot
+        result.data[:, 0:3, 3] = -numpy.einsum('nij,nj->ni', invRot, self.data[:, 0:3, 3])
+        
+        return result
+    
+    def getBuffer(self):
+        """Returns the contiguous (N, 16) float32 array of column-major
+        matrices, ready to upload to a uniform or shader storage buffer.
+        """
+        return self.buffer
+    
+    def getCType(self):
+        """Returns a ctypes array of 16 * N floats sharing memory with this
+        block, for glUniformMatrix4fv(location, N, False, ...).
+        """
+        return (c_float * self.buffer.size).from_buffer(self.buffer)
+    
+    def imul(self, other):
+        """Post-multiplies every matrix by the matching matrix of other (or by
+        a single Matrix4) in place and returns self.
+        """
+        self.data[...] = numpy.matmul(self.data, other.data)
+        
+        return self
+    
+    def __mul__(self, other):
+        """Multiplies element-wise by a Matrix4Array of the same length, or
+        every matrix by a single Matrix4. Vector4Array and Vector4 operands
+        are transformed the same way.
+        """
+        if isinstance(other, Matrix4Array) or isinstance(other, Matrix4):
+            result = Matrix4Array(len(self))
+            numpy.matmul(self.data, other.data, out=result.data)
+            return result
+        elif isinstance(other, Vector4Array):
+            return Vector4Array(data=numpy.einsum('nij,nj->ni', self.data, other.data))
+        elif isinstance(other, Vector4):
+            return Vector4Array(data=numpy.einsum('nij,j->ni', self.data, other.data))
+        
+        return NotImplemented
+    
+    def __rmul__(self, other):
+        if isinstance(other, Matrix4):
+            result = Matrix4Array(len(self))
+            numpy.matmul(other.data, self.data, out=result.data)
+            return result
+        
+        return NotImplemented
+    
+    __imul__ = imul
+
+class Vector4Array(object):
+    """A contiguous block of N 4 component float32 vectors. Single elements are
+    read and written as Vector4 objects.
+    """
+    __slots__ = ('data',)
+    
+    def __init__(self, n=0, data=None):
+        """Creates n (0, 0, 0, 1) vectors, or copies data (an array-like of
+        shape (N, 3) or (N, 4)) if it is given. Missing w components are 1.
+        """
+        if data is not None:
+            data = numpy.asarray(data, dtype=numpy.float32)
+            n = len(data)
+        
+        self.data = numpy.zeros((n, 4), dtype=numpy.float32)
+        self.data[:, 3] = 1.0
+        if data is not None:
+            self.data[:, 0:data.shape[1]] = data
+    
+    def __len__(self):
+        return len(self.data)
+    
+    def __getitem__(self, i):
+        return Vector4(self.data[i])
+    
+    def __setitem__(self, i, v):
+        self.data[i] = v.data
+    
+    def __add__(self, other):
+        return Vector4Array(data=self.data + getattr(other, 'data', other))
+    
+    def __sub__(self, other):
+        return Vector4Array(data=self.data - getattr(other, 'data', other))
+    
+    def __mul__(self, other):
+        return Vector4Array(data=self.data * other)
+    
+    def dot(self, other):
+        """Returns the N three component dot products with other.
+        """
+        return numpy.einsum('ni,ni->n', self.data[:, 0:3], numpy.broadcast_to(other.data[..., 0:3], (len(self), 3)))
+    
+    def cross(self, other):
+        result = Vector4Array(len(self))
+        result.data[:, 0:3] = numpy.cross(self.data[:, 0:3], other.data[..., 0:3])
+        result.data[:, 3] = 0.0
+        
+        return result
+    
+    def length(self):
+        return numpy.sqrt(self.dot(self))
+    
+    def normalize(self):
+        lengths = self.length()
+        lengths[lengths == 0] = 1.0
+        self.data[:, 0:3] /= lengths[:, numpy.newaxis]
+        
+        return self
+    
+    def getXYZ(self):
+        return self.data[:, 0:3]
+    
+    def getCType(self):
+        """Returns a ctypes array of 4 * N floats sharing memory with this
+        block.
+        """
+        return (c_float * self.data.size).from_buffer(self.data)
+
+class Frustum(object):
+    """The six clip planes of a projection * view matrix, for culling
+    objects whose bounds lie entirely outside the view volume. A frustum
+    without a matrix culls nothing.
+    
+    Every bounding volume tested counts toward the current frame's totals;
+    beginFrame saves them as the last frame's (see getFrameStats).
+    
+    viewportHeight (in pixels) converts distances to screen sizes for level
+    of detail selection (see getPixelsPerUnit); GLWindow sets it to the
+    window's height.
+    """
+    def __init__(self, matrix=None):
+        self.planes = None
+        self.matrix = None
+        self.viewportHeight = 600
+        self.tested = 0
+        self.culled = 0
+        self.lastFrame = (0, 0)
+        
+        if matrix is not None:
+            self.setMatrix(matrix)
+    
+    def setMatrix(self, matrix):
+        """Extracts the planes of a Matrix4 (or (4, 4) array indexed as
+        [row, col]) mapping to clip space, normalized so that n . p + d is
+        the distance of point p inside each plane. None turns culling off.
+        """
+        if matrix is None:
+            self.planes = None
+            self.matrix = None
+            return
+        
+        m = numpy.asarray(getattr(matrix, 'data', matrix), dtype=numpy.float64)
+        self.matrix = m
+        planes = numpy.array([
+            m[3] + m[0], m[3] - m[0],
+            m[3] + m[1], m[3] - m[1],
+            m[3] + m[2], m[3] - m[2]])
+        self.planes = planes / numpy.linalg.norm(planes[:, 0:3], axis=1, keepdims=True)
+    
+    def isEnabled(self):
+        return self.planes is not None
+    
+    def beginFrame(self):
+        self.lastFrame = (self.culled, self.tested)
+        self.tested = 0
+        self.culled = 0
+    
+    def getFrameStats(self):
+        """Returns (culled, tested) bounding volume counts of the last frame.
+        """
+        return self.lastFrame
+    
+    def testBounds(self, matrices, centers, extents, radii):
+        """Returns a boolean array telling which of N bounding volumes are
+        at least partly inside the frustum. Volume i is a box of center
+        centers[i] and half extents extents[i] (N x 3 arrays), inside a
+        sphere of the same center and radius radii[i], placed by the rigid
+        transform matrices[i] (an (N, 4, 4) array indexed as [i, row, col]).
+        A volume is culled if either its box or its sphere lies entirely
+        outside one of the planes.
+        """
+        if self.planes is None:
+            return numpy.ones(len(matrices), dtype=bool)
+        
+        normals = self.planes[:, 0:3]
+        rotations = matrices[:, 0:3, 0:3]
+        worldCenters = numpy.einsum('nij,nj->ni', rotations, centers) + matrices[:, 0:3, 3]
+        distances = worldCenters @ normals.T + self.planes[:, 3]
+        
+        # how far the rotated box reaches along each plane normal
+        boxRadii = numpy.einsum('nkj,nj->nk', numpy.abs(numpy.einsum('ki,nij->nkj', normals, rotations)), extents)
+        reach = numpy.minimum(boxRadii, numpy.asarray(radii)[:, numpy.newaxis])
+        visible = (distances >= -reach).all(axis=1)
+        
+        self.tested += len(visible)
+        self.culled += len(visible) - int(numpy.count_nonzero(visible))
+        
+        return visible
+    
+    def getPixelsPerUnit(self, points):
+        """Returns how many pixels a unit length at each of the (N, 3) points
+        (in the space the matrix maps from) spans on screen, at most: the
+        matrix's vertical scale over the point's clip w, times half the
+        viewport height. Points at or behind the eye get infinity.
+        """
+        m = self.matrix
+        pixelScale = numpy.linalg.norm(m[1, 0:3]) * self.viewportHeight * 0.5
+        w = numpy.asarray(points, dtype=numpy.float64) @ m[3, 0:3] + m[3, 3]
+        
+        with numpy.errstate(divide='ignore'):
+            return numpy.where(w > 0, pixelScale / numpy.maximum(w, 1e-30), numpy.inf)
+
+def _normalized(x, y, z):
+    length = (x * x + y * y + z * z) ** 0.5
+    if length == 0:
+        return x, y, z
+    
+    return x / length, y / length, z / length
+
+def _normalizeRows(vectors):
+    """Returns the rows of an (n, 3) array scaled to unit length. Zero-length
+    rows are left as zero.
+    """
+    lengths = numpy.sqrt(numpy.einsum('ij,ij->i', vectors, vectors))
+    lengths[lengths == 0] = 1.0
+    
+    return vectors / lengths[:, numpy.newaxis]
+
+_CMatrix = c_float * 16
+
+_IDENTITY = numpy.identity(4, dtype=numpy.float32)
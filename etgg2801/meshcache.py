@@ -0,0 +1,130 @@
+# FILENAME: meshcache.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+import glob
+import hashlib
+import json
+import os
+import numpy
+
+class MeshCache(object):
+    """Binary cache of parsed mesh arrays for a single source file. Entries
+    are keyed by the SHA-1 of the source file's contents and a reader version
+    number, and are memory-mapped when loaded.
+    
+    File layout: an 8 byte magic string, a little-endian uint32 header length,
+    a JSON header, then the raw array data (each array 16 byte aligned).
+    
+    The format is not specific to meshes: other caches of arrays derived
+    from a file (see TextureManager) use it with their own extension.
+    """
+    MAGIC = b'ETGGMESH'
+    ALIGNMENT = 16
+    
+    @staticmethod
+    def hashFile(file):
+        """Returns the hex SHA-1 digest of the file's contents.
+        """
+        sha = hashlib.sha1()
+        with open(file, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(1 << 20), b''):
+                sha.update(chunk)
+        
+        return sha.hexdigest()
+    
+    def __init__(self, source, directory=None, version=0, extension='meshcache'):
+        """Creates the cache for source. Entries are stored next to the source
+        file unless a directory is given.
+        """
+        self.source = source
+        self.directory = directory or os.path.dirname(os.path.abspath(source))
+        self.version = version
+        self.extension = extension
+        self.key = MeshCache.hashFile(source)
+        self.path = os.path.join(self.directory, self.__entryName(self.key[:16]))
+        self.pattern = os.path.join(self.directory, self.__entryName('*', escape=True))
+    
+    def load(self):
+        """Returns (meta, arrays) from the cache entry, where arrays maps names
+        to read-only memory-mapped arrays. Returns None when the entry is
+        missing, stale, or unreadable.
+        """
+        if not os.path.exists(self.path):
+            return None
+        
+        try:
+            data = numpy.memmap(self.path, dtype=numpy.uint8, mode='r')
+            if bytes(data[:len(MeshCache.MAGIC)]) != MeshCache.MAGIC:
+                return None
+            
+            start = len(MeshCache.MAGIC) + 4
+            headerLength = int(data[len(MeshCache.MAGIC):start].view('<u4')[0])
+            header = json.loads(bytes(data[start:start + headerLength]).decode())
+        except (OSError, ValueError):
+            return None
+        
+        if header['key'] != self.key or header['version'] != self.version:
+            return None
+        
+        arrays = {}
+        for name, dtype, offset, count in header['arrays']:
+            dtype = numpy.dtype(dtype)
+            end = offset + count * dtype.itemsize
+            arrays[name] = data[offset:end].view(dtype)
+        
+        return header['meta'], arrays
+    
+    def store(self, meta, arrays):
+        """Writes a new cache entry holding meta (any JSON-compatible value)
+        and arrays (a dict of name to 1D array), then evicts stale entries.
+        """
+        arrays = [(name, numpy.ascontiguousarray(a).ravel()) for name, a in arrays.items()]
+        
+        # the header holds absolute offsets, so its length must be known
+        # before the offsets are; pad it to a fixed size after the first pass
+        table = [[name, a.dtype.str, 0, len(a)] for name, a in arrays]
+        header = {'key': self.key, 'version': self.version, 'meta': meta, 'arrays': table}
+        headerLength = len(json.dumps(header).encode()) + 32 * len(table) + 64
+        
+        offset = self.__align(len(MeshCache.MAGIC) + 4 + headerLength)
+        for entry, (name, a) in zip(table, arrays):
+            entry[2] = offset
+            offset = self.__align(offset + a.nbytes)
+        headerBytes = json.dumps(header).encode()
+        if len(headerBytes) > headerLength:
+            raise Exception("Mesh cache header too large!")
+        headerBytes = headerBytes.ljust(headerLength)
+        
+        tmpPath = self.path + '.tmp'
+        with open(tmpPath, 'wb') as fp:
+            fp.write(MeshCache.MAGIC)
+            fp.write(numpy.uint32(headerLength).astype('<u4').tobytes())
+            fp.write(headerBytes)
+            for entry, (name, a) in zip(table, arrays):
+                fp.write(b'\0' * (entry[2] - fp.tell()))
+                fp.write(a.tobytes())
+        os.replace(tmpPath, self.path)
+        
+        self.evict()
+    
+    def evict(self):
+        """Removes every cache entry for the source file other than the current
+        one.
+        """
+        for path in glob.glob(self.pattern):
+            if os.path.abspath(path) != os.path.abspath(self.path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+    
+    def __entryName(self, key, escape=False):
+        name = os.path.basename(self.source)
+        if escape:
+            name = glob.escape(name)
+        
+        return '%s.%s.%s' % (name, key, self.extension)
+    
+    def __align(self, offset):
+        return (offset + MeshCache.ALIGNMENT - 1) // MeshCache.ALIGNMENT * MeshCache.ALIGNMENT
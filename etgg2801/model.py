@@ -2,17 +2,52 @@
 # BY: Andrew Holbrook
 # DATE: 9/24/2015
 
+import collections
+import concurrent.futures
 import ctypes
+import mmap
+import os
+import numpy
 from OpenGL import GL
-from . import GLWindow, Vector4, Matrix4
+from .glstate import GLState
+from .matmath import _normalizeRows
+from .meshcache import MeshCache
+from .simplify import MeshSimplifier
 
 class Model(object):
     """Class for representing a Wavefront OBJ object.
+    
+    GL state is changed through GLState, and the render methods leave the
+    model's vertex array bound, so drawing the same model again skips the
+    bind.
+    
+    A model can carry simplified levels of detail of its parts (see
+    generateLODs), which renderParts and renderPartsMulti draw in place of
+    the full parts when given levels (see selectLevels).
     """
+    PART_INDEX_LOCATION = 3
+    INSTANCE_TRANSFORM_LOCATION = 4
+    
+    # fractions of each part's triangles kept by the levels of detail
+    LOD_RATIOS = (0.5, 0.25, 0.125)
+    
+    # the largest error, in pixels, selectLevels lets a level show
+    LOD_PIXEL_ERROR = 1.0
+    
+    # how many part and level combinations renderPartsMulti keeps the draw
+    # arguments of; culling and level selection make new ones every frame
+    MULTI_DRAW_CACHE_SIZE = 32
+    
     def __init__(self):
         self.parts = []
+        self.partIndices = {}
         self.normals = []
         self.num_indices = 0
+        self.drawRanges = []
+        self.bounds = None
+        self.partBounds = {}
+        self.lodDrawRanges = []
+        self.lodErrors = None
     
     def __str__(self):
         return str(self.num_indices)
@@ -27,169 +62,462 @@ class Model(object):
         return len(self.normals)
     
     def getOBJVertexList(self):
-        objVertexList = []
-        for p in self.parts:
-            objVertexList += p.vertices
-        
-        return objVertexList
+        return _concatenate([p.vertices for p in self.parts], numpy.float32)
     
     def getOBJUVList(self):
-        objUVList = []
-        for p in self.parts:
-            objUVList += p.uvs
-        
-        return objUVList
+        return _concatenate([p.uvs for p in self.parts], numpy.float32)
     
     def getVertexList(self):
-        vertexList = []
-        
-        objVertList = self.getOBJVertexList()
-        for i in self.getIndexList():
-            vertexList += objVertList[i * 3 : i * 3 + 3]
-        
-        return vertexList
+        objVertList = self.getOBJVertexList().reshape(-1, 3)
+        return objVertList[self.getIndexList()].ravel()
     
     def getUVList(self):
-        uvList = []
-        
-        objUVList = self.getOBJUVList()
-        for i in self.getUVIndexList():
-            uvList += objUVList[i * 2 : i * 2 + 2]
-        
-        return uvList
+        objUVList = self.getOBJUVList().reshape(-1, 2)
+        return objUVList[self.getUVIndexList()].ravel()
     
     def getIndexList(self):
-        tmpList = []
-        for p in self.parts:
-            tmpList += p.indices
-        
-        return tmpList
+        return _concatenate([p.indices for p in self.parts], numpy.uint32)
     
     def getUVIndexList(self):
-        tmpList = []
-        for p in self.parts:
-            tmpList += p.uvIndices
-        
-        return tmpList
+        return _concatenate([p.uvIndices for p in self.parts], numpy.uint32)
     
     def getNormalList(self):
         return self.normals
     
-    def generateNormals(self):
-        vertexList = self.getVertexList()
-        self.normals = []
-        for i in range(0, len(vertexList), 9):
-            v0 = Vector4(vertexList[i : i + 3])
-            v1 = Vector4(vertexList[i + 3 : i + 6])
-            v2 = Vector4(vertexList[i + 6 : i + 9])
-            
-            u = v1 - v0
-            v = v2 - v1
-            n = u.cross(v).normalize()
-            
-            self.normals += n.getXYZ() * 3
+    def generateNormals(self, creaseAngle=0.0):
+        """Generates a normal for every expanded vertex (three per triangle, in
+        the same order as getVertexList).
+        
+        A vertex's normal is the area-weighted average of the normals of the
+        faces sharing its position index, skipping faces whose normal differs
+        from the vertex's own face normal by more than creaseAngle degrees.
+        The default of 0 gives flat face normals.
+        """
+        triangles = self.getVertexList().reshape(-1, 3, 3).astype(numpy.float64)
+        
+        # cross products are twice the triangle areas, which gives the weights
+        faceNormals = numpy.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 1])
+        unitNormals = _normalizeRows(faceNormals)
+        
+        if creaseAngle <= 0:
+            self.normals = numpy.repeat(unitNormals, 3, axis=0).astype(numpy.float32).ravel()
+            return
+        
+        # pair every corner with every corner sharing its position index
+        positionIndices = self.getIndexList()
+        order = numpy.argsort(positionIndices, kind='stable')
+        sortedIndices = positionIndices[order]
+        counts = numpy.bincount(positionIndices)
+        groupSizes = counts[sortedIndices]
+        groupStarts = (numpy.cumsum(counts) - counts)[sortedIndices]
+        
+        corners = numpy.repeat(order, groupSizes)
+        pairOffsets = numpy.arange(len(corners)) - numpy.repeat(numpy.cumsum(groupSizes) - groupSizes, groupSizes)
+        partners = order[numpy.repeat(groupStarts, groupSizes) + pairOffsets]
+        
+        cornerFaces = corners // 3
+        partnerFaces = partners // 3
+        dots = numpy.einsum('ij,ij->i', unitNormals[cornerFaces], unitNormals[partnerFaces])
+        keep = dots >= numpy.cos(numpy.radians(creaseAngle)) - 1e-6
+        
+        normals = numpy.zeros((len(positionIndices), 3))
+        for k in range(3):
+            normals[:, k] = numpy.bincount(corners[keep], weights=faceNormals[partnerFaces[keep], k], minlength=len(positionIndices))
+        
+        self.normals = _normalizeRows(normals).astype(numpy.float32).ravel()
     
     def addPart(self, p):
+        self.partIndices.setdefault(p.name, len(self.parts))
         self.parts.append(p)
         self.num_indices += p.getNumIndices()
+        self.bounds = None
+        self.partBounds = {}
+        self.lodErrors = None
+    
+    def generateLODs(self, ratios=None):
+        """Builds levels of detail of every part with MeshSimplifier, one per
+        ratio (decreasing fractions of the part's triangles, Model.LOD_RATIOS
+        by default), and stores them in the parts' lods. Must be called
+        before loadToVRAM to be drawn.
+        """
+        if ratios is None:
+            ratios = Model.LOD_RATIOS
+        
+        positions = self.getOBJVertexList().reshape(-1, 3)
+        for p in self.parts:
+            triangles = numpy.asarray(p.indices, dtype=numpy.int64).reshape(-1, 3)
+            if len(triangles) == 0:
+                p.lods = []
+                continue
+            
+            levels = MeshSimplifier.simplify(positions, triangles, ratios)
+            p.lods = [(t.ravel().astype(numpy.uint32), error) for t, error in levels]
+        self.lodErrors = None
+    
+    def getNumLevels(self):
+        """Returns the number of levels of detail, counting the full parts.
+        """
+        return 1 + max([len(p.lods) for p in self.parts] + [0])
+    
+    def selectLevels(self, names, matrices, frustum):
+        """Returns the coarsest level of detail of each named part, placed by
+        the rigid transforms in matrices (an (..., N, 4, 4) array indexed as
+        [..., i, row, col] for N names), whose error spans at most
+        Model.LOD_PIXEL_ERROR pixels at the part's center as seen through
+        frustum (see Frustum.getPixelsPerUnit). The result is an (..., N)
+        integer array, or None when the model has no levels of detail or
+        frustum no matrix.
+        """
+        if self.lodErrors is None:
+            # one row per part, plus a last row for unknown names that is never simplified
+            self.lodErrors = numpy.full((len(self.parts) + 1, self.getNumLevels() - 1), numpy.inf)
+            for i, p in enumerate(self.parts):
+                self.lodErrors[i, :len(p.lods)] = [error for indices, error in p.lods]
+        
+        if self.lodErrors.shape[1] == 0 or frustum.matrix is None:
+            return None
+        
+        rows = [self.partIndices.get(name, len(self.parts)) for name in names]
+        centers = self.getPartBounds(names)[0]
+        eyeCenters = numpy.einsum('...ij,...j->...i', matrices[..., 0:3, 0:3], centers) + matrices[..., 0:3, 3]
+        pixelErrors = self.lodErrors[rows] * frustum.getPixelsPerUnit(eyeCenters)[..., numpy.newaxis]
+        
+        return (pixelErrors <= Model.LOD_PIXEL_ERROR).sum(axis=-1)
+    
+    def computeBounds(self):
+        """Computes each part's axis-aligned bounding box (boundsMin,
+        boundsMax) and bounding sphere (boundsCenter, the box's center, and
+        boundsRadius) from the vertices its faces use.
+        """
+        positions = self.getOBJVertexList().reshape(-1, 3)
+        for p in self.parts:
+            vertices = positions[numpy.asarray(p.indices, dtype=numpy.intp)]
+            if len(vertices) == 0:
+                vertices = numpy.zeros((1, 3), dtype=numpy.float32)
+            
+            p.boundsMin = vertices.min(axis=0)
+            p.boundsMax = vertices.max(axis=0)
+            p.boundsCenter = (p.boundsMin + p.boundsMax) * 0.5
+            offsets = vertices - p.boundsCenter
+            p.boundsRadius = float(numpy.sqrt(numpy.einsum('ij,ij->i', offsets, offsets).max()))
+        
+        # one row per part, plus a last row for unknown names that is never culled
+        self.bounds = (
+            numpy.array([p.boundsCenter for p in self.parts] + [(0, 0, 0)], dtype=numpy.float64),
+            numpy.array([(p.boundsMax - p.boundsMin) * 0.5 for p in self.parts] + [(numpy.inf,) * 3], dtype=numpy.float64),
+            numpy.array([p.boundsRadius for p in self.parts] + [numpy.inf], dtype=numpy.float64))
+        self.partBounds = {}
+    
+    def getPartBounds(self, names):
+        """Returns (centers, half extents, radii) arrays of the named parts'
+        bounds, one row per name, for Frustum.testBounds. Computes the bounds
+        if needed.
+        """
+        key = tuple(names)
+        bounds = self.partBounds.get(key)
+        if bounds is None:
+            if self.bounds is None:
+                self.computeBounds()
+            rows = [self.partIndices.get(name, len(self.parts)) for name in names]
+            bounds = tuple([b[rows] for b in self.bounds])
+            self.partBounds[key] = bounds
+        
+        return bounds
+    
+    def getPartIndex(self, name):
+        """Returns the index of the named part, or None if there is none.
+        """
+        return self.partIndices.get(name)
+    
+    def getDrawRange(self, name):
+        """Returns the (count, GL index type, byte offset, base vertex) used to
+        draw the named part. Only available after loadToVRAM.
+        """
+        return self.drawRanges[self.partIndices[name]]
     
     def cleanup(self):
-        GL.glDeleteBuffers(1, self.positionBuffer)
-        GL.glDeleteBuffers(1, self.colorBuffer)
-        GL.glDeleteBuffers(1, self.normalBuffer)
-        GL.glDeleteBuffers(1, self.indexBuffer)
-        GL.glDeleteVertexArrays(1, self.vertexArrayObject)
+        GLState.deleteBuffer(self.positionBuffer)
+        GLState.deleteBuffer(self.uvBuffer)
+        GLState.deleteBuffer(self.normalBuffer)
+        GLState.deleteBuffer(self.partIndexBuffer)
+        GLState.deleteBuffer(self.indexBuffer)
+        GLState.deleteVertexArray(self.vertexArrayObject)
+    
+    def buildIndexedBuffers(self):
+        """Welds identical (position, uv, normal) vertices within each part and
+        returns (positions, uvs, normals, indices, drawRanges, lodDrawRanges).
+        The first three are flat float32 arrays of the unique vertices, with
+        each part's vertices stored contiguously. indices is a byte string
+        holding each part's part-relative indices, as uint16 when the part has
+        at most 65536 unique vertices and as uint32 otherwise. drawRanges
+        holds a (count, GL index type, byte offset, base vertex) tuple per
+        part. Parts without uv indices get (0, 0) uvs.
+        
+        The triangles of each part's levels of detail (see generateLODs) are
+        welded into the part's vertices and follow its indices. Their corners
+        take the first uv the part uses with their position and flat face
+        normals. lodDrawRanges holds a list per part of the draw range of
+        every level, the full part's first.
+        """
+        positions = self.getVertexList().reshape(-1, 3)
+        normals = numpy.asarray(self.getNormalList(), dtype=numpy.float32).reshape(-1, 3)
+        objUVList = self.getOBJUVList().reshape(-1, 2)
+        objPositions = self.getOBJVertexList().reshape(-1, 3)
+        
+        vertexBlocks = []
+        indexBlocks = []
+        drawRanges = []
+        lodDrawRanges = []
+        first = 0
+        baseVertex = 0
+        byteOffset = 0
+        for p in self.parts:
+            count = p.getNumIndices()
+            uvs = numpy.zeros((count, 2), dtype=numpy.float32)
+            if p.getNumUVIndices() == count:
+                uvs = objUVList[numpy.asarray(p.uvIndices, dtype=numpy.uint32)]
+            
+            levels = [numpy.hstack((positions[first:first + count], uvs, normals[first:first + count]))]
+            if p.lods:
+                positionIndices, firstCorners = numpy.unique(numpy.asarray(p.indices, dtype=numpy.int64), return_index=True)
+                for lodIndices, error in p.lods:
+                    lodIndices = numpy.asarray(lodIndices, dtype=numpy.int64)
+                    corners = objPositions[lodIndices]
+                    triangles = corners.reshape(-1, 3, 3)
+                    faceNormals = _normalizeRows(numpy.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 1]))
+                    levels.append(numpy.hstack((
+                        corners,
+                        uvs[firstCorners[numpy.searchsorted(positionIndices, lodIndices)]],
+                        numpy.repeat(faceNormals, 3, axis=0).astype(numpy.float32))))
+            
+            vertices = numpy.concatenate(levels)
+            unique, firstSeen, inverse = numpy.unique(vertices, axis=0, return_index=True, return_inverse=True)
+            
+            # keep unique vertices in order of first use for better locality
+            order = numpy.argsort(firstSeen)
+            remap = numpy.empty(len(order), dtype=numpy.int64)
+            remap[order] = numpy.arange(len(order))
+            indices = remap[inverse.ravel()]
+            
+            if len(unique) <= 65536:
+                indices = indices.astype(numpy.uint16)
+                indexType = GL.GL_UNSIGNED_SHORT
+            else:
+                indices = indices.astype(numpy.uint32)
+                indexType = GL.GL_UNSIGNED_INT
+            
+            # each level's indices start on a 4 byte boundary
+            vertexBlocks.append(unique[order])
+            levelRanges = []
+            levelStart = 0
+            for level in levels:
+                levelIndices = indices[levelStart:levelStart + len(level)]
+                indexBlocks.append(levelIndices.tobytes().ljust(-(-levelIndices.nbytes // 4) * 4, b'\0'))
+                levelRanges.append((len(level), indexType, byteOffset, baseVertex))
+                levelStart += len(level)
+                byteOffset += len(indexBlocks[-1])
+            drawRanges.append(levelRanges[0])
+            lodDrawRanges.append(levelRanges)
+            
+            first += count
+            baseVertex += len(unique)
+        
+        vertices = numpy.concatenate(vertexBlocks) if vertexBlocks else numpy.zeros((0, 8), dtype=numpy.float32)
+        
+        return (numpy.ascontiguousarray(vertices[:, 0:3]).ravel(),
+                numpy.ascontiguousarray(vertices[:, 3:5]).ravel(),
+                numpy.ascontiguousarray(vertices[:, 5:8]).ravel(),
+                b''.join(indexBlocks),
+                drawRanges,
+                lodDrawRanges)
     
     def loadToVRAM(self):
-        """Create the OpenGL objects for rendering this model.
+        """Create the OpenGL objects for rendering this model. Vertices are
+        welded per part (see buildIndexedBuffers) and drawn through an element
+        buffer.
+        
+        Besides position (location 0), uv (1), and normal (2), every vertex
+        carries the index of its part as an unsigned integer attribute at
+        location 3 (Model.PART_INDEX_LOCATION), which renderPartsMulti
+        relies on.
         """
+        positions, uvs, normals, indices, self.drawRanges, self.lodDrawRanges = self.buildIndexedBuffers()
+        
+        # keep the byte offsets as pointers so drawing needs no conversion
+        self.__lodDrawArgs = [[(count, indexType, ctypes.c_void_p(byteOffset), baseVertex)
+                               for count, indexType, byteOffset, baseVertex in levelRanges]
+                              for levelRanges in self.lodDrawRanges]
+        self.__drawArgs = [levelArgs[0] for levelArgs in self.__lodDrawArgs]
+        self.__multiDrawArgs = collections.OrderedDict()
+        self.__instancingEnabled = False
+        
+        baseVertices = [r[3] for r in self.drawRanges] + [len(positions) // 3]
+        partIndices = numpy.repeat(numpy.arange(len(self.parts), dtype=numpy.uint16), numpy.diff(baseVertices))
         
         # Create vertex array object to encapsulate the state needed to provide
         # vertex information.
         self.vertexArrayObject = GL.glGenVertexArrays(1)
-        GL.glBindVertexArray(self.vertexArrayObject)
+        GLState.bindVertexArray(self.vertexArrayObject)
         
         # postition vertex buffer object
         self.positionBuffer = GL.glGenBuffers(1)
-        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.positionBuffer)
-        
-        # read and copy vertex data to VRAM
-        vertexList = self.getVertexList()
-        c_vertexArray = ctypes.c_float * len(vertexList)
-        c_vertexArray = c_vertexArray(*vertexList)
-        del vertexList
-        
-        GL.glBufferData(GL.GL_ARRAY_BUFFER, c_vertexArray, GL.GL_STATIC_DRAW)
-        del c_vertexArray
+        GLState.bindBuffer(GL.GL_ARRAY_BUFFER, self.positionBuffer)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, positions, GL.GL_STATIC_DRAW)
         
         # position data is associated with location 0
         GL.glVertexAttribPointer(0, 3, GL.GL_FLOAT, False, 0, None)
         
-        # color vertex buffer object
+        # uv vertex buffer object
         self.uvBuffer = GL.glGenBuffers(1)
-        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.uvBuffer)
-        
-        uvList = self.getUVList()
-        uv = ctypes.c_float * len(uvList)
-        uv = uv(*uvList)
-        del uvList
-        
-        GL.glBufferData(GL.GL_ARRAY_BUFFER, uv, GL.GL_STATIC_DRAW)
-        del uv
+        GLState.bindBuffer(GL.GL_ARRAY_BUFFER, self.uvBuffer)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, uvs, GL.GL_STATIC_DRAW)
         
         GL.glVertexAttribPointer(1, 2, GL.GL_FLOAT, False, 0, None)
         
         self.normalBuffer = GL.glGenBuffers(1)
-        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.normalBuffer)
+        GLState.bindBuffer(GL.GL_ARRAY_BUFFER, self.normalBuffer)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, normals, GL.GL_STATIC_DRAW)
         
-        normalList = self.getNormalList()
-        c_normals = ctypes.c_float * len(normalList)
-        c_normals = c_normals(*normalList)
-        del normalList
+        GL.glVertexAttribPointer(2, 3, GL.GL_FLOAT, False, 0, None)
         
-        GL.glBufferData(GL.GL_ARRAY_BUFFER, c_normals, GL.GL_STATIC_DRAW)
-        del c_normals
+        self.partIndexBuffer = GL.glGenBuffers(1)
+        GLState.bindBuffer(GL.GL_ARRAY_BUFFER, self.partIndexBuffer)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, partIndices, GL.GL_STATIC_DRAW)
         
-        GL.glVertexAttribPointer(2, 3, GL.GL_FLOAT, False, 0, None)
+        GL.glVertexAttribIPointer(Model.PART_INDEX_LOCATION, 1, GL.GL_UNSIGNED_SHORT, 0, None)
+        
+        # element buffer object, its binding is recorded in the VAO
+        self.indexBuffer = GL.glGenBuffers(1)
+        GLState.bindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self.indexBuffer)
+        GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, len(indices), indices, GL.GL_STATIC_DRAW)
         
         GL.glEnableVertexAttribArray(0)
         GL.glEnableVertexAttribArray(1)
         GL.glEnableVertexAttribArray(2)
+        GL.glEnableVertexAttribArray(Model.PART_INDEX_LOCATION)
         
-        GL.glBindVertexArray(0)
+        GLState.bindVertexArray(0)
     
     def renderPartByIndex(self, index):
-        GL.glBindVertexArray(self.vertexArrayObject)
-        
-        offset = 0
-        for i in range(0, index):
-            offset += self.parts[i].getNumIndices()
-        
-        c_offset = ctypes.c_void_p(offset * ctypes.sizeof(ctypes.c_uint))
-        GL.glDrawElements(GL.GL_TRIANGLES, self.parts[index].getNumIndices(), GL.GL_UNSIGNED_INT, c_offset)
-        
-        GL.glBindVertexArray(0)
+        GLState.bindVertexArray(self.vertexArrayObject)
         
+        GL.glDrawElementsBaseVertex(GL.GL_TRIANGLES, *self.__drawArgs[index])
+    
     def renderPartByName(self, name):
-        GL.glBindVertexArray(self.vertexArrayObject)
+        index = self.partIndices.get(name)
+        if index is not None:
+            self.renderPartByIndex(index)
+    
+    def renderParts(self, names, modelview_loc=None, matrices=None, levels=None):
+        """Draws the named parts with a single VAO bind. If matrices is given,
+        matrices[i] (anything glUniformMatrix4fv accepts) is uploaded to
+        modelview_loc before names[i] is drawn. If levels is given, names[i]
+        is drawn at level of detail levels[i] (0 for the full part, see
+        selectLevels). Unknown names are skipped.
+        """
+        GLState.bindVertexArray(self.vertexArrayObject)
         
-        offset = 0
-        for p in self.parts:
-            if p.name == name:
-                c_offset = ctypes.c_void_p(offset * ctypes.sizeof(ctypes.c_uint))
-                GL.glDrawElements(GL.GL_TRIANGLES, p.getNumIndices(), GL.GL_UNSIGNED_INT, c_offset)
-                break
+        for i, name in enumerate(names):
+            index = self.partIndices.get(name)
+            if index is None:
+                continue
             
-            offset += p.getNumIndices()
-        
-        GL.glBindVertexArray(0)
+            if matrices is not None:
+                GLState.uniformMatrix4fv(modelview_loc, 1, False, matrices[i])
+            if levels is None:
+                GL.glDrawElementsBaseVertex(GL.GL_TRIANGLES, *self.__drawArgs[index])
+            else:
+                GL.glDrawElementsBaseVertex(GL.GL_TRIANGLES, *self.__lodDrawArgs[index][levels[i]])
+    
+    def renderPartsMulti(self, names, levels=None):
+        """Draws the named parts (at the levels of detail in levels, if
+        given, as with renderParts) with one glMultiDrawElementsBaseVertex
+        call per index type (at most two), whatever the number of parts. The
+        vertex shader tells the parts apart by the part index attribute (see
+        loadToVRAM), e.g. to pick a per-part transform:
+        
+            layout (location = 3) in uint PartIndex;
+            uniform mat4 partTransforms[MAX_PARTS];
+            ...
+            mat4 modelview = partTransforms[PartIndex];
+        """
+        key = tuple(names) if levels is None else (tuple(names), tuple(levels))
+        multiDrawArgs = self.__multiDrawArgs.get(key)
+        if multiDrawArgs is None:
+            multiDrawArgs = self.__buildMultiDrawArgs(names, levels)
+            self.__multiDrawArgs[key] = multiDrawArgs
+            if len(self.__multiDrawArgs) > Model.MULTI_DRAW_CACHE_SIZE:
+                self.__multiDrawArgs.popitem(last=False)
+        else:
+            self.__multiDrawArgs.move_to_end(key)
+        
+        GLState.bindVertexArray(self.vertexArrayObject)
+        
+        for indexType, counts, offsets, baseVertices in multiDrawArgs:
+            GL.glMultiDrawElementsBaseVertex(GL.GL_TRIANGLES, counts, indexType, offsets, len(counts), baseVertices)
+    
+    def renderPartsInstanced(self, names, instanceCount, instanceBuffer, stride, offsets):
+        """Draws each named part instanceCount times (or instanceCount[k]
+        times for names[k], if it is a sequence) with one
+        glDrawElementsInstancedBaseVertex call per part. The transforms come
+        from instanceBuffer (a GL buffer object of column-major mat4s): the
+        transform of instance i of names[k] starts at byte
+        offsets[k] + i * stride. The vertex shader receives it as a mat4
+        attribute at location 4 (Model.INSTANCE_TRANSFORM_LOCATION):
+        
+            layout (location = 4) in mat4 InstanceTransform;
+        """
+        GLState.bindVertexArray(self.vertexArrayObject)
+        GLState.bindBuffer(GL.GL_ARRAY_BUFFER, instanceBuffer)
+        
+        # a mat4 attribute takes four consecutive vec4 locations
+        location = Model.INSTANCE_TRANSFORM_LOCATION
+        if not self.__instancingEnabled:
+            for column in range(4):
+                GL.glEnableVertexAttribArray(location + column)
+                GL.glVertexAttribDivisor(location + column, 1)
+            self.__instancingEnabled = True
+        
+        counts = numpy.broadcast_to(instanceCount, (len(names),)).tolist()
+        for name, offset, count in zip(names, offsets, counts):
+            index = self.partIndices.get(name)
+            if index is None or count == 0:
+                continue
+            
+            for column in range(4):
+                GL.glVertexAttribPointer(location + column, 4, GL.GL_FLOAT, False, stride, ctypes.c_void_p(offset + 16 * column))
+            
+            numIndices, indexType, byteOffset, baseVertex = self.__drawArgs[index]
+            GL.glDrawElementsInstancedBaseVertex(GL.GL_TRIANGLES, numIndices, indexType, byteOffset, count, baseVertex)
+    
+    def __buildMultiDrawArgs(self, names, levels=None):
+        """Returns (index type, counts, offsets, base vertices) ctypes arrays
+        for the named parts, grouped by index type.
+        """
+        groups = {}
+        for i, name in enumerate(names):
+            index = self.partIndices.get(name)
+            if index is not None:
+                level = 0 if levels is None else levels[i]
+                count, indexType, byteOffset, baseVertex = self.lodDrawRanges[index][level]
+                groups.setdefault(indexType, []).append((count, byteOffset, baseVertex))
+        
+        multiDrawArgs = []
+        for indexType, ranges in groups.items():
+            counts, offsets, baseVertices = zip(*ranges)
+            multiDrawArgs.append((
+                indexType,
+                (ctypes.c_int * len(counts))(*counts),
+                (ctypes.c_void_p * len(offsets))(*offsets),
+                (ctypes.c_int * len(baseVertices))(*baseVertices)))
+        
+        return multiDrawArgs
     
     def renderAllParts(self):
-        GL.glBindVertexArray(self.vertexArrayObject)
-        
-        GL.glDrawArrays(GL.GL_TRIANGLES, 0, self.getNumIndices())
+        GLState.bindVertexArray(self.vertexArrayObject)
         
-        GL.glBindVertexArray(0)
+        for args in self.__drawArgs:
+            GL.glDrawElementsBaseVertex(GL.GL_TRIANGLES, *args)
 
 class ModelPart(object):
     """Represents a part (object) from the obj file.
@@ -200,6 +528,16 @@ class ModelPart(object):
         self.indices = []
         self.uvs = []
         self.uvIndices = []
+        
+        # [(flat position indices, error)] per level of detail, set by
+        # Model.generateLODs
+        self.lods = []
+        
+        # set by Model.computeBounds
+        self.boundsMin = None
+        self.boundsMax = None
+        self.boundsCenter = None
+        self.boundsRadius = None
     
     def getNumIndices(self):
         return len(self.indices)
@@ -207,26 +545,179 @@ class ModelPart(object):
     def getNumUVIndices(self):
         return len(self.uvIndices)
     
+    def hasGeometry(self):
+        return len(self.vertices) > 0 or len(self.indices) > 0
+    
     def setName(self, name):
         self.name = name
     
     def addVertex(self, v):
+        self.vertices = _asList(self.vertices)
         self.vertices.append(v)
     
     def addIndex(self, i):
+        self.indices = _asList(self.indices)
         self.indices.append(i)
     
     def addUV(self, uv):
+        self.uvs = _asList(self.uvs)
         self.uvs.append(uv)
     
     def addUVIndex(self, uvIndex):
+        self.uvIndices = _asList(self.uvIndices)
         self.uvIndices.append(uvIndex)
+    
+    def extend(self, other):
+        """Appends the vertex, index, uv, and uv index lists of another part to
+        this part's lists.
+        """
+        self.setData(
+            _concatenate([self.vertices, other.vertices], numpy.float32),
+            _concatenate([self.indices, other.indices], numpy.uint32),
+            _concatenate([self.uvs, other.uvs], numpy.float32),
+            _concatenate([self.uvIndices, other.uvIndices], numpy.uint32))
+    
+    def setData(self, vertices, indices, uvs, uvIndices):
+        """Replaces the part's vertex, index, uv, and uv index lists (flat
+        sequences or arrays) in one call.
+        """
+        self.vertices = vertices
+        self.indices = indices
+        self.uvs = uvs
+        self.uvIndices = uvIndices
+
+def _faceLayout(faces):
+    """Returns (slashes, double slashes) per vertex reference of the
+    whitespace-separated references in faces, or None if the references do
+    not all share the same layout.
+    """
+    data = numpy.frombuffer(faces, dtype=numpy.uint8)
+    
+    # references are runs of non-whitespace bytes
+    isReference = data > ord(' ')
+    starts = numpy.flatnonzero(isReference[1:] > isReference[:-1]) + 1
+    if len(data) > 0 and isReference[0]:
+        starts = numpy.concatenate(([0], starts))
+    if len(starts) == 0:
+        return 0, 0
+    
+    isSlash = data == ord('/')
+    isDoubleSlash = isSlash & numpy.append(isSlash[1:], False)
+    slashes = numpy.add.reduceat(isSlash, starts, dtype=numpy.int32)
+    doubleSlashes = numpy.add.reduceat(isDoubleSlash, starts, dtype=numpy.int32)
+    
+    if (slashes != slashes[0]).any() or (doubleSlashes != doubleSlashes[0]).any():
+        return None
+    
+    return int(slashes[0]), int(doubleSlashes[0])
+
+def _findObjectLine(data, start=0):
+    """Returns the offset of the first 'o' statement ('o' and whitespace at
+    the start of a line) in data at or after start, or -1 if there is none.
+    """
+    if start == 0 and data[:1] == b'o' and data[1:2] in (b' ', b'\t'):
+        return 0
+    
+    pos = data.find(b'\no', start)
+    while pos >= 0:
+        if data[pos + 2:pos + 3] in (b' ', b'\t'):
+            return pos + 1
+        pos = data.find(b'\no', pos + 2)
+    
+    return -1
+
+def _statementArguments(lines, keyword):
+    """Returns the rest of each byte line whose first token is keyword, e.g.
+    the coordinates of the 'v' lines. Any whitespace may follow the keyword.
+    """
+    n = len(keyword)
+    
+    return [l[n:] for l in lines if l[:n] == keyword and l[n:n + 1] in (b' ', b'\t')]
+
+def _asList(values):
+    """Returns values as a list that can be appended to. Parts read by
+    OBJReader hold arrays, which are copied into a list on the first append.
+    """
+    if isinstance(values, list):
+        return values
+    
+    return numpy.asarray(values).tolist()
+
+def _concatenate(arrays, dtype):
+    """Joins a list of flat sequences into a single array of type dtype.
+    """
+    if not arrays:
+        return numpy.zeros(0, dtype=dtype)
+    
+    return numpy.concatenate([numpy.asarray(a, dtype=dtype) for a in arrays])
 
 class OBJReader(object):
     
+    # bump whenever the parsed output changes so stale mesh caches are rebuilt
+    VERSION = 3
+    
+    # name of the part holding any geometry before the first 'o' statement
+    DEFAULT_PART_NAME = 'default'
+    
+    @staticmethod
+    def readFile(file, cache=None, workers=1, lods=False):
+        """Reads an .obj file and returns the data as a Model object. Each 'o'
+        block is tokenized at once and each part's data is stored as flat NumPy
+        arrays.
+        
+        If cache is True, the parsed arrays are kept in a binary MeshCache
+        file next to the .obj file (or in the directory named by cache) and
+        later calls memory-map them instead of parsing.
+        
+        If workers is greater than 1, the file is parsed by that many processes
+        (see readPartsParallel).
+        
+        If lods is True (or a sequence of ratios), levels of detail are
+        generated for every part (see Model.generateLODs). They are kept in
+        the cache with the parsed arrays, and only regenerated when the
+        ratios change.
+        """
+        ratios = ()
+        if lods:
+            ratios = Model.LOD_RATIOS if lods is True else tuple(lods)
+        
+        meshCache = None
+        if cache:
+            meshCache = MeshCache(file, None if cache is True else cache, OBJReader.VERSION)
+            model, cachedRatios = OBJReader._readCache(meshCache)
+            if model is not None:
+                model.computeBounds()
+                if not ratios:
+                    for p in model.parts:
+                        p.lods = []
+                elif cachedRatios != list(ratios):
+                    model.generateLODs(ratios)
+                    OBJReader._writeCache(meshCache, model, ratios)
+                return model
+        
+        if workers > 1:
+            parts = OBJReader.readPartsParallel(file, workers)
+        else:
+            parts = OBJReader.iterParts(file)
+        
+        model = Model()
+        for part in parts:
+            model.addPart(part)
+        
+        model.generateNormals()
+        model.computeBounds()
+        if ratios:
+            model.generateLODs(ratios)
+        
+        if meshCache:
+            OBJReader._writeCache(meshCache, model, ratios)
+        
+        return model
+    
     @staticmethod
-    def readFile(file):
-        """Reads an .obj file and returns the data as a Model object.
+    def readFileByLine(file):
+        """Reads an .obj file and returns the data as a Model object, parsing
+        one line at a time (slower than readFile).
         """
         model = Model()
         currentPart = None
@@ -234,6 +725,10 @@ class OBJReader(object):
         fp = open(file)
         
         for line in fp:
+            if currentPart == None and (line[0:2] in ('v ', 'vt') or line[0] == 'f'):
+                currentPart = ModelPart()
+                currentPart.setName(OBJReader.DEFAULT_PART_NAME)
+            
             if line[0:2] == 'v ':
                 verts = line.split()
                 for i in range(1, len(verts)):
@@ -247,7 +742,7 @@ class OBJReader(object):
                 for i in range(1, len(indices)):
                     tmpIndex = indices[i].split('/')
                     currentPart.addIndex(int(tmpIndex[0]) - 1)
-                    if len(tmpIndex) > 1:
+                    if len(tmpIndex) > 1 and tmpIndex[1]:
                         currentPart.addUVIndex(int(tmpIndex[1]) - 1)
             elif line[0] == 'o':
                 if currentPart == None:
@@ -264,5 +759,225 @@ class OBJReader(object):
             model.addPart(currentPart)
         
         model.generateNormals()
+        model.computeBounds()
+        
+        return model
+    
+    @staticmethod
+    def _readCache(meshCache):
+        """Returns (model, LOD ratios) stored in meshCache, or (None, None) if
+        the cache entry is missing or stale.
+        """
+        entry = meshCache.load()
+        if entry is None:
+            return None, None
+        
+        meta, arrays = entry
+        model = Model()
+        for i, name in enumerate(meta['names']):
+            part = ModelPart()
+            part.setName(name)
+            part.setData(
+                arrays['%d.vertices' % i],
+                arrays['%d.indices' % i],
+                arrays['%d.uvs' % i],
+                arrays['%d.uvIndices' % i])
+            part.lods = [(arrays['%d.lod%d' % (i, k)], error) for k, error in enumerate(meta['lodErrors'][i])]
+            model.addPart(part)
+        model.normals = arrays['normals']
+        
+        return model, meta['lodRatios']
+    
+    @staticmethod
+    def _writeCache(meshCache, model, ratios=()):
+        """Stores the parts, normals, and levels of detail (generated with
+        ratios) of model in meshCache.
+        """
+        arrays = {'normals': numpy.asarray(model.getNormalList(), dtype=numpy.float32)}
+        for i, p in enumerate(model.parts):
+            arrays['%d.vertices' % i] = numpy.asarray(p.vertices, dtype=numpy.float32)
+            arrays['%d.indices' % i] = numpy.asarray(p.indices, dtype=numpy.uint32)
+            arrays['%d.uvs' % i] = numpy.asarray(p.uvs, dtype=numpy.float32)
+            arrays['%d.uvIndices' % i] = numpy.asarray(p.uvIndices, dtype=numpy.uint32)
+            for k, (indices, error) in enumerate(p.lods):
+                arrays['%d.lod%d' % (i, k)] = numpy.asarray(indices, dtype=numpy.uint32)
+        
+        meshCache.store({
+            'names': [p.name for p in model.parts],
+            'lodRatios': list(ratios),
+            'lodErrors': [[error for indices, error in p.lods] for p in model.parts]}, arrays)
+    
+    @staticmethod
+    def iterParts(file):
+        """Generator yielding a ModelPart for each 'o' block of an .obj file as
+        soon as the block has been parsed. The file is memory-mapped and only
+        one block is held in memory at a time, so memory use is bounded by the
+        largest part rather than the file size. Indices are left in the file's
+        global (0-based) index space, as with readFile. Geometry before the
+        first 'o' statement is yielded as a part named DEFAULT_PART_NAME.
+        """
+        fp = open(file, 'rb')
+        if os.fstat(fp.fileno()).st_size == 0:
+            fp.close()
+            return
+        
+        data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            for name, start, end in OBJReader._findParts(data):
+                part = OBJReader._parsePart(name, data[start:end].splitlines())
+                if name is None:
+                    # geometry before the first 'o' statement
+                    if not part.hasGeometry():
+                        continue
+                    part.setName(OBJReader.DEFAULT_PART_NAME)
+                
+                yield part
+                
+                # let the OS drop the pages of blocks already parsed
+                if hasattr(data, 'madvise') and hasattr(mmap, 'MADV_DONTNEED'):
+                    data.madvise(mmap.MADV_DONTNEED, 0, end - end % mmap.PAGESIZE)
+        finally:
+            data.close()
+            fp.close()
+    
+    @staticmethod
+    def readPartsParallel(file, workers=None):
+        """Parses an .obj file with a pool of worker processes and returns its
+        list of ModelParts, identical to the parts yielded by iterParts.
+        
+        The file is split into one byte range per worker at line boundaries.
+        A part whose lines cross a range boundary is parsed in pieces and the
+        pieces are joined in file order. Face indices in an .obj file are
+        global, so they need no adjustment when pieces are joined.
+        """
+        workers = workers or os.cpu_count() or 1
+        
+        fp = open(file, 'rb')
+        size = os.fstat(fp.fileno()).st_size
+        if size == 0:
+            fp.close()
+            return []
+        
+        data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        bounds = [0]
+        for i in range(1, workers):
+            pos = data.find(b'\n', max(size * i // workers, bounds[-1]))
+            bounds.append(size if pos < 0 else pos + 1)
+        bounds.append(size)
+        data.close()
+        fp.close()
+        
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            shards = pool.map(OBJReader._parseRange, [file] * workers, bounds[:-1], bounds[1:])
+            
+            parts = []
+            for shard in shards:
+                for part in shard:
+                    if part.name is not None:
+                        parts.append(part)
+                    elif parts:
+                        parts[-1].extend(part)
+                    elif part.hasGeometry():
+                        part.setName(OBJReader.DEFAULT_PART_NAME)
+                        parts.append(part)
+        
+        return parts
+    
+    @staticmethod
+    def _parseRange(file, start, end):
+        """Returns the list of ModelParts found in bytes [start, end) of file.
+        Lines before the range's first 'o' statement belong to the previous
+        range's last part and are returned as a part named None.
+        """
+        fp = open(file, 'rb')
+        fp.seek(start)
+        data = fp.read(end - start)
+        fp.close()
+        
+        return [OBJReader._parsePart(name, data[s:e].splitlines()) for name, s, e in OBJReader._findParts(data)]
+    
+    @staticmethod
+    def _findParts(data):
+        """Yields (name, start, end) for each 'o' block in data, where
+        data[start:end] holds the lines following the 'o' statement up to the
+        next one. Lines before the first 'o' statement are yielded first with
+        a name of None.
+        """
+        pos = _findObjectLine(data)
+        if pos < 0:
+            pos = len(data)
+        
+        if pos > 0:
+            yield None, 0, pos
+        
+        while pos < len(data):
+            lineEnd = data.find(b'\n', pos)
+            if lineEnd < 0:
+                lineEnd = len(data)
+            name = data[pos:lineEnd].split()[1].decode()
+            
+            nextPos = _findObjectLine(data, lineEnd)
+            if nextPos < 0:
+                yield name, lineEnd, len(data)
+                break
+            
+            yield name, lineEnd, nextPos
+            pos = nextPos
+    
+    @staticmethod
+    def _parsePart(name, lines):
+        """Builds a ModelPart from the byte lines of a single 'o' block.
+        """
+        part = ModelPart()
+        part.setName(name)
+        
+        vertices = b' '.join(_statementArguments(lines, b'v'))
+        uvs = b' '.join(_statementArguments(lines, b'vt'))
+        faces = _statementArguments(lines, b'f')
+        
+        indices, uvIndices = OBJReader._parseFaces(faces)
+        
+        part.setData(
+            numpy.fromstring(vertices, dtype=numpy.float32, sep=' '),
+            indices,
+            numpy.fromstring(uvs, dtype=numpy.float32, sep=' '),
+            uvIndices)
+        
+        return part
+    
+    @staticmethod
+    def _parseFaces(faces):
+        """Returns the (position indices, uv indices) arrays of the byte face
+        lines (without their 'f' keyword) of a single 'o' block.
+        
+        When every vertex reference has the same layout (v, v/vt, v//vn, or
+        v/vt/vn) all of them are converted at once. Otherwise each reference
+        is read separately: every reference adds a position index, and those
+        with a texture coordinate also add a uv index.
+        """
+        faces = b' '.join(faces)
+        layout = _faceLayout(faces)
+        if layout is None:
+            indices = []
+            uvIndices = []
+            for ref in faces.split():
+                fields = ref.split(b'/')
+                indices.append(int(fields[0]) - 1)
+                if len(fields) > 1 and fields[1]:
+                    uvIndices.append(int(fields[1]) - 1)
+            
+            return numpy.array(indices, dtype=numpy.uint32), numpy.array(uvIndices, dtype=numpy.uint32)
+        
+        slashes, doubleSlashes = layout
+        if doubleSlashes:
+            faces = faces.replace(b'//', b' ')
+        faces = faces.replace(b'/', b' ')
+        
+        refs = numpy.fromstring(faces, dtype=numpy.int64, sep=' ')
+        refs = refs.reshape(-1, slashes + 1 - doubleSlashes)
+        indices = (refs[:, 0] - 1).astype(numpy.uint32)
+        uvIndices = numpy.zeros(0, dtype=numpy.uint32)
+        if slashes and not doubleSlashes:
+            uvIndices = (refs[:, 1] - 1).astype(numpy.uint32)
         
-        return model
\ No newline at end of file
+        return indices, uvIndices
@@ -0,0 +1,124 @@
+# FILENAME: profiler.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+import contextlib
+import csv
+import json
+import time
+import numpy
+
+class FrameProfiler(object):
+    """Times the phases of each frame with the high-resolution performance
+    counter. Every named scope keeps its last historySize samples (in
+    seconds) in a ring buffer, from which percentiles and histograms are
+    computed.
+    
+    GLWindow records the scopes "events", "update" (one sample per fixed
+    update step), "render", "swap", and "frame". Delegates can time their
+    own code the same way:
+        
+        with GLWindow.getInstance().profiler.scope("culling"):
+            ...
+    """
+    PERCENTILES = (50, 95, 99)
+    
+    def __init__(self, historySize=1000):
+        self.historySize = historySize
+        self.samples = {}
+        self.counts = {}
+        self.numFrames = 0
+    
+    def record(self, name, seconds):
+        """Adds a sample to the named scope, creating the scope if needed.
+        """
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = numpy.zeros(self.historySize)
+            self.samples[name] = samples
+            self.counts[name] = 0
+        
+        samples[self.counts[name] % self.historySize] = seconds
+        self.counts[name] += 1
+    
+    @contextlib.contextmanager
+    def scope(self, name):
+        """Context manager recording the time spent in its block.
+        """
+        startTime = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - startTime)
+    
+    def endFrame(self):
+        self.numFrames += 1
+    
+    def reset(self):
+        self.samples = {}
+        self.counts = {}
+        self.numFrames = 0
+    
+    def getScopeNames(self):
+        return list(self.samples)
+    
+    def getSamples(self, name):
+        """Returns the recorded samples of a scope (seconds), oldest first.
+        """
+        count = self.counts.get(name, 0)
+        if count <= self.historySize:
+            return self.samples[name][:count].copy() if count else numpy.zeros(0)
+        
+        start = count % self.historySize
+        return numpy.concatenate((self.samples[name][start:], self.samples[name][:start]))
+    
+    def getHistogram(self, name, bins=20):
+        """Returns (counts, bin edges in milliseconds) of a scope's samples.
+        """
+        return numpy.histogram(self.getSamples(name) * 1000.0, bins=bins)
+    
+    def getStats(self):
+        """Returns {scope: statistics} over each scope's recorded samples,
+        with times in milliseconds: count (total samples ever recorded),
+        mean, min, max, p50, p95, and p99.
+        """
+        stats = {}
+        for name in self.samples:
+            samples = self.getSamples(name) * 1000.0
+            entry = {
+                'count': self.counts[name],
+                'mean': float(samples.mean()),
+                'min': float(samples.min()),
+                'max': float(samples.max())}
+            for p, value in zip(FrameProfiler.PERCENTILES, numpy.percentile(samples, FrameProfiler.PERCENTILES)):
+                entry['p%d' % p] = float(value)
+            stats[name] = entry
+        
+        return stats
+    
+    def getSummary(self):
+        """Returns a one-line summary: frames per second (from the mean frame
+        time) and the p50/p95/p99 of each scope.
+        """
+        stats = self.getStats()
+        parts = []
+        if 'frame' in stats and stats['frame']['mean'] > 0:
+            parts.append("FPS: %.1f" % (1000.0 / stats['frame']['mean']))
+        for name, entry in stats.items():
+            parts.append("%s %.2f/%.2f/%.2f ms" % (name, entry['p50'], entry['p95'], entry['p99']))
+        
+        return ", ".join(parts)
+    
+    def exportJSON(self, file):
+        with open(file, 'w') as fp:
+            json.dump({'frames': self.numFrames, 'scopes': self.getStats()}, fp, indent=2)
+    
+    def exportCSV(self, file):
+        """Writes one row of statistics per scope (see getStats).
+        """
+        columns = ['count', 'mean', 'min', 'max'] + ['p%d' % p for p in FrameProfiler.PERCENTILES]
+        with open(file, 'w', newline='') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(['scope'] + columns)
+            for name, entry in self.getStats().items():
+                writer.writerow([name] + [entry[c] for c in columns])
@@ -2,8 +2,9 @@
 # BY: Andrew Holbrook
 # DATE: 9/24/2015
 
-from OpenGL import GL
-from . import GLWindow, Vector4, Matrix4
+import numpy
+from . import GLWindow, Vector4, Matrix4, Matrix4Array
+from .glstate import GLState
 
 class Joint(object):
     """Base class for all joint types (prismatic, revolute, etc).
@@ -17,12 +18,13 @@ class Joint(object):
         self.value = 0.0
         self.velocity = 0.0
         self.axis = axis
-        self.offset = offset
+        self.offset = tuple(offset) + (0,) * (3 - len(offset))
         self.valueMin = 0.0
         self.valueMax = 0.0
         self.dfunc = self.increaseValue
-        
-        self.offsetMatrix = Matrix4.getTranslation(*offset)
+        self.quantization = 0.0
+        self.transformCache = {}
+        self.transformCacheSize = 0
     
     def increaseValue(self, dtime):
         """Increase the value (angle or distance) of the joint with respect to
@@ -45,20 +47,61 @@ class Joint(object):
         """
         self.valueMin = min
         self.valueMax = max
+    
+    def setQuantization(self, step, cacheSize=4096):
+        """Rounds the joint value to a multiple of step when building its
+        transformation, and memoizes up to cacheSize of the resulting
+        matrices. A step of 0 turns this off. Returned matrices are shared, so
+        they must not be modified.
+        """
+        self.quantization = step
+        self.transformCache = {}
+        self.transformCacheSize = cacheSize
+    
+    def getTransformation(self, value=None):
+        """Return the transformation matrix representing partB relative to partA,
+        at the given joint value (the current value by default).
+        """
+        if value is None:
+            value = self.value
+        
+        if not self.quantization:
+            return self.buildTransformation(value)
+        
+        key = round(value / self.quantization)
+        matrix = self.transformCache.get(key)
+        if matrix is None:
+            if len(self.transformCache) >= self.transformCacheSize:
+                self.transformCache.clear()
+            
+            matrix = self.buildTransformation(key * self.quantization)
+            self.transformCache[key] = matrix
+        
+        return matrix
+    
+    def buildTransformation(self, value):
+        """Return the transformation matrix for the given joint value.
+        """
+        raise Exception("MUST IMPLEMENT 'buildTransformation' METHOD!")
 
 class RevoluteJoint(Joint):
     """Class for representing a rotating joint with one degree of freedom.
     """
     def __init__(self, partA, partB, axis=(0,1,0), offset=(0,0,0)):
-        """See Joint class.
+        """See Joint class. The axis is normalized, and must not be zero.
         """
-        super().__init__(partA, partB, axis, offset)
+        length = sum([a * a for a in axis]) ** 0.5
+        if length == 0:
+            raise Exception("RevoluteJoint axis must not be zero!")
+        
+        super().__init__(partA, partB, tuple([a / length for a in axis]), offset)
     
-    def getTransformation(self):
-        """Return the transformation matrix representing partB relative to partA.
+    def buildTransformation(self, value):
+        """See Joint class. The rotation is value degrees about axis. (Joints
+        used to rotate by the Euler angles axis * value, which is the same
+        rotation only when axis is a coordinate axis.)
         """
-        angleList = [a * self.value for a in self.axis]
-        return self.offsetMatrix * Matrix4.getRotation(*angleList)
+        return Matrix4.getTranslationRotation(self.offset, self.axis, value)
 
 class PrismaticJoint(Joint):
     def __init__(self, partA, partB, axis=(0,1,0), offset=(0,0,0)):
@@ -66,11 +109,10 @@ class PrismaticJoint(Joint):
         """
         super().__init__(partA, partB, axis, offset)
     
-    def getTransformation(self):
-        """Return the transformation matrix representing partB relative to partA.
+    def buildTransformation(self, value):
+        """See Joint class. The translation is value units along axis.
         """
-        dList = [a * self.value for a in self.axis]
-        return self.offsetMatrix * Matrix4.getTranslation(*dList)
+        return Matrix4.getTranslation(*[o + a * value for o, a in zip(self.offset, self.axis)])
 
 class Robot(object):
     def __init__(self, model):
@@ -79,8 +121,13 @@ class Robot(object):
         self.position = Vector4()
         self.orientation = Vector4()
         
-        renderDelegate = GLWindow.getInstance().renderDelegate
-        self.modelview_loc = renderDelegate.modelview_loc
+        # looked up from the window's render delegate on first render
+        self.modelview_loc = None
+        self.partTransforms_loc = None
+        self.partTransforms = None
+        
+        # looked up from the window on first render (see GLWindow.frustum)
+        self.frustum = None
     
     def addJoint(self, joint):
         self.joints.append(joint)
@@ -92,20 +139,121 @@ class Robot(object):
         for j in self.joints:
             j.dfunc(dtime)
     
-    def render(self):
-        rotMatrix_ow = Matrix4.getRotation(*self.orientation.getXYZ())
-        tranMatrix_ow = Matrix4.getTranslation(*self.position.getXYZ())
+    def getStateSize(self):
+        return 6 + len(self.joints)
+    
+    def writeState(self, state):
+        """Copies the robot's position, orientation, and joint values into
+        state (a float array of getStateSize() entries), so that it can be
+        rendered from the copy while update keeps changing the robot (see
+        SimulationThread).
+        """
+        state[0:3] = self.position.getXYZ()
+        state[3:6] = self.orientation.getXYZ()
+        state[6:] = [j.value for j in self.joints]
+    
+    def getState(self, state=None):
+        """Returns (position, orientation, joint values) from a state written
+        by writeState, or from the robot itself if state is None.
+        """
+        if state is None:
+            return self.position.getXYZ(), self.orientation.getXYZ(), [j.value for j in self.joints]
+        
+        state = state.tolist()
+        return state[0:3], state[3:6], state[6:]
+    
+    def render(self, state=None):
+        """Renders the robot, or the robot as recorded in state (see
+        writeState). Links whose bounds are outside the frustum are skipped,
+        and the others drawn at the level of detail their distance allows
+        (see Model.selectLevels).
+        """
+        if self.modelview_loc is None:
+            self.modelview_loc = GLWindow.getInstance().renderDelegate.modelview_loc
+        if self.frustum is None:
+            self.frustum = GLWindow.getInstance().frustum
+        
+        position, orientation, values = self.getState(state)
+        rotMatrix_ow = Matrix4.getRotation(*orientation)
+        tranMatrix_ow = Matrix4.getTranslation(*position)
         
         # object to world matrix
         matrix_ow = tranMatrix_ow * rotMatrix_ow
-        GL.glUniformMatrix4fv(self.modelview_loc, 1, False, matrix_ow.getCType())
+        links = [matrix_ow]
+        parts = [self.joints[0].partA]
         
-        self.model.renderPartByName(self.joints[0].partA)
+        for j, value in zip(self.joints, values):
+            matrix_ow = matrix_ow * j.getTransformation(value)
+            links.append(matrix_ow)
+            parts.append(j.partB)
         
-        for j in self.joints:
-            matrix_ow *= j.getTransformation()
-            GL.glUniformMatrix4fv(self.modelview_loc, 1, False, matrix_ow.getCType())
-            self.model.renderPartByName(j.partB)
+        levels = None
+        if self.frustum.isEnabled():
+            matrices = numpy.array([m.data for m in links])
+            visible = self.cull(parts, matrices)
+            parts = [p for p, v in zip(parts, visible) if v]
+            links = [m for m, v in zip(links, visible) if v]
+            levels = self.model.selectLevels(parts, matrices[visible], self.frustum)
+            if levels is not None:
+                levels = levels.tolist()
+        
+        self.model.renderParts(parts, self.modelview_loc, [m.getCType() for m in links], levels)
+    
+    def cull(self, parts, matrices):
+        """Returns a list telling which of the named parts, placed by the
+        link transforms in matrices (an (N, 4, 4) array indexed as
+        [i, row, col]), are at least partly inside the frustum.
+        """
+        return self.frustum.testBounds(matrices, *self.model.getPartBounds(parts)).tolist()
+
+    def getPartNames(self):
+        """Returns the names of the robot's parts, base link first.
+        """
+        return [self.joints[0].partA] + [j.partB for j in self.joints]
+    
+    def renderMulti(self, state=None):
+        """Renders the robot (or its recorded state, see render) with a
+        single upload of every link transform and a single
+        Model.renderPartsMulti call, so the number of GL calls does not
+        depend on the number of links. The vertex shader must declare a
+        'partTransforms' mat4 array (one entry per model part, indexed by
+        the PartIndex attribute) and the render delegate must provide its
+        location as partTransforms_loc.
+        """
+        if self.partTransforms_loc is None:
+            self.partTransforms_loc = GLWindow.getInstance().renderDelegate.partTransforms_loc
+        if self.frustum is None:
+            self.frustum = GLWindow.getInstance().frustum
+        
+        if self.partTransforms is None:
+            self.partTransforms = Matrix4Array(self.model.getNumParts())
+            self.partNames = self.getPartNames()
+            self.partSlots = [self.model.getPartIndex(name) for name in self.partNames]
+        
+        # each link's transform goes in the slot of its part's model index
+        position, orientation, values = self.getState(state)
+        matrix_ow = Matrix4.getTranslation(*position) * Matrix4.getRotation(*orientation)
+        for i, slot in enumerate(self.partSlots):
+            if i > 0:
+                matrix_ow.imul(self.joints[i - 1].getTransformation(values[i - 1]))
+            if slot is not None:
+                self.partTransforms[slot] = matrix_ow
+        
+        names = self.partNames
+        levels = None
+        if self.frustum.isEnabled():
+            # parts missing from the model are not drawn anyway
+            slots = [slot for slot in self.partSlots if slot is not None]
+            present = [name for name, slot in zip(names, self.partSlots) if slot is not None]
+            matrices = self.partTransforms.data[slots]
+            visible = self.cull(present, matrices)
+            names = [name for name, v in zip(present, visible) if v]
+            levels = self.model.selectLevels(names, matrices[visible], self.frustum)
+            if levels is not None:
+                levels = levels.tolist()
+        
+        GLState.uniformMatrix4fv(self.partTransforms_loc, len(self.partTransforms), False, self.partTransforms.getBuffer())
+        self.model.renderPartsMulti(names, levels)
 
 class Scara(Robot):
     def __init__(self, model):
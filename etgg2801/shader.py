@@ -0,0 +1,207 @@
+# FILENAME: shader.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+import hashlib
+import os
+import numpy
+from OpenGL import GL
+from OpenGL.error import GLError
+from OpenGL.GL.ARB import parallel_shader_compile as ARBParallel
+from OpenGL.GL.KHR import parallel_shader_compile as KHRParallel
+from .glstate import GLState
+
+class ShaderProgram(object):
+    """A linked GLSL program built from vertex and fragment shader sources,
+    with cached uniform and attribute locations.
+    
+    Building is asynchronous: the constructor only starts compiling and
+    linking, and errors are checked the first time the program is needed
+    (use, getUniformLocation, ...) or when finish is called. Where
+    GL_KHR_parallel_shader_compile (or the ARB version) is available the
+    driver compiles on its own threads, so creating many programs before
+    using any of them does not stall; isReady polls without blocking.
+    
+    If cache is True, the linked program binary is stored in
+    ShaderProgram.CACHE_DIRECTORY (or in the directory named by cache),
+    keyed by the SHA-1 of the sources and the driver's vendor, renderer, and
+    version strings, and later runs load the binary instead of compiling.
+    """
+    CACHE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'etgg2801', 'shaders')
+    STAGES = ((GL.GL_VERTEX_SHADER, 'vertex'), (GL.GL_FRAGMENT_SHADER, 'fragment'))
+    
+    parallelCompile = None
+    
+    @staticmethod
+    def getParallelCompile():
+        """Returns the completion status query enum if the driver compiles
+        shaders in parallel, otherwise False. The first call (which needs a
+        current context) lets the driver pick the number of threads.
+        """
+        if ShaderProgram.parallelCompile is None:
+            ShaderProgram.parallelCompile = False
+            if KHRParallel.glInitParallelShaderCompileKHR():
+                KHRParallel.glMaxShaderCompilerThreadsKHR(0xFFFFFFFF)
+                ShaderProgram.parallelCompile = KHRParallel.GL_COMPLETION_STATUS_KHR
+            elif ARBParallel.glInitParallelShaderCompileARB():
+                ARBParallel.glMaxShaderCompilerThreadsARB(0xFFFFFFFF)
+                ShaderProgram.parallelCompile = ARBParallel.GL_COMPLETION_STATUS_ARB
+        
+        return ShaderProgram.parallelCompile
+    
+    @staticmethod
+    def getCacheKey(sources):
+        """Returns the hex SHA-1 of the shader sources and the current
+        driver's identification strings.
+        """
+        sha = hashlib.sha1()
+        for source in sources:
+            sha.update(source if isinstance(source, bytes) else source.encode())
+            sha.update(b'\0')
+        for name in (GL.GL_VENDOR, GL.GL_RENDERER, GL.GL_VERSION):
+            sha.update(GL.glGetString(name) or b'')
+            sha.update(b'\0')
+        
+        return sha.hexdigest()
+    
+    def __init__(self, vertexSource, fragmentSource, cache=None):
+        self.sources = (vertexSource, fragmentSource)
+        self.program = GL.glCreateProgram()
+        self.shaders = []
+        self.uniformLocations = {}
+        self.attributeLocations = {}
+        self.ready = False
+        
+        self.cachePath = None
+        if cache:
+            directory = ShaderProgram.CACHE_DIRECTORY if cache is True else cache
+            self.cachePath = os.path.join(directory, ShaderProgram.getCacheKey(self.sources) + '.shaderbin')
+            if self.__loadBinary():
+                self.ready = True
+                return
+        
+        ShaderProgram.getParallelCompile()
+        for (stage, name), source in zip(ShaderProgram.STAGES, self.sources):
+            shader = GL.glCreateShader(stage)
+            GL.glShaderSource(shader, source)
+            GL.glCompileShader(shader)
+            GL.glAttachShader(self.program, shader)
+            self.shaders.append((shader, name))
+        
+        if self.cachePath:
+            GL.glProgramParameteri(self.program, GL.GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL.GL_TRUE)
+        GL.glLinkProgram(self.program)
+    
+    def isReady(self):
+        """Returns True once the program is linked, without waiting for the
+        driver where it compiles in parallel (otherwise same as finish).
+        """
+        if self.ready:
+            return True
+        
+        status = ShaderProgram.getParallelCompile()
+        if status and not GL.glGetProgramiv(self.program, status):
+            return False
+        
+        self.finish()
+        return True
+    
+    def finish(self):
+        """Waits for the program to be linked and checks for errors.
+        """
+        if self.ready:
+            return
+        
+        if GL.glGetProgramiv(self.program, GL.GL_LINK_STATUS) != GL.GL_TRUE:
+            for shader, name in self.shaders:
+                if GL.glGetShaderiv(shader, GL.GL_COMPILE_STATUS) != GL.GL_TRUE:
+                    print(GL.glGetShaderInfoLog(shader))
+                    raise Exception("Error compiling %s shader" % name)
+            print(GL.glGetProgramInfoLog(self.program))
+            raise Exception("Error linking shader program")
+        
+        # the linked program keeps its own copy of the code
+        for shader, name in self.shaders:
+            GL.glDetachShader(self.program, shader)
+            GL.glDeleteShader(shader)
+        self.shaders = []
+        
+        if self.cachePath:
+            self.__storeBinary()
+        self.ready = True
+    
+    def use(self):
+        self.finish()
+        GLState.useProgram(self.program)
+    
+    def getUniformLocation(self, name):
+        location = self.uniformLocations.get(name)
+        if location is None:
+            self.finish()
+            location = GL.glGetUniformLocation(self.program, name if isinstance(name, bytes) else name.encode())
+            self.uniformLocations[name] = location
+        
+        return location
+    
+    def getAttributeLocation(self, name):
+        location = self.attributeLocations.get(name)
+        if location is None:
+            self.finish()
+            location = GL.glGetAttribLocation(self.program, name if isinstance(name, bytes) else name.encode())
+            self.attributeLocations[name] = location
+        
+        return location
+    
+    def cleanup(self):
+        for shader, name in self.shaders:
+            GL.glDeleteShader(shader)
+        self.shaders = []
+        GLState.deleteProgram(self.program)
+    
+    def __loadBinary(self):
+        """Links the program from the cached binary. Returns False if there
+        is none or the driver rejects it (e.g. its format is no longer
+        supported after a driver update), in which case the stale cache
+        file is deleted.
+        """
+        try:
+            data = numpy.fromfile(self.cachePath, dtype=numpy.uint8)
+        except OSError:
+            return False
+        
+        if len(data) >= 4:
+            binaryFormat = int(data[:4].view('<u4')[0])
+            binary = data[4:]
+            try:
+                GL.glProgramBinary(self.program, binaryFormat, binary, len(binary))
+                if GL.glGetProgramiv(self.program, GL.GL_LINK_STATUS) == GL.GL_TRUE:
+                    return True
+            except GLError:
+                pass
+        
+        try:
+            os.remove(self.cachePath)
+        except OSError:
+            pass
+        
+        return False
+    
+    def __storeBinary(self):
+        length = GL.glGetProgramiv(self.program, GL.GL_PROGRAM_BINARY_LENGTH)
+        if length <= 0:
+            return
+        
+        written = numpy.zeros(1, dtype=numpy.int32)
+        binaryFormat = numpy.zeros(1, dtype=numpy.uint32)
+        binary = numpy.empty(length, dtype=numpy.uint8)
+        GL.glGetProgramBinary(self.program, length, written, binaryFormat, binary)
+        
+        try:
+            os.makedirs(os.path.dirname(self.cachePath), exist_ok=True)
+            tmpPath = self.cachePath + '.tmp'
+            with open(tmpPath, 'wb') as fp:
+                fp.write(binaryFormat.astype('<u4').tobytes())
+                fp.write(binary[:written[0]].tobytes())
+            os.replace(tmpPath, self.cachePath)
+        except OSError:
+            pass
@@ -0,0 +1,169 @@
+# FILENAME: simplify.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+import numpy
+from .matmath import _normalizeRows
+
+class MeshSimplifier(object):
+    """Quadric error edge collapse (Garland and Heckbert) for building level
+    of detail chains. Every vertex accumulates the quadrics of the planes of
+    its faces (and of planes through boundary edges, which keeps open
+    borders in place), and the cheapest edges are collapsed, each onto one
+    of its existing endpoints, so the simplified triangles index the
+    original vertices.
+    
+    Collapses are applied in passes: a pass collapses every edge that is the
+    cheapest of all edges touching the triangles around its endpoints, so no
+    two collapses of a pass touch the same triangle and each pass is a few
+    NumPy operations. Collapses that would flip a triangle are refused.
+    """
+    # a pass collapses at most one edge per PASS_DIVISOR triangles
+    PASS_DIVISOR = 16
+    
+    @staticmethod
+    def simplify(positions, triangles, ratios):
+        """Returns [(triangles, error)] for each of the ratios (fractions of
+        the triangle count, decreasing): an (n, 3) array of indices into
+        positions (a (V, 3) array) and the error of that level, an upper
+        bound on the distance from the collapsed vertices to the planes of
+        the faces they replaced. A level that cannot reach its ratio
+        (because every remaining collapse would flip a triangle) keeps what
+        it has reached.
+        """
+        triangles = numpy.asarray(triangles, dtype=numpy.int64).reshape(-1, 3)
+        used, triangles = numpy.unique(triangles, return_inverse=True)
+        triangles = triangles.reshape(-1, 3)
+        points = numpy.asarray(positions, dtype=numpy.float64)[used]
+        
+        quadrics = MeshSimplifier.computeQuadrics(points, triangles)
+        blocked = numpy.zeros(0, dtype=numpy.int64)
+        error = 0.0
+        
+        levels = []
+        initialCount = len(triangles)
+        for ratio in ratios:
+            target = max(int(initialCount * ratio), 1)
+            while len(triangles) > target:
+                # an interior collapse removes two triangles; small passes
+                # keep expensive collapses that happen to be locally
+                # cheapest from running ahead of cheaper ones elsewhere
+                maxCollapses = min((len(triangles) - target + 1) // 2, max(len(triangles) // MeshSimplifier.PASS_DIVISOR, 1))
+                triangles, passError, blocked = MeshSimplifier.collapsePass(points, triangles, quadrics, blocked, maxCollapses)
+                if passError is None:
+                    break
+                error = max(error, passError)
+            
+            levels.append((used[triangles], error))
+        
+        return levels
+    
+    @staticmethod
+    def computeQuadrics(points, triangles):
+        """Returns the (V, 4, 4) quadrics of the vertices: the sums of the
+        squared distance matrices of the planes of their faces and of the
+        planes perpendicular to their faces through their boundary edges.
+        """
+        corners = points[triangles]
+        normals = _normalizeRows(numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0]))
+        planes = numpy.hstack((normals, -numpy.einsum('ij,ij->i', normals, corners[:, 0])[:, numpy.newaxis]))
+        
+        quadrics = numpy.zeros((len(points), 4, 4))
+        faceQuadrics = numpy.einsum('ni,nj->nij', planes, planes)
+        for k in range(3):
+            numpy.add.at(quadrics, triangles[:, k], faceQuadrics)
+        
+        # edges used by a single triangle are on the boundary
+        edges = numpy.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+        faces = numpy.tile(numpy.arange(len(triangles)), 3)
+        unique, inverse, counts = numpy.unique(_getEdgeKeys(triangles, len(points)), return_inverse=True, return_counts=True)
+        boundary = counts[inverse] == 1
+        if boundary.any():
+            edges = edges[boundary]
+            starts = points[edges[:, 0]]
+            borderNormals = _normalizeRows(numpy.cross(points[edges[:, 1]] - starts, normals[faces[boundary]]))
+            borderPlanes = numpy.hstack((borderNormals, -numpy.einsum('ij,ij->i', borderNormals, starts)[:, numpy.newaxis]))
+            borderQuadrics = numpy.einsum('ni,nj->nij', borderPlanes, borderPlanes)
+            for k in range(2):
+                numpy.add.at(quadrics, edges[:, k], borderQuadrics)
+        
+        return quadrics
+    
+    @staticmethod
+    def collapsePass(points, triangles, quadrics, blocked, maxCollapses):
+        """Collapses up to maxCollapses edges, cheapest first, updating
+        quadrics in place. blocked holds the (source * V + destination) keys
+        of collapses refused before. Returns (triangles, error, blocked),
+        where error is the largest error of the pass (0.0 if every collapse
+        it selected was refused and added to blocked), or None if every
+        remaining collapse is blocked.
+        """
+        numPoints = len(points)
+        edges = numpy.unique(_getEdgeKeys(triangles, numPoints))
+        edges = numpy.stack((edges // numPoints, edges % numPoints), axis=1)
+        
+        # the cost of moving a onto b is b^T (Qa + Qb) b; keep the cheaper direction
+        combined = quadrics[edges[:, 0]] + quadrics[edges[:, 1]]
+        homogeneous = numpy.hstack((points, numpy.ones((numPoints, 1))))
+        toSecond = numpy.einsum('ni,nij,nj->n', homogeneous[edges[:, 1]], combined, homogeneous[edges[:, 1]])
+        toFirst = numpy.einsum('ni,nij,nj->n', homogeneous[edges[:, 0]], combined, homogeneous[edges[:, 0]])
+        forward = toSecond <= toFirst
+        sources = numpy.where(forward, edges[:, 0], edges[:, 1])
+        destinations = numpy.where(forward, edges[:, 1], edges[:, 0])
+        costs = numpy.maximum(numpy.minimum(toSecond, toFirst), 0.0)
+        
+        allowed = ~numpy.isin(sources * numPoints + destinations, blocked)
+        if not allowed.any():
+            return triangles, None, blocked
+        sources, destinations, costs = sources[allowed], destinations[allowed], costs[allowed]
+        
+        # an edge is collapsed if no edge touching a triangle around either
+        # endpoint is cheaper (ranks break ties)
+        ranks = numpy.empty(len(costs), dtype=numpy.int64)
+        ranks[numpy.argsort(costs, kind='stable')] = numpy.arange(len(costs))
+        vertexMin = numpy.full(numPoints, len(costs), dtype=numpy.int64)
+        numpy.minimum.at(vertexMin, sources, ranks)
+        numpy.minimum.at(vertexMin, destinations, ranks)
+        ringMin = numpy.full(numPoints, len(costs), dtype=numpy.int64)
+        numpy.minimum.at(ringMin, triangles.ravel(), numpy.repeat(vertexMin[triangles].min(axis=1), 3))
+        selected = numpy.flatnonzero((ringMin[sources] == ranks) & (ringMin[destinations] == ranks))
+        selected = selected[numpy.argsort(ranks[selected])][:max(maxCollapses, 1)]
+        
+        remap = numpy.arange(numPoints)
+        remap[sources[selected]] = destinations[selected]
+        collapsed = remap[triangles]
+        
+        # refuse collapses that flip one of the triangles they move
+        moved = (collapsed != triangles).any(axis=1)
+        degenerate = (collapsed[:, 0] == collapsed[:, 1]) | (collapsed[:, 1] == collapsed[:, 2]) | (collapsed[:, 2] == collapsed[:, 0])
+        check = numpy.flatnonzero(moved & ~degenerate)
+        before = _faceNormals(points, triangles[check])
+        after = _faceNormals(points, collapsed[check])
+        flipped = check[numpy.einsum('ij,ij->i', before, after) <= 0.0]
+        if len(flipped):
+            refused = numpy.unique(triangles[flipped][collapsed[flipped] != triangles[flipped]])
+            blocked = numpy.union1d(blocked, refused * numPoints + remap[refused])
+            remap[refused] = refused
+            keep = remap[sources[selected]] != sources[selected]
+            selected = selected[keep]
+            if not len(selected):
+                # the refused collapses are blocked now, so the next pass
+                # selects others
+                return triangles, 0.0, blocked
+            collapsed = remap[triangles]
+            degenerate = (collapsed[:, 0] == collapsed[:, 1]) | (collapsed[:, 1] == collapsed[:, 2]) | (collapsed[:, 2] == collapsed[:, 0])
+        
+        quadrics[destinations[selected]] += quadrics[sources[selected]]
+        
+        return collapsed[~degenerate], float(numpy.sqrt(costs[selected].max())), blocked
+
+def _getEdgeKeys(triangles, numPoints):
+    """Returns a key (smaller index * numPoints + larger index) for each
+    edge of triangles: first edges 0-1, then 1-2, then 2-0.
+    """
+    edges = numpy.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+    return edges.min(axis=1) * numPoints + edges.max(axis=1)
+
+def _faceNormals(points, triangles):
+    corners = points[triangles]
+    return numpy.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
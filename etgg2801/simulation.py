@@ -0,0 +1,120 @@
+# FILENAME: simulation.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+import threading
+import time
+
+class TripleBuffer(object):
+    """Three preallocated snapshots shared by one writer and one reader. The
+    writer fills the back snapshot and publishes it; the reader acquires the
+    most recently published one. Neither side ever waits for the other to
+    finish with a snapshot: only the exchange of slot indices is locked.
+    """
+    def __init__(self, factory):
+        """factory is called three times to create the snapshots.
+        """
+        self.slots = [[factory(), 0.0] for i in range(3)]
+        self.back, self.ready, self.front = 0, 1, 2
+        self.fresh = False
+        self.lock = threading.Lock()
+    
+    def getBack(self):
+        return self.slots[self.back][0]
+    
+    def publish(self, timestamp):
+        """Makes the back snapshot the latest one, recording the time it
+        represents.
+        """
+        self.slots[self.back][1] = timestamp
+        with self.lock:
+            self.back, self.ready = self.ready, self.back
+            self.fresh = True
+    
+    def acquire(self):
+        """Returns (snapshot, timestamp) of the latest published snapshot. It
+        stays valid until the next call.
+        """
+        with self.lock:
+            if self.fresh:
+                self.front, self.ready = self.ready, self.front
+                self.fresh = False
+        
+        return tuple(self.slots[self.front])
+
+class SimulationThread(object):
+    """Runs a render delegate's update steps on a worker thread at a fixed
+    rate (timeStep milliseconds, at most maxUpdateSteps steps to catch up),
+    publishing a snapshot of the state render needs after each batch of
+    steps.
+    
+    The delegate creates snapshots with createSnapshot() and fills one with
+    writeSnapshot(snapshot) on the worker thread; render should read only
+    the snapshot returned by getSnapshot, never the live state update
+    changes. Note that Python code still runs one thread at a time, so the
+    gain is in timing (neither side waits on the other's frame) more than
+    in parallelism, except where update releases the GIL (e.g. NumPy).
+    """
+    def __init__(self, delegate, timeStep=10, maxUpdateSteps=5):
+        self.delegate = delegate
+        self.timeStep = timeStep
+        self.maxUpdateSteps = maxUpdateSteps
+        self.snapshots = TripleBuffer(delegate.createSnapshot)
+        self.running = False
+        self.thread = None
+        self.error = None
+    
+    def start(self):
+        # render has a snapshot from the start
+        self.delegate.writeSnapshot(self.snapshots.getBack())
+        self.snapshots.publish(time.perf_counter())
+        
+        self.running = True
+        self.thread = threading.Thread(target=self.__run, name='simulation', daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        """Stops the thread, raising any exception update raised on it.
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.checkError()
+    
+    def checkError(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+    
+    def getSnapshot(self):
+        """Returns (snapshot, time) of the latest snapshot, where time is the
+        performance counter time the snapshot's state corresponds to.
+        """
+        return self.snapshots.acquire()
+    
+    def __run(self):
+        clock = time.perf_counter
+        step = self.timeStep / 1000.0
+        nextTime = clock() + step
+        try:
+            while self.running:
+                now = clock()
+                steps = 0
+                while now >= nextTime and steps < self.maxUpdateSteps:
+                    self.delegate.update(self.timeStep)
+                    nextTime += step
+                    steps += 1
+                
+                # drop the time the catch-up limit did not allow for
+                if now >= nextTime:
+                    nextTime = now + step
+                
+                if steps:
+                    self.delegate.writeSnapshot(self.snapshots.getBack())
+                    self.snapshots.publish(nextTime - step)
+                
+                time.sleep(max(0.0, nextTime - clock()))
+        except Exception as error:
+            self.error = error
+            self.running = False
@@ -0,0 +1,357 @@
+# FILENAME: texture.py
+# BY: Andrew Holbrook
+# DATE: 10/16/2026
+
+import collections
+import concurrent.futures
+import ctypes
+import time
+import numpy
+import sdl2
+from sdl2 import sdlimage
+from OpenGL import GL
+from OpenGL.GL.EXT import texture_compression_s3tc as S3TC
+# PyOpenGL's wrappers of the compressed texture functions reject null and
+# offset data pointers and read back only level 0, so the raw ones are used
+from OpenGL.raw.GL.VERSION import GL_1_3 as RawGL13
+from .glstate import GLState
+from .meshcache import MeshCache
+
+class Texture(object):
+    """A 2D texture loaded by a TextureManager. Until its image has been
+    decoded and uploaded, textureObject is the manager's placeholder. An
+    image that fails to load leaves the placeholder in place for good.
+    """
+    def __init__(self, file, placeholder):
+        self.file = file
+        self.textureObject = placeholder
+        self.size = None
+        self.hasAlpha = None
+        self.ready = False
+        
+        # the exception raised while decoding the image, if any
+        self.error = None
+    
+    def bind(self, unit=0):
+        GLState.bindTexture(GL.GL_TEXTURE_2D, self.textureObject, unit)
+
+class TextureImage(object):
+    """Pixel data ready for upload: levels is a list of (width, height, data)
+    with data a 1D uint8 array, base level first. If compressedFormat is set
+    the texture is stored in that block-compressed format; compressed tells
+    whether the level data is already compressed (otherwise it is RGBA
+    bytes for the driver to compress).
+    """
+    def __init__(self, levels, hasAlpha, compressedFormat=0, compressed=False):
+        self.levels = levels
+        self.hasAlpha = hasAlpha
+        self.compressedFormat = compressedFormat
+        self.compressed = compressed
+        
+        # set when the driver's compressed levels should be cached
+        self.meshCache = None
+
+class TextureManager(object):
+    """Loads textures without stalling rendering. Images are decoded on a
+    thread pool, and decoded images are uploaded through pixel buffer
+    objects a band of rows at a time by update, which should be called once
+    per frame and stops starting new work once the frame's time budget (in
+    seconds) is used up.
+    
+    If cache is True, each image's full mip chain is kept in a cache file
+    next to the image (or in the directory named by cache) in the MeshCache
+    format. Later loads memory-map the file instead of decoding the image,
+    and upload the levels straight from the mapping. The cache is rebuilt
+    when the image changes. With compress also set (and S3TC supported),
+    the driver compresses the levels once and the cache holds the
+    compressed blocks.
+    """
+    BAND_BYTES = 1 << 20
+    CACHE_VERSION = 1
+    
+    @staticmethod
+    def decodeImage(file):
+        """Decodes an image file with SDL_image. Returns (width, height,
+        hasAlpha, pixels) where pixels is a (height, width * 4) array of RGBA
+        bytes, top row first.
+        """
+        surface = sdlimage.IMG_Load(file if isinstance(file, bytes) else file.encode())
+        if not surface:
+            raise Exception(sdl2.SDL_GetError())
+        
+        try:
+            hasAlpha = sdl2.SDL_ISPIXELFORMAT_ALPHA(surface.contents.format.contents.format) or \
+                       surface.contents.format.contents.Amask != 0
+            rgba = sdl2.SDL_ConvertSurfaceFormat(surface, sdl2.SDL_PIXELFORMAT_RGBA32, 0)
+            if not rgba:
+                raise Exception(sdl2.SDL_GetError())
+            
+            try:
+                width, height, pitch = rgba.contents.w, rgba.contents.h, rgba.contents.pitch
+                data = ctypes.cast(rgba.contents.pixels, ctypes.POINTER(ctypes.c_uint8 * (pitch * height))).contents
+                pixels = numpy.frombuffer(data, dtype=numpy.uint8).reshape(height, pitch)[:, :width * 4].copy()
+            finally:
+                sdl2.SDL_FreeSurface(rgba)
+        finally:
+            sdl2.SDL_FreeSurface(surface)
+        
+        return width, height, bool(hasAlpha), pixels
+    
+    @staticmethod
+    def buildMipChain(width, height, pixels):
+        """Returns the mip levels of an image as a list of (width, height,
+        data), base level first, each level a 2x2 box filter of the previous
+        one (odd rows and columns are dropped).
+        """
+        level = pixels.reshape(height, width, 4)
+        levels = [(width, height, level.ravel())]
+        while width > 1 or height > 1:
+            fy, fx = (2 if height > 1 else 1), (2 if width > 1 else 1)
+            height, width = height // fy, width // fx
+            blocks = level[:height * fy, :width * fx].reshape(height, fy, width, fx, 4)
+            count = fy * fx
+            level = ((blocks.sum(axis=(1, 3), dtype=numpy.uint16) + count // 2) // count).astype(numpy.uint8)
+            levels.append((width, height, level.ravel()))
+        
+        return levels
+    
+    @staticmethod
+    def getBlockSize(compressedFormat):
+        """Returns the bytes per 4x4 block of an S3TC format.
+        """
+        if compressedFormat in (S3TC.GL_COMPRESSED_RGB_S3TC_DXT1_EXT, S3TC.GL_COMPRESSED_RGBA_S3TC_DXT1_EXT):
+            return 8
+        
+        return 16
+    
+    def __init__(self, workers=None, budget=0.002, placeholderColor=(128, 128, 128, 255), cache=None, compress=False):
+        self.executor = concurrent.futures.ThreadPoolExecutor(workers)
+        self.budget = budget
+        self.cache = cache
+        self.compress = bool(compress) and bool(S3TC.glInitTextureCompressionS3TcEXT())
+        self.textures = {}
+        self.decoding = []
+        self.uploads = collections.deque()
+        
+        self.placeholder = GL.glGenTextures(1)
+        GLState.bindTexture(GL.GL_TEXTURE_2D, self.placeholder)
+        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA8, 1, 1, 0, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE,
+                        numpy.array(placeholderColor, dtype=numpy.uint8))
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_NEAREST)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_NEAREST)
+    
+    def load(self, file, magFilter=GL.GL_LINEAR, minFilter=GL.GL_LINEAR_MIPMAP_LINEAR):
+        """Returns the Texture for file, starting to decode it if it is not
+        already loaded or loading. Mipmaps are generated if minFilter uses
+        them.
+        """
+        texture = self.textures.get(file)
+        if texture is None:
+            texture = Texture(file, self.placeholder)
+            self.textures[file] = texture
+            future = self.executor.submit(self.prepareImage, file, minFilter not in (GL.GL_NEAREST, GL.GL_LINEAR))
+            self.decoding.append((texture, future, magFilter, minFilter))
+        
+        return texture
+    
+    def prepareImage(self, file, mipmapped):
+        """Returns the TextureImage for file, from the cache if there is one.
+        Runs on the thread pool, so it makes no GL calls.
+        """
+        if not self.cache:
+            width, height, hasAlpha, pixels = TextureManager.decodeImage(file)
+            return TextureImage([(width, height, pixels.ravel())], hasAlpha)
+        
+        # the compression setting is part of the key, so that turning it on
+        # or off rebuilds the cache
+        meshCache = MeshCache(file, None if self.cache is True else self.cache,
+                              TextureManager.CACHE_VERSION * 2 + int(self.compress), 'texcache')
+        entry = meshCache.load()
+        if entry is not None:
+            meta, arrays = entry
+            levels = [(w, h, arrays['%d' % i]) for i, (w, h) in enumerate(meta['levels'])]
+            return TextureImage(levels, meta['hasAlpha'], meta['format'], meta['format'] != 0)
+        
+        width, height, hasAlpha, pixels = TextureManager.decodeImage(file)
+        if mipmapped:
+            levels = TextureManager.buildMipChain(width, height, pixels)
+        else:
+            levels = [(width, height, pixels.ravel())]
+        if self.compress:
+            compressedFormat = S3TC.GL_COMPRESSED_RGBA_S3TC_DXT5_EXT if hasAlpha else S3TC.GL_COMPRESSED_RGB_S3TC_DXT1_EXT
+            image = TextureImage(levels, hasAlpha, compressedFormat)
+            image.meshCache = meshCache
+        else:
+            image = TextureImage(levels, hasAlpha)
+            meshCache.store(self.__getCacheMeta(image), dict([('%d' % i, data) for i, (w, h, data) in enumerate(levels)]))
+        
+        return image
+    
+    def isIdle(self):
+        return not self.decoding and not self.uploads
+    
+    def update(self, budget=None):
+        """Uploads decoded images for at most budget seconds (the manager's
+        budget by default). At least one step is done per call, so every
+        texture is eventually loaded whatever the budget.
+        """
+        startTime = time.perf_counter()
+        budget = self.budget if budget is None else budget
+        
+        if self.decoding:
+            decoding = []
+            for entry in self.decoding:
+                texture, future, magFilter, minFilter = entry
+                if future.done():
+                    image = self.__getImage(texture, future)
+                    if image is not None:
+                        self.uploads.append(self.__upload(texture, image, magFilter, minFilter))
+                else:
+                    decoding.append(entry)
+            self.decoding = decoding
+        
+        while self.uploads:
+            try:
+                next(self.uploads[0])
+            except StopIteration:
+                self.uploads.popleft()
+            
+            if time.perf_counter() - startTime >= budget:
+                break
+    
+    def finish(self):
+        """Blocks until every texture requested so far is loaded.
+        """
+        concurrent.futures.wait([future for texture, future, magFilter, minFilter in self.decoding])
+        while not self.isIdle():
+            self.update(float('inf'))
+    
+    def cleanup(self):
+        self.executor.shutdown(wait=True)
+        for texture in self.textures.values():
+            if texture.textureObject != self.placeholder:
+                GLState.deleteTexture(texture.textureObject)
+        GLState.deleteTexture(self.placeholder)
+    
+    def __getCacheMeta(self, image):
+        return {
+            'levels': [[w, h] for w, h, data in image.levels],
+            'hasAlpha': image.hasAlpha,
+            'format': image.compressedFormat if image.compressed else 0}
+    
+    def __getImage(self, texture, future):
+        """Returns the image of a finished decode. If decoding failed, the
+        error is printed and kept in texture.error, None is returned, and the
+        texture keeps the placeholder.
+        """
+        try:
+            return future.result()
+        except Exception as e:
+            texture.error = e
+            print("Error loading texture %s: %s" % (texture.file, e))
+            return None
+    
+    def __upload(self, texture, image, magFilter, minFilter):
+        """Generator doing one step of uploading an image per next(): each
+        step copies a band of rows (of 4x4 blocks for compressed data) into
+        the pixel buffer and starts its transfer to the texture. The texture
+        replaces the placeholder once complete.
+        """
+        levels = image.levels
+        base = levels[0]
+        mipmapped = minFilter not in (GL.GL_NEAREST, GL.GL_LINEAR)
+        if image.compressedFormat:
+            internalFormat = image.compressedFormat
+        else:
+            internalFormat = GL.GL_RGBA8 if image.hasAlpha else GL.GL_RGB8
+        
+        textureObject = GL.glGenTextures(1)
+        GLState.bindTexture(GL.GL_TEXTURE_2D, textureObject)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, magFilter)
+        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, minFilter)
+        if len(levels) > 1 or not mipmapped:
+            GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAX_LEVEL, len(levels) - 1)
+        
+        # every level gets its own range of the pixel buffer, so no band
+        # overwrites data the GPU may still be reading
+        offsets = numpy.cumsum([0] + [data.nbytes for w, h, data in levels]).tolist()
+        pixelBuffer = GL.glGenBuffers(1)
+        GLState.bindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, pixelBuffer)
+        GL.glBufferData(GL.GL_PIXEL_UNPACK_BUFFER, offsets[-1], None, GL.GL_STREAM_DRAW)
+        GLState.bindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
+        yield
+        
+        for level, (width, height, data) in enumerate(levels):
+            if image.compressed:
+                blockSize = TextureManager.getBlockSize(internalFormat)
+                rowBytes, rowHeight = (width + 3) // 4 * blockSize, 4
+            else:
+                rowBytes, rowHeight = width * 4, 1
+            numRows = len(data) // rowBytes
+            bandRows = max(1, TextureManager.BAND_BYTES // rowBytes)
+            
+            # the driver compresses RGBA data only when given a whole level
+            whole = image.compressedFormat and not image.compressed
+            
+            GLState.bindTexture(GL.GL_TEXTURE_2D, textureObject)
+            if image.compressed:
+                RawGL13.glCompressedTexImage2D(GL.GL_TEXTURE_2D, level, internalFormat, width, height, 0, len(data), None)
+            elif not whole:
+                GL.glTexImage2D(GL.GL_TEXTURE_2D, level, internalFormat, width, height, 0,
+                                GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, None)
+            
+            for row in range(0, numRows, bandRows):
+                band = data[row * rowBytes:(row + bandRows) * rowBytes]
+                offset = offsets[level] + row * rowBytes
+                y = row * rowHeight
+                bandHeight = min(height - y, bandRows * rowHeight)
+                
+                # a bound unpack buffer turns the data pointer into an offset
+                GLState.bindTexture(GL.GL_TEXTURE_2D, textureObject)
+                GLState.bindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, pixelBuffer)
+                GL.glBufferSubData(GL.GL_PIXEL_UNPACK_BUFFER, offset, band.nbytes, band)
+                if image.compressed:
+                    RawGL13.glCompressedTexSubImage2D(GL.GL_TEXTURE_2D, level, 0, y, width, bandHeight, internalFormat,
+                                                 band.nbytes, ctypes.c_void_p(offset))
+                elif not whole:
+                    GL.glTexSubImage2D(GL.GL_TEXTURE_2D, level, 0, y, width, bandHeight, GL.GL_RGBA,
+                                       GL.GL_UNSIGNED_BYTE, ctypes.c_void_p(offset))
+                GLState.bindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
+                yield
+            
+            if whole:
+                GLState.bindTexture(GL.GL_TEXTURE_2D, textureObject)
+                GLState.bindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, pixelBuffer)
+                GL.glTexImage2D(GL.GL_TEXTURE_2D, level, internalFormat, width, height, 0,
+                                GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, ctypes.c_void_p(offsets[level]))
+                GLState.bindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
+                yield
+        
+        GLState.deleteBuffer(pixelBuffer)
+        
+        GLState.bindTexture(GL.GL_TEXTURE_2D, textureObject)
+        if mipmapped and len(levels) == 1:
+            GL.glGenerateMipmap(GL.GL_TEXTURE_2D)
+        
+        if image.meshCache is not None:
+            self.__storeCompressed(image)
+        
+        texture.textureObject = textureObject
+        texture.size = base[:2]
+        texture.hasAlpha = image.hasAlpha
+        texture.ready = True
+    
+    def __storeCompressed(self, image):
+        """Reads back the levels the driver compressed from the bound texture
+        and writes them to the image's cache on the thread pool.
+        """
+        arrays = {}
+        for level in range(len(image.levels)):
+            size = GL.glGetTexLevelParameteriv(GL.GL_TEXTURE_2D, level, GL.GL_TEXTURE_COMPRESSED_IMAGE_SIZE)
+            data = numpy.empty(size, dtype=numpy.uint8)
+            
+            RawGL13.glGetCompressedTexImage(GL.GL_TEXTURE_2D, level, data.ctypes.data_as(ctypes.c_void_p))
+            arrays['%d' % level] = data
+        
+        image.compressed = True
+        self.executor.submit(image.meshCache.store, self.__getCacheMeta(image), arrays)
@@ -2,6 +2,7 @@ import ctypes
 import sdl2
 from math import *
 import random
+import numpy
 from OpenGL import GL
 from etgg2801 import *
 
@@ -57,67 +58,35 @@ class MyDelegate(GLWindowRenderDelegate):
         self.initTexture()
         
         # location of model and projection matrices in shader program
-        self.modelview_loc = GL.glGetUniformLocation(self.shaderProgram, b"modelview")
-        self.projection_loc = GL.glGetUniformLocation(self.shaderProgram, b"projection")
+        self.modelview_loc = self.shader.getUniformLocation("modelview")
+        self.projection_loc = self.shader.getUniformLocation("projection")
         
         # location of sampler in shader program
-        self.sampler_loc = GL.glGetUniformLocation(self.shaderProgram, b"sampler")
+        self.sampler_loc = self.shader.getUniformLocation("sampler")
         
         # set background color to black
-        GL.glClearColor(0.0, 0.0, 0.0, 1.0)
+        window.gl.glClearColor(0.0, 0.0, 0.0, 1.0)
         
         # enable depth testing
-        GL.glEnable(GL.GL_DEPTH_TEST)
+        window.gl.glEnable(GL.GL_DEPTH_TEST)
         
         self.window = GLWindow.getInstance()
-        GL.glViewport(0, 0, window.size[0], window.size[1])
+        window.gl.glViewport(0, 0, window.size[0], window.size[1])
         
         self.scene = Scene()
     
     def initShaders(self):
-        
-        # build vertex shader object
-        self.vertexShader = GL.glCreateShader(GL.GL_VERTEX_SHADER)
-        GL.glShaderSource(self.vertexShader, texture_phong_vsrc)
-        GL.glCompileShader(self.vertexShader)
-        result = GL.glGetShaderiv(self.vertexShader, GL.GL_COMPILE_STATUS)
-        if result != 1:
-            print(GL.glGetShaderInfoLog(self.vertexShader))
-            raise Exception("Error compiling vertex shader")
-        
-        # build fragment shader object
-        self.fragmentShader = GL.glCreateShader(GL.GL_FRAGMENT_SHADER)
-        GL.glShaderSource(self.fragmentShader, texture_phong_fsrc)
-        GL.glCompileShader(self.fragmentShader)
-        result = GL.glGetShaderiv(self.fragmentShader, GL.GL_COMPILE_STATUS)
-        if result != 1:
-            print(GL.glGetShaderInfoLog(self.fragmentShader))
-            raise Exception("Error compiling fragment shader")
-        
-        # build shader program and attach shader objects
-        self.shaderProgram = GL.glCreateProgram()
-        GL.glAttachShader(self.shaderProgram, self.vertexShader)
-        GL.glAttachShader(self.shaderProgram, self.fragmentShader)
-        GL.glLinkProgram(self.shaderProgram)
+        self.shader = ShaderProgram(texture_phong_vsrc, texture_phong_fsrc, cache=True)
         
     def initTexture(self):
-        GL.glActiveTexture(GL.GL_TEXTURE0)
-        self.textureObject = GL.glGenTextures(1)
-        
-        boatDiffuse = sdlimage.IMG_Load(b'/Users/andrewholbrook/Desktop/boat_OBJ/master_diffuse.png')
-        pixels = ctypes.cast(boatDiffuse.contents.pixels, ctypes.c_void_p)
-        
-        GL.glBindTexture(GL.GL_TEXTURE_2D, self.textureObject)
-        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA, 2048, 2048, 0, GL.GL_BGRA, GL.GL_UNSIGNED_BYTE, pixels)
-        GL.glGenerateMipmap(GL.GL_TEXTURE_2D)
-        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
-        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR_MIPMAP_LINEAR)
-        
+        # the boat is drawn with a placeholder until the texture has streamed in
+        self.textures = TextureManager(cache=True, compress=True)
+        self.boatTexture = self.textures.load('/Users/andrewholbrook/Desktop/boat_OBJ/master_diffuse.png')
+    
     def cleanup(self):
         self.scene.cleanup()
-        GL.glDeleteShader(self.vertexShader)
-        GL.glDeleteShader(self.fragmentShader)
-        GL.glDeleteProgram(self.shaderProgram)
+        self.textures.cleanup()
+        self.shader.cleanup()
     
     def update(self, dtime):
         self.angle += self.dangle * dtime
@@ -125,45 +94,39 @@ class MyDelegate(GLWindowRenderDelegate):
             self.angle -= 360
         self.scene.update(dtime)
     
+    def createSnapshot(self):
+        return [numpy.zeros(1), self.scene.createSnapshot()]
+    
+    def writeSnapshot(self, snapshot):
+        snapshot[0][0] = self.angle
+        self.scene.writeSnapshot(snapshot[1])
+    
     def render(self):
-        GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+        self.window.gl.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
+        
+        self.textures.update()
         
-        GL.glUseProgram(self.shaderProgram)
+        self.shader.use()
         
         projMatrix = Matrix4.getOrthographic(near=1,far=50)
         projMatrix.set(0, 0, projMatrix.get(0, 0) * (self.window.size[1] / self.window.size[0]))
-        GL.glUniformMatrix4fv(self.projection_loc, 1, False, projMatrix.getCType())
+        GLState.uniformMatrix4fv(self.projection_loc, 1, False, projMatrix.getCType())
         
         boatPosition = Vector4((0, 0, -10, 1))
         mvMatrix = Matrix4.getTranslation(*boatPosition.getXYZ())
         
+        # orbit the camera around the boat and look at it
         cameraPosition = Vector4((0, 5, -4, 1))
-        cameraMatrix = Matrix4.getTranslation(*cameraPosition.getXYZ())
-        cameraMatrix = Matrix4.getTranslation(*(boatPosition * -1).getXYZ()) * cameraMatrix
-        cameraMatrix = Matrix4.getRotation(ay=self.angle) * cameraMatrix
-        cameraMatrix = Matrix4.getTranslation(*boatPosition.getXYZ()) * cameraMatrix
+        angle = self.angle if self.window.snapshot is None else self.window.snapshot[0][0]
+        cameraPosition = Matrix4.getRotationY(angle) * (cameraPosition - boatPosition) + boatPosition
         
-        lookAt = cameraMatrix.position() - boatPosition
-        lookAt.normalize()
+        mvMatrix = Matrix4.getLookAt(cameraPosition, boatPosition) * mvMatrix
         
-        worldUp = Vector4((0, 1, 0, 0))
-        left = worldUp.cross(lookAt)
-        left.normalize()
+        GLState.uniformMatrix4fv(self.modelview_loc, 1, False, mvMatrix.getCType())
         
-        up = lookAt.cross(left)
-        up.normalize()
-        
-        cameraMatrix.setOrientation(left, up, lookAt)
-        
-        
-        mvMatrix = cameraMatrix.inverse() * mvMatrix
-        
-        GL.glUniformMatrix4fv(self.modelview_loc, 1, False, mvMatrix.getCType())
-        
-        GL.glUniform1i(self.sampler_loc, 0)
+        GLState.uniform1i(self.sampler_loc, 0)
+        self.boatTexture.bind(0)
         boat.renderAllParts()
-        
-        GL.glUseProgram(0)
 
 class Scene(object):
     def __init__(self):
@@ -183,16 +146,25 @@ class Scene(object):
         for o in self.objects:
             o.update(dtime)
     
-    def render(self):
+    def createSnapshot(self):
+        return [numpy.zeros(o.getStateSize()) for o in self.objects]
+    
+    def writeSnapshot(self, snapshot):
+        for o, state in zip(self.objects, snapshot):
+            o.writeState(state)
+    
+    def render(self, snapshot=None):
+        """Renders the objects, or their states recorded in snapshot.
+        """
         #sl = GLWindow.getInstance().renderDelegate.shininess_loc
         #GL.glUniform1f(sl, ctypes.c_float(50.0))
-        for o in self.objects:
-            o.render()
+        for i, o in enumerate(self.objects):
+            o.render(None if snapshot is None else snapshot[i])
 
 window = GLWindow((800, 600))
 window.setRenderDelegate(MyDelegate())
 
-boat = OBJReader.readFile('/Users/andrewholbrook/Desktop/boat_OBJ/boat.obj')
+boat = OBJReader.readFile('/Users/andrewholbrook/Desktop/boat_OBJ/boat.obj', cache=True)
 boat.loadToVRAM()
 
 window.mainLoop()
\ No newline at end of file
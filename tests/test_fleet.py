@@ -0,0 +1,76 @@
+import numpy
+
+from benchmarks.glcalls import makeModel
+from etgg2801 import Frustum, GLState, Matrix4, RecordingGL, RobotFleet, Scara, Vector4, Viper
+
+def makeRobots(model):
+    """Returns Scara and Viper robots in assorted poses. Calls with the same
+    model return identical robots.
+    """
+    robots = []
+    for i in range(6):
+        robot = Scara(model) if i % 2 else Viper(model)
+        robot.position = Vector4((i * 1.5, -0.5 * i, 2.0 - i))
+        robot.orientation = Vector4((10.0 * i, -20.0 + 7.0 * i, 5.0 * i))
+        for k, j in enumerate(robot.joints):
+            j.value = float(numpy.clip(0.1 * (i + 1) * (k + 1), j.valueMin, j.valueMax))
+            if (i + k) % 2:
+                j.dfunc = j.decreaseValue
+        robots.append(robot)
+    
+    return robots
+
+def getLinkTransforms(robot):
+    """Returns the link transforms of robot the way Robot.render builds them.
+    """
+    matrix_ow = Matrix4.getTranslation(*robot.position.getXYZ()) * Matrix4.getRotation(*robot.orientation.getXYZ())
+    links = [matrix_ow.data.copy()]
+    for j in robot.joints:
+        matrix_ow = matrix_ow * j.getTransformation()
+        links.append(matrix_ow.data.copy())
+    
+    return numpy.array(links)
+
+def test_transforms_match_robots():
+    model = makeModel(6)
+    robots = makeRobots(model)
+    fleet = RobotFleet()
+    locations = [fleet.addRobot(r) for r in makeRobots(model)]
+    
+    for frame in range(50):
+        for r in robots:
+            r.update(30)
+        fleet.update(30)
+        fleet.computeTransforms()
+        
+        for robot, (group, index) in zip(robots, locations):
+            numpy.testing.assert_allclose(group.linkData[index], getLinkTransforms(robot), rtol=1e-4, atol=1e-5)
+    
+    fleet.syncToRobots()
+    for robot, (group, index) in zip(robots, locations):
+        numpy.testing.assert_allclose([j.value for j in group.robots[index].joints], [j.value for j in robot.joints], atol=1e-9)
+
+def test_shared_model_is_cleaned_up_once():
+    recorder = RecordingGL(gl=None, trace=False)
+    recorder.install()
+    GLState.reset()
+    try:
+        model = makeModel(6)
+        model.loadToVRAM()
+        fleet = RobotFleet()
+        fleet.frustum = Frustum()
+        for r in makeRobots(model):
+            fleet.addRobot(r)
+        fleet.renderInstanced()
+        assert len(fleet.groups) == 2
+        
+        recorder.endFrame()
+        fleet.cleanup()
+        stats = recorder.endFrame()
+    finally:
+        recorder.uninstall()
+        GLState.reset()
+    
+    assert stats['byName']['glDeleteVertexArrays'] == 1
+    # the model's five buffers and each group's instance buffer
+    assert stats['byName']['glDeleteBuffers'] == 5 + 2
@@ -0,0 +1,40 @@
+import numpy
+from OpenGL import GL
+
+from etgg2801 import RecordingGL
+
+def recordFrames(recorder):
+    recorder.glClear(GL.GL_COLOR_BUFFER_BIT)
+    recorder.endFrame()
+    recorder.glBindVertexArray(1)
+    recorder.glDrawArrays(GL.GL_TRIANGLES, 0, 3)
+    recorder.endFrame()
+    recorder.endFrame()
+
+def test_replay_matches_recorded_frames(tmp_path):
+    recorder = RecordingGL(gl=None)
+    recordFrames(recorder)
+    file = str(tmp_path / 'trace.json.gz')
+    recorder.save(file)
+    
+    replayed = RecordingGL(gl=None)
+    RecordingGL.replay(RecordingGL.load(file), replayed)
+    
+    assert len(replayed.frames) == len(recorder.frames)
+    for original, replay in zip(recorder.frames, replayed.frames):
+        assert replay['calls'] == original['calls']
+        assert replay['draws'] == original['draws']
+        assert replay['stateChanges'] == original['stateChanges']
+    assert replayed.frame['calls'] == 0
+
+def test_byte_data_is_kept_only_with_keep_data():
+    indices = numpy.arange(6, dtype=numpy.uint16).tobytes()
+    for keepData in (False, True):
+        recorder = RecordingGL(gl=None, keepData=keepData)
+        recorder.glBufferSubData(GL.GL_ELEMENT_ARRAY_BUFFER, 0, len(indices), indices)
+        recorder.glGetUniformLocation(1, b'modelview')
+        
+        data, name = recorder.calls[0][2][3], recorder.calls[1][2][1]
+        assert data['array'] == (indices if keepData else None)
+        assert data['shape'] == [len(indices)]
+        assert name == {'bytes': b'modelview'}
@@ -0,0 +1,123 @@
+import numpy
+import pytest
+from OpenGL import GL
+
+from etgg2801 import GLState, Matrix4, RecordingGL
+
+@pytest.fixture
+def recorder():
+    recorder = RecordingGL(gl=None, trace=False)
+    recorder.install()
+    GLState.reset()
+    GLState.beginFrame()
+    yield recorder
+    recorder.uninstall()
+    GLState.reset()
+
+def calls(recorder):
+    return recorder.endFrame()['byName']
+
+def test_redundant_binds_are_elided(recorder):
+    for i in range(3):
+        GLState.useProgram(1)
+        GLState.bindVertexArray(2)
+        GLState.bindBuffer(GL.GL_ARRAY_BUFFER, 3)
+        GLState.bindTexture(GL.GL_TEXTURE_2D, 4)
+    GLState.bindTexture(GL.GL_TEXTURE_2D, 5)
+    
+    byName = calls(recorder)
+    assert byName['glUseProgram'] == 1
+    assert byName['glBindVertexArray'] == 1
+    assert byName['glBindBuffer'] == 1
+    assert byName['glBindTexture'] == 2
+    assert byName['glActiveTexture'] == 1
+    
+    GLState.beginFrame()
+    stats = GLState.getFrameStats()
+    assert stats['glUseProgram'] == (1, 2)
+    assert stats['glBindTexture'] == (2, 2)
+
+def test_element_buffer_belongs_to_vertex_array(recorder):
+    GLState.bindVertexArray(1)
+    GLState.bindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, 7)
+    GLState.bindVertexArray(2)
+    GLState.bindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, 7)
+    GLState.bindVertexArray(1)
+    GLState.bindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, 7)
+    
+    assert calls(recorder)['glBindBuffer'] == 2
+
+def test_textures_are_cached_per_unit(recorder):
+    GLState.bindTexture(GL.GL_TEXTURE_2D, 4, unit=0)
+    GLState.bindTexture(GL.GL_TEXTURE_2D, 4, unit=1)
+    GLState.bindTexture(GL.GL_TEXTURE_2D, 4, unit=0)
+    GLState.bindTexture(GL.GL_TEXTURE_2D, 5, unit=1)
+    
+    byName = calls(recorder)
+    assert byName['glBindTexture'] == 3
+    assert byName['glActiveTexture'] == 2
+
+def test_uniforms_are_cached_per_program(recorder):
+    m = Matrix4.getTranslation(1, 2, 3)
+    GLState.useProgram(1)
+    GLState.uniform1i(0, 2)
+    GLState.uniform1i(0, 2)
+    GLState.uniform1f(1, 0.5)
+    GLState.uniformMatrix4fv(2, 1, False, m.getCType())
+    GLState.uniformMatrix4fv(2, 1, False, m.data.ravel(order='F'))
+    
+    # the same locations in another program are separate uniforms
+    GLState.useProgram(2)
+    GLState.uniform1i(0, 2)
+    GLState.useProgram(1)
+    GLState.uniform1i(0, 2)
+    
+    # a changed value is sent, even if it was sent before
+    m.set(0, 3, 5.0)
+    GLState.uniformMatrix4fv(2, 1, False, m.getCType())
+    GLState.uniform1i(0, 3)
+    GLState.uniform1i(0, 2)
+    
+    byName = calls(recorder)
+    assert byName['glUniform1i'] == 4
+    assert byName['glUniform1f'] == 1
+    assert byName['glUniformMatrix4fv'] == 2
+
+def test_reset_forgets_state(recorder):
+    GLState.useProgram(1)
+    GLState.bindVertexArray(2)
+    GLState.bindTexture(GL.GL_TEXTURE_2D, 4)
+    GLState.uniform1i(0, 2)
+    GLState.reset()
+    GLState.useProgram(1)
+    GLState.bindVertexArray(2)
+    GLState.bindTexture(GL.GL_TEXTURE_2D, 4)
+    GLState.uniform1i(0, 2)
+    
+    byName = calls(recorder)
+    assert byName['glUseProgram'] == 2
+    assert byName['glBindVertexArray'] == 2
+    assert byName['glBindTexture'] == 2
+    assert byName['glActiveTexture'] == 2
+    assert byName['glUniform1i'] == 2
+
+def test_deleted_names_are_forgotten(recorder):
+    GLState.useProgram(1)
+    GLState.uniform1i(0, 2)
+    GLState.bindVertexArray(2)
+    GLState.bindBuffer(GL.GL_ARRAY_BUFFER, 3)
+    GLState.deleteProgram(1)
+    GLState.deleteVertexArray(2)
+    GLState.deleteBuffer(3)
+    
+    # GL may hand out the same names again
+    GLState.useProgram(1)
+    GLState.uniform1i(0, 2)
+    GLState.bindVertexArray(2)
+    GLState.bindBuffer(GL.GL_ARRAY_BUFFER, 3)
+    
+    byName = calls(recorder)
+    assert byName['glUseProgram'] == 2
+    assert byName['glUniform1i'] == 2
+    assert byName['glBindVertexArray'] == 2
+    assert byName['glBindBuffer'] == 2
@@ -0,0 +1,134 @@
+import pytest
+
+from etgg2801 import GLWindow, GLWindowRenderDelegate, RecordingGL, glwindow
+
+class ClearDelegate(GLWindowRenderDelegate):
+    def __init__(self, window):
+        super().__init__()
+        self.window = window
+        window.gl.glClearColor(0.0, 0.0, 0.0, 1.0)
+    
+    def cleanup(self):
+        pass
+    
+    def update(self, dtime):
+        pass
+    
+    def render(self):
+        self.window.gl.glClear(self.window.gl.GL_COLOR_BUFFER_BIT)
+
+class FakeClock(object):
+    """Stands in for the time module in glwindow: time only passes when
+    something sleeps or advances it.
+    """
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+    
+    def perf_counter(self):
+        return self.now
+    
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+class TimedDelegate(GLWindowRenderDelegate):
+    """Records the update steps run before each frame and the alpha it is
+    rendered with. Each render takes renderTime seconds of the clock.
+    """
+    def __init__(self, clock, renderTime):
+        super().__init__()
+        self.clock = clock
+        self.renderTime = renderTime
+        self.steps = 0
+        self.frameSteps = []
+        self.alphas = []
+    
+    def cleanup(self):
+        pass
+    
+    def update(self, dtime):
+        self.steps += 1
+    
+    def render(self, alpha):
+        self.frameSteps.append(self.steps)
+        self.alphas.append(alpha)
+        self.steps = 0
+        self.clock.now += self.renderTime
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(glwindow, 'time', clock)
+    
+    return clock
+
+@pytest.fixture
+def makeWindow(monkeypatch):
+    monkeypatch.delenv('ETGG2801_TRACE', raising=False)
+    yield lambda **kwargs: GLWindow(maxFrames=3, **kwargs)
+    GLWindow.instance = None
+
+def test_delegate_calls_through_window_gl_are_recorded(makeWindow):
+    window = makeWindow(gl=RecordingGL(gl=None))
+    window.setRenderDelegate(ClearDelegate(window))
+    window.mainLoop()
+    
+    frames = window.recorder.frames
+    assert [f['byName']['glClear'] for f in frames] == [1, 1, 1]
+    assert frames[0]['byName']['glClearColor'] == 1
+
+def test_environment_recorder_traces_only_for_a_trace_file(makeWindow, monkeypatch, tmp_path):
+    monkeypatch.setenv('ETGG2801_GL', 'record')
+    window = makeWindow()
+    assert window.gl is window.recorder
+    assert not window.recorder.trace
+    window.recorder.uninstall()
+    GLWindow.instance = None
+    
+    monkeypatch.setenv('ETGG2801_TRACE', str(tmp_path / 'trace.json'))
+    window = makeWindow()
+    assert window.recorder.trace
+    window.recorder.uninstall()
+
+def runFrames(makeWindow, clock, renderTime, frames, **settings):
+    window = makeWindow(gl=RecordingGL(gl=None))
+    window.maxFrames = frames
+    for name, value in settings.items():
+        setattr(window, name, value)
+    delegate = TimedDelegate(clock, renderTime)
+    window.setRenderDelegate(delegate)
+    window.mainLoop()
+    
+    return delegate
+
+def test_catch_up_is_capped(makeWindow, clock):
+    # each 200 ms frame is worth 20 steps of 10 ms, but only 5 may run
+    delegate = runFrames(makeWindow, clock, 0.2, 6, timeStep=10, maxUpdateSteps=5)
+    
+    assert delegate.frameSteps == [0, 5, 5, 5, 5, 5]
+    assert delegate.alphas == [0.0] * 6
+
+def test_alpha_carries_the_remaining_time(makeWindow, clock):
+    delegate = runFrames(makeWindow, clock, 0.015, 6, timeStep=10)
+    
+    assert delegate.frameSteps == [0, 1, 2, 1, 2, 1]
+    assert delegate.alphas == pytest.approx([0.0, 0.5, 0.0, 0.5, 0.0, 0.5])
+    
+    # every 15 ms rendered is accounted for by steps and alpha
+    assert (sum(delegate.frameSteps) + delegate.alphas[-1]) * 10 == pytest.approx(15 * 5)
+
+def test_max_fps_sleeps_off_the_frame(makeWindow, clock):
+    delegate = runFrames(makeWindow, clock, 0.004, 4, timeStep=10, maxFPS=100)
+    
+    assert clock.sleeps == pytest.approx([0.006] * 4)
+    assert delegate.frameSteps == [0, 1, 1, 1]
+
+def test_default_loop_sleeps_until_the_next_update(makeWindow, clock):
+    # times that are exact in binary, so no step is lost to rounding
+    delegate = runFrames(makeWindow, clock, 1 / 256, 5, timeStep=1000 / 64)
+    
+    # without vsync or maxFPS, every frame waits for a new step to draw
+    assert clock.sleeps == [1 / 64 - 1 / 256] * 5
+    assert delegate.frameSteps == [0, 1, 1, 1, 1]
+    assert delegate.alphas == pytest.approx([0.0] * 5)
@@ -0,0 +1,26 @@
+import numpy
+import pytest
+
+from etgg2801 import Matrix4, PrismaticJoint, RevoluteJoint
+
+@pytest.mark.parametrize('axis', [(1, 0, 0), (0, 1, 0), (0, 0, 1)])
+def test_revolute_matches_euler_rotation_about_coordinate_axes(axis):
+    joint = RevoluteJoint('A', 'B', axis, (0.5, -0.25, 2.0))
+    expected = Matrix4.getTranslation(0.5, -0.25, 2.0) * Matrix4.getRotation(*[a * 37.0 for a in axis])
+    
+    numpy.testing.assert_allclose(joint.getTransformation(37.0).data, expected.data, atol=1e-6)
+
+def test_revolute_axis_is_normalized():
+    joint = RevoluteJoint('A', 'B', (0, 0, 3))
+    
+    assert joint.axis == (0.0, 0.0, 1.0)
+    numpy.testing.assert_allclose(joint.getTransformation(90.0).data, Matrix4.getRotationZ(90.0).data, atol=1e-6)
+
+def test_revolute_rejects_zero_axis():
+    with pytest.raises(Exception):
+        RevoluteJoint('A', 'B', (0, 0, 0))
+
+def test_prismatic_moves_along_axis():
+    joint = PrismaticJoint('A', 'B', (0, 1, 0), (1, 0))
+    
+    numpy.testing.assert_allclose(joint.getTransformation(0.5).data, Matrix4.getTranslation(1, 0.5, 0).data)
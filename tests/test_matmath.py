@@ -0,0 +1,275 @@
+from math import cos, radians, sin
+
+import numpy
+import pytest
+
+from etgg2801 import Frustum, Matrix4, Matrix4Array, Vector4, Vector4Array
+
+# Reference matrices are plain nested lists indexed [row][col], multiplied the
+# long way, so they share no code with the closed forms under test.
+
+def refMultiply(a, b):
+    return [[sum(a[r][k] * b[k][c] for k in range(4)) for c in range(4)] for r in range(4)]
+
+def refRotationX(angle):
+    c, s = cos(radians(angle)), sin(radians(angle))
+    return [[1, 0, 0, 0], [0, c, -s, 0], [0, s, c, 0], [0, 0, 0, 1]]
+
+def refRotationY(angle):
+    c, s = cos(radians(angle)), sin(radians(angle))
+    return [[c, 0, s, 0], [0, 1, 0, 0], [-s, 0, c, 0], [0, 0, 0, 1]]
+
+def refRotationZ(angle):
+    c, s = cos(radians(angle)), sin(radians(angle))
+    return [[c, -s, 0, 0], [s, c, 0, 0], [0, 0, 1, 0], [0, 0, 0, 1]]
+
+def refTranslation(dx, dy, dz):
+    return [[1, 0, 0, dx], [0, 1, 0, dy], [0, 0, 1, dz], [0, 0, 0, 1]]
+
+def refAxisRotation(axis, angle):
+    """Rodrigues' formula, R = cI + s[k]x + (1 - c)kk^T.
+    """
+    length = sum(a * a for a in axis) ** 0.5
+    x, y, z = [a / length for a in axis]
+    c, s = cos(radians(angle)), sin(radians(angle))
+    k = [[0, -z, y], [z, 0, -x], [-y, x, 0]]
+    kk = [[x * x, x * y, x * z], [y * x, y * y, y * z], [z * x, z * y, z * z]]
+    
+    result = [[0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 0], [0, 0, 0, 1]]
+    for r in range(3):
+        for col in range(3):
+            result[r][col] = (c if r == col else 0) + s * k[r][col] + (1 - c) * kk[r][col]
+    
+    return result
+
+def assertMatrix(m, expected):
+    numpy.testing.assert_allclose(m.data, numpy.array(expected, dtype=numpy.float64), atol=1e-5)
+
+ANGLES = [(0, 0, 0), (30, 0, 0), (0, -45, 0), (0, 0, 120), (10, 20, 30), (-75, 160, 5), (90, 90, 90)]
+
+@pytest.mark.parametrize('ax, ay, az', ANGLES)
+def test_rotation_is_x_times_y_times_z(ax, ay, az):
+    expected = refMultiply(refMultiply(refRotationX(ax), refRotationY(ay)), refRotationZ(az))
+    
+    assertMatrix(Matrix4.getRotation(ax, ay, az), expected)
+    assertMatrix(Matrix4.getRotationX(ax) * Matrix4.getRotationY(ay) * Matrix4.getRotationZ(az), expected)
+
+def test_translation():
+    assertMatrix(Matrix4.getTranslation(1.5, -2, 3.25), refTranslation(1.5, -2, 3.25))
+
+@pytest.mark.parametrize('axis, angle', [((1, 0, 0), 30), ((0, 2, 0), -60), ((1, 2, 3), 75), ((-0.3, 0.1, 0.9), 200)])
+def test_translation_rotation_is_translation_times_axis_rotation(axis, angle):
+    expected = refMultiply(refTranslation(4, -1, 0.5), refAxisRotation(axis, angle))
+    
+    assertMatrix(Matrix4.getTranslationRotation((4, -1, 0.5), axis, angle), expected)
+    assertMatrix(Matrix4.getAxisRotation(axis, angle), refAxisRotation(axis, angle))
+
+def test_translation_rotation_with_zero_axis_is_finite():
+    m = Matrix4.getTranslationRotation((1, 2, 3), (0, 0, 0), 45)
+    
+    assert numpy.isfinite(m.data).all()
+
+def makeTransforms():
+    a = Matrix4.getTranslation(1, 2, 3) * Matrix4.getRotation(10, 20, 30)
+    b = Matrix4.getTranslationRotation((-2, 0.5, 4), (1, 1, 0), 70)
+    refA = refMultiply(refTranslation(1, 2, 3), refMultiply(refMultiply(refRotationX(10), refRotationY(20)), refRotationZ(30)))
+    refB = refMultiply(refTranslation(-2, 0.5, 4), refAxisRotation((1, 1, 0), 70))
+    
+    return a, b, refA, refB
+
+def test_multiply():
+    a, b, refA, refB = makeTransforms()
+    
+    assertMatrix(a, refA)
+    assertMatrix(a * b, refMultiply(refA, refB))
+    assertMatrix(b * a, refMultiply(refB, refA))
+
+def test_multiply_vector():
+    a, _, refA, _ = makeTransforms()
+    v = (a * Vector4((0.5, -1, 2, 1))).data
+    
+    expected = [sum(refA[r][k] * (0.5, -1, 2, 1)[k] for k in range(4)) for r in range(4)]
+    numpy.testing.assert_allclose(v, expected, atol=1e-5)
+
+def test_imul_is_in_place():
+    a, b, refA, refB = makeTransforms()
+    ctype = a.getCType()
+    
+    assert a.imul(b) is a
+    assertMatrix(a, refMultiply(refA, refB))
+    assert a.getCType() is ctype
+    numpy.testing.assert_allclose(list(ctype), a.data.ravel(order='F'))
+
+def test_imul_by_itself():
+    a, _, refA, _ = makeTransforms()
+    a *= a
+    
+    assertMatrix(a, refMultiply(refA, refA))
+
+def test_inverse_of_rigid_transform():
+    a, b, refA, refB = makeTransforms()
+    
+    for m in (a, b, a * b):
+        assertMatrix(m.inverse() * m, refTranslation(0, 0, 0))
+        assertMatrix(m * m.inverse(), refTranslation(0, 0, 0))
+    
+    numpy.testing.assert_allclose(a.inverse().data, numpy.linalg.inv(numpy.array(refA)), atol=1e-5)
+
+def test_ctype_is_column_major_and_shared():
+    a, _, refA, _ = makeTransforms()
+    ctype = a.getCType()
+    
+    numpy.testing.assert_allclose(list(ctype), [refA[r][c] for c in range(4) for r in range(4)], atol=1e-5)
+    
+    a.set(1, 3, 42.0)
+    assert ctype[13] == 42.0
+
+def test_matrix_array_constructors_match_matrix4():
+    ax, ay, az = [10, 0, -75, 90], [20, 45, 160, 90], [30, 0, 5, 90]
+    rotations = Matrix4Array.getRotation(ax, ay, az)
+    translations = Matrix4Array.getTranslation([1, 0, -2, 3], [0, 4, 5, -1], 0.5)
+    offsets, axes, angles = [(1, 2, 3), (0, 0, 0), (-1, 4, 2), (2, 2, 2)], [(1, 0, 0), (0, 2, 0), (1, 2, 3), (0, 0, 0)], [30, -60, 75, 45]
+    rigid = Matrix4Array.getTranslationRotation(offsets, axes, angles)
+    
+    for i in range(4):
+        assertMatrix(rotations[i], Matrix4.getRotation(ax[i], ay[i], az[i]).data)
+        assertMatrix(translations[i], Matrix4.getTranslation(translations.data[i, 0, 3], translations.data[i, 1, 3], 0.5).data)
+        assertMatrix(rigid[i], Matrix4.getTranslationRotation(offsets[i], axes[i], angles[i]).data)
+    
+    assert numpy.isfinite(rigid.data).all()
+
+def makeArrays():
+    a = Matrix4Array.getTranslation([1, -2, 0.5], [2, 0, 1], [3, 1, -4])
+    a.imul(Matrix4Array.getRotation([10, -75, 90], [20, 160, 90], [30, 5, 90]))
+    b = Matrix4Array.getTranslationRotation([(-2, 0.5, 4), (0, 0, 0), (1, 1, 1)], [(1, 1, 0), (0, 0, 1), (1, 2, 3)], [70, 15, -120])
+    
+    return a, b
+
+def test_matrix_array_multiply_and_imul():
+    a, b = makeArrays()
+    m = Matrix4.getRotationY(33)
+    
+    for i in range(3):
+        assertMatrix((a * b)[i], (a[i] * b[i]).data)
+        assertMatrix((a * m)[i], (a[i] * m).data)
+        assertMatrix((m * a)[i], (m * a[i]).data)
+    
+    expected = [(a[i] * b[i]).data.copy() for i in range(3)]
+    buffer = a.getBuffer()
+    assert a.imul(b) is a
+    assert a.getBuffer() is buffer
+    for i in range(3):
+        assertMatrix(a[i], expected[i])
+
+def test_matrix_array_inverse():
+    a, _ = makeArrays()
+    inverse = a.inverse()
+    
+    for i in range(3):
+        assertMatrix(inverse[i], a[i].inverse().data)
+        assertMatrix(inverse[i] * a[i], refTranslation(0, 0, 0))
+
+def test_matrix_array_ctype_is_column_major_and_shared():
+    a, _ = makeArrays()
+    ctype = a.getCType()
+    
+    numpy.testing.assert_allclose(list(ctype), numpy.concatenate([list(a[i].getCType()) for i in range(3)]))
+    
+    a.data[2, 1, 3] = 42.0
+    assert ctype[2 * 16 + 13] == 42.0
+
+def test_vector_array_matches_vector4():
+    points = [(0.5, -1, 2), (3, 0, 0), (0, 0, 0), (-1, 4, 2)]
+    a = Vector4Array(data=points)
+    b = Vector4Array(data=[(1, 1, 0), (0, 2, 0), (1, 2, 3), (0, 0, 1)])
+    m, _ = makeArrays()
+    m = Matrix4Array.fromMatrices([m[0], m[1], m[2], Matrix4.getRotationX(20)])
+    
+    numpy.testing.assert_allclose(a.data[:, 3], 1.0)
+    numpy.testing.assert_allclose((a + b).data[:, 0:3], a.getXYZ() + b.getXYZ())
+    numpy.testing.assert_allclose((a - b).data[:, 0:3], a.getXYZ() - b.getXYZ())
+    numpy.testing.assert_allclose((a * 2.0).getXYZ(), a.getXYZ() * 2.0)
+    
+    cross = a.cross(b)
+    transformed = m * a
+    for i in range(4):
+        assert a.dot(b)[i] == pytest.approx(a[i].dot(b[i]))
+        assert a.length()[i] == pytest.approx(a[i].length())
+        numpy.testing.assert_allclose(cross[i].data, a[i].cross(b[i]).data, atol=1e-6)
+        numpy.testing.assert_allclose(transformed[i].data, (m[i] * a[i]).data, atol=1e-5)
+    
+    normalized = Vector4Array(data=points).normalize()
+    assert numpy.isfinite(normalized.data).all()
+    numpy.testing.assert_allclose(normalized.length(), [1, 1, 0, 1], atol=1e-6)
+    assert list(normalized.getCType())[4:8] == [1.0, 0.0, 0.0, 1.0]
+
+def makeFrustum():
+    """Returns the frustum of a 90 degree perspective camera at the origin
+    looking down -z, from z = -1 to z = -100.
+    """
+    return Frustum(Matrix4.getPerspective(90.0, 1.0, 1.0, 100.0))
+
+def visibleBounds(frustum, matrices, centers, extents, radii):
+    return list(frustum.testBounds(numpy.array([m.data for m in matrices]), numpy.array(centers, dtype=numpy.float64),
+                                   numpy.array(extents, dtype=numpy.float64), numpy.array(radii, dtype=numpy.float64)))
+
+def test_bounds_inside_outside_and_straddling():
+    frustum = makeFrustum()
+    at = Matrix4.getTranslation
+    
+    # at z = -10 the side planes are at x = +-10 and y = +-10
+    volumes = [
+        (at(0, 0, -10), True),      # inside
+        (at(0, 0, 10), False),      # behind the camera
+        (at(0, 0, -200), False),    # beyond the far plane
+        (at(-20, 0, -10), False),   # left of the view
+        (at(0, 13, -10), False),    # above the view
+        (at(10.5, 0, -10), True),   # straddling the right plane
+        (at(0, 0, -0.5), True),     # straddling the near plane
+        (at(0, 0, -100.5), True)]   # straddling the far plane
+    
+    visible = visibleBounds(frustum, [m for m, v in volumes], [(0, 0, 0)] * len(volumes), [(1, 1, 1)] * len(volumes), [3 ** 0.5] * len(volumes))
+    
+    assert visible == [v for m, v in volumes]
+    frustum.beginFrame()
+    assert frustum.getFrameStats() == (4, len(volumes))
+
+def test_bounds_use_center_rotation_and_radius():
+    frustum = makeFrustum()
+    
+    # a long thin box reaching into the view from beyond the right plane,
+    # unless it is turned upright or its sphere is smaller than its reach
+    matrices = [Matrix4.getTranslation(13, 0, -10), Matrix4.getTranslation(13, 0, -10) * Matrix4.getRotationZ(90), Matrix4.getTranslation(13, 0, -10)]
+    visible = visibleBounds(frustum, matrices, [(0, 0, 0)] * 3, [(5, 0.1, 0.1)] * 3, [6, 6, 1])
+    assert visible == [True, False, False]
+    
+    # the center is in the volume's own space, before the transform
+    visible = visibleBounds(frustum, [Matrix4.getTranslation(0, 0, -10)] * 2, [(0, 0, 0), (30, 0, 0)], [(1, 1, 1)] * 2, [2, 2])
+    assert visible == [True, False]
+
+def test_bounds_match_box_corners():
+    frustum = makeFrustum()
+    random = numpy.random.RandomState(7)
+    matrices = [Matrix4.getTranslation(*random.uniform(-40, 40, 3)) * Matrix4.getRotation(*random.uniform(-180, 180, 3)) for i in range(500)]
+    centers = random.uniform(-2, 2, (500, 3))
+    extents = random.uniform(0.1, 5, (500, 3))
+    
+    # with spheres that never cull, a box is culled when all its corners lie
+    # outside the same plane
+    signs = numpy.array([(x, y, z) for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)])
+    expected = []
+    for m, center, extent in zip(matrices, centers, extents):
+        corners = numpy.hstack((center + signs * extent, numpy.ones((8, 1)))) @ m.data.T.astype(numpy.float64)
+        distances = corners @ frustum.planes.T
+        expected.append(not (distances < 0).all(axis=0).any())
+    
+    visible = visibleBounds(frustum, matrices, centers, extents, [1e9] * 500)
+    assert visible == expected
+    assert 0 < sum(visible) < 500
+
+def test_bounds_without_matrix_cull_nothing():
+    frustum = Frustum()
+    
+    assert visibleBounds(frustum, [Matrix4.getTranslation(0, 0, 10)], [(0, 0, 0)], [(1, 1, 1)], [2]) == [True]
+    frustum.beginFrame()
+    assert frustum.getFrameStats() == (0, 0)
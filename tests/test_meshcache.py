@@ -0,0 +1,105 @@
+import os
+
+import numpy
+import pytest
+
+from etgg2801.meshcache import MeshCache
+from etgg2801.model import OBJReader
+
+OBJ = 'o A\nv 0 0 0\nv 1 0 0\nv 0 1 0\nvt 0 0\nvt 1 1\nvt 0 1\nf 1/1 2/2 3/3\n'
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / 'model.obj'
+    path.write_text(OBJ)
+    
+    return str(path)
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Counts the calls of OBJReader.iterParts, i.e. the reads that parsed
+    the file rather than loading the cache.
+    """
+    calls = []
+    iterParts = OBJReader.iterParts
+    
+    def countingIterParts(file):
+        calls.append(file)
+        return iterParts(file)
+    
+    monkeypatch.setattr(OBJReader, 'iterParts', staticmethod(countingIterParts))
+    
+    return calls
+
+def entries(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.meshcache'))
+
+def test_store_and_load(source, tmp_path):
+    cache = MeshCache(source, str(tmp_path))
+    arrays = {'a': numpy.arange(5, dtype=numpy.float32), 'b': numpy.array([7, 8], dtype=numpy.uint32)}
+    cache.store({'names': ['A']}, arrays)
+    
+    meta, loaded = MeshCache(source, str(tmp_path)).load()
+    assert meta == {'names': ['A']}
+    for name, a in arrays.items():
+        assert loaded[name].dtype == a.dtype
+        assert list(loaded[name]) == list(a)
+        assert loaded[name].ctypes.data % MeshCache.ALIGNMENT == 0
+
+def test_missing_entry(source):
+    assert MeshCache(source).load() is None
+
+def test_changed_version_is_stale(source, tmp_path):
+    MeshCache(source, str(tmp_path), version=1).store({}, {'a': numpy.zeros(3)})
+    
+    assert MeshCache(source, str(tmp_path), version=2).load() is None
+    assert MeshCache(source, str(tmp_path), version=1).load() is not None
+
+def test_evict_keeps_other_sources(source, tmp_path):
+    directory = tmp_path / 'cache'
+    directory.mkdir()
+    other = tmp_path / 'model.obj2'
+    other.write_text(OBJ)
+    MeshCache(str(other), str(directory)).store({}, {})
+    MeshCache(source, str(directory)).store({}, {})
+    old = entries(directory)
+    
+    with open(source, 'a') as fp:
+        fp.write('f 3/3 2/2 1/1\n')
+    cache = MeshCache(source, str(directory))
+    assert cache.load() is None
+    cache.store({}, {})
+    
+    # the entry for the old contents is gone, the other file's entry is kept
+    assert len(old) == 2
+    assert entries(directory) == sorted([os.path.basename(cache.path), 'model.obj2.%s.meshcache' % MeshCache.hashFile(str(other))[:16]])
+
+def test_read_file_hit(source, tmp_path, parses):
+    first = OBJReader.readFile(source, cache=str(tmp_path))
+    second = OBJReader.readFile(source, cache=str(tmp_path))
+    
+    assert len(parses) == 1
+    assert [p.name for p in second.parts] == ['A']
+    assert list(second.parts[0].indices) == list(first.parts[0].indices)
+    assert list(second.parts[0].uvs) == list(first.parts[0].uvs)
+    assert list(second.getNormalList()) == list(first.getNormalList())
+
+def test_read_file_changed_source(source, tmp_path, parses):
+    OBJReader.readFile(source, cache=str(tmp_path))
+    with open(source, 'w') as fp:
+        fp.write(OBJ.replace('o A', 'o B'))
+    
+    model = OBJReader.readFile(source, cache=str(tmp_path))
+    
+    assert len(parses) == 2
+    assert [p.name for p in model.parts] == ['B']
+    assert len(entries(tmp_path)) == 1
+
+def test_read_file_changed_version(source, tmp_path, parses, monkeypatch):
+    OBJReader.readFile(source, cache=str(tmp_path))
+    monkeypatch.setattr(OBJReader, 'VERSION', OBJReader.VERSION + 1)
+    OBJReader.readFile(source, cache=str(tmp_path))
+    OBJReader.readFile(source, cache=str(tmp_path))
+    
+    assert len(parses) == 2
+    assert len(entries(tmp_path)) == 1
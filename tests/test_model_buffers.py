@@ -0,0 +1,126 @@
+import os
+
+import numpy
+import pytest
+from OpenGL import GL
+
+from etgg2801 import Model, ModelPart, OBJReader
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def readIndices(indices, drawRange):
+    """Returns the model-wide vertex indices of a draw range of the index
+    bytes returned by buildIndexedBuffers.
+    """
+    count, indexType, byteOffset, baseVertex = drawRange
+    dtype = numpy.uint16 if indexType == GL.GL_UNSIGNED_SHORT else numpy.uint32
+    
+    return numpy.frombuffer(indices, dtype=dtype, count=count, offset=byteOffset).astype(numpy.int64) + baseVertex
+
+def makeGrid(size=8):
+    """Returns a model holding a flat, uv mapped size x size grid of quads.
+    """
+    x, z = numpy.meshgrid(numpy.arange(size + 1), numpy.arange(size + 1), indexing='ij')
+    positions = numpy.stack((x, numpy.zeros_like(x), z), axis=-1).reshape(-1, 3)
+    corners = (x[:-1, :-1] * (size + 1) + z[:-1, :-1]).ravel()
+    quads = numpy.stack((corners, corners + 1, corners + size + 2, corners + size + 1), axis=-1)
+    triangles = numpy.concatenate((quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]), axis=1).reshape(-1, 3)
+    
+    part = ModelPart()
+    part.setName('grid')
+    part.setData(positions.astype(numpy.float32).ravel(), triangles.astype(numpy.uint32).ravel(),
+                 (positions[:, [0, 2]] / size).astype(numpy.float32).ravel(), triangles.astype(numpy.uint32).ravel())
+    model = Model()
+    model.addPart(part)
+    model.generateNormals()
+    model.computeBounds()
+    
+    return model
+
+@pytest.mark.parametrize('creaseAngle', [0.0, 30.0])
+def test_welded_buffers_rebuild_vertices(creaseAngle):
+    model = OBJReader.readFile(os.path.join(ROOT, 'scara.obj'))
+    model.generateNormals(creaseAngle)
+    positions, uvs, normals, indices, drawRanges, lodDrawRanges = model.buildIndexedBuffers()
+    
+    corners = numpy.concatenate([readIndices(indices, r) for r in drawRanges])
+    
+    assert len(positions) // 3 < len(corners)
+    numpy.testing.assert_array_equal(positions.reshape(-1, 3)[corners], model.getVertexList().reshape(-1, 3))
+    # the scara has no uvs
+    assert not uvs.any()
+    numpy.testing.assert_array_equal(normals.reshape(-1, 3)[corners], model.getNormalList().reshape(-1, 3))
+
+def test_welded_levels_of_detail():
+    model = makeGrid()
+    model.generateLODs((0.5, 0.25))
+    positions, uvs, normals, indices, drawRanges, lodDrawRanges = model.buildIndexedBuffers()
+    part = model.parts[0]
+    objPositions = model.getOBJVertexList().reshape(-1, 3)
+    
+    assert lodDrawRanges[0][0] == drawRanges[0]
+    assert len(lodDrawRanges[0]) == 1 + len(part.lods)
+    assert len(positions) // 3 == len(objPositions)
+    corners = readIndices(indices, drawRanges[0])
+    numpy.testing.assert_array_equal(positions.reshape(-1, 3)[corners], model.getVertexList().reshape(-1, 3))
+    numpy.testing.assert_array_equal(uvs.reshape(-1, 2)[corners], model.getOBJUVList().reshape(-1, 2)[model.getUVIndexList()])
+    numpy.testing.assert_array_equal(normals.reshape(-1, 3)[corners], model.getNormalList().reshape(-1, 3))
+    for levelRange, (lodIndices, error) in zip(lodDrawRanges[0][1:], part.lods):
+        corners = readIndices(indices, levelRange)
+        numpy.testing.assert_array_equal(positions.reshape(-1, 3)[corners], objPositions[numpy.asarray(lodIndices)])
+        numpy.testing.assert_allclose(normals.reshape(-1, 3)[corners], numpy.tile((0, 1, 0), (len(corners), 1)))
+
+def makeFold(angle):
+    """Returns a model of two triangles sharing the edge from (0, 0, 0) to
+    (1, 0, 0), with face normals angle degrees apart, and a degenerate
+    triangle touching the first one.
+    """
+    a = numpy.radians(angle)
+    part = ModelPart()
+    part.setName('fold')
+    part.setData(
+        numpy.array([0, 0, 0, 1, 0, 0, 0, 1, 0, 0, -numpy.cos(a), numpy.sin(a), 0, 2, 0], dtype=numpy.float32),
+        numpy.array([0, 1, 2, 1, 0, 3, 2, 4, 2], dtype=numpy.uint32),
+        [], [])
+    model = Model()
+    model.addPart(part)
+    
+    return model
+
+@pytest.mark.parametrize('creaseAngle', [0.0, 59.0])
+def test_crease_keeps_flat_normals(creaseAngle):
+    model = makeFold(60.0)
+    model.generateNormals(creaseAngle)
+    normals = model.getNormalList().reshape(-1, 3, 3)
+    
+    assert numpy.isfinite(normals).all()
+    numpy.testing.assert_allclose(normals[0], numpy.tile((0, 0, 1), (3, 1)), atol=1e-6)
+    numpy.testing.assert_allclose(normals[1], numpy.tile((0, numpy.sin(numpy.radians(60.0)), numpy.cos(numpy.radians(60.0))), (3, 1)), atol=1e-6)
+
+def test_crease_smooths_shared_corners():
+    model = makeFold(60.0)
+    model.generateNormals(61.0)
+    normals = model.getNormalList().reshape(-1, 3, 3)
+    
+    # the faces have equal areas, so the shared corners get the bisector
+    bisector = numpy.array((0, numpy.sin(numpy.radians(30.0)), numpy.cos(numpy.radians(30.0))))
+    assert numpy.isfinite(normals).all()
+    numpy.testing.assert_allclose(normals[0, 0:2], numpy.tile(bisector, (2, 1)), atol=1e-6)
+    numpy.testing.assert_allclose(normals[1, 0:2], numpy.tile(bisector, (2, 1)), atol=1e-6)
+    
+    # corners used by a single face keep its normal
+    numpy.testing.assert_allclose(normals[0, 2], (0, 0, 1), atol=1e-6)
+    numpy.testing.assert_allclose(normals[1, 2], (0, numpy.sin(numpy.radians(60.0)), numpy.cos(numpy.radians(60.0))), atol=1e-6)
+
+@pytest.mark.parametrize('creaseAngle', [0.0, 45.0, 180.0])
+def test_degenerate_face_gives_no_nans(creaseAngle):
+    model = makeFold(60.0)
+    model.generateNormals(creaseAngle)
+    normals = model.getNormalList().reshape(-1, 3, 3)
+    
+    assert numpy.isfinite(normals).all()
+    # the zero area face adds nothing to the corner it shares, and its own
+    # corners are either left at zero or take the other face's normal
+    numpy.testing.assert_allclose(normals[0, 2], (0, 0, 1), atol=1e-6)
+    for normal in normals[2]:
+        assert numpy.linalg.norm(normal) == pytest.approx(0.0) or numpy.allclose(normal, (0, 0, 1), atol=1e-6)
@@ -0,0 +1,78 @@
+import numpy
+import pytest
+
+from etgg2801.model import ModelPart, OBJReader
+
+HEADER = 'v 0 0 0\nv 1 0 0\nv 0 1 0\nvt 0 0\nvt 1 1\nvt 0 1\n'
+
+def writeOBJ(tmp_path, text):
+    path = tmp_path / 'model.obj'
+    path.write_text(text)
+    
+    return str(path)
+
+@pytest.mark.parametrize('faces, uvIndices', [
+    ('f 1 2 3\nf 1 2 3\n', []),
+    ('f 1/1 2/2 3/3\nf 1/1 2/2 3/3\n', [0, 1, 2, 0, 1, 2]),
+    ('f 1//1 2//1 3//1\nf 1//1 2//1 3//1\n', []),
+    ('f 1/1/1 2/2/1 3/3/1\nf 1/1/1 2/2/1 3/3/1\n', [0, 1, 2, 0, 1, 2]),
+    ('f 1 2 3\nf 1/1 2/2 3/3\n', [0, 1, 2]),
+    ('f 1/1 2/2 3/3\nf 1 2 3\n', [0, 1, 2]),
+    ('f 1/1 2 3//1\nf 1/1/1 2/2/1 3/3/1\n', [0, 0, 1, 2]),
+])
+def test_face_layouts(tmp_path, faces, uvIndices):
+    file = writeOBJ(tmp_path, 'o A\n' + HEADER + faces)
+    
+    for parts in (list(OBJReader.iterParts(file)), OBJReader.readFileByLine(file).parts):
+        assert len(parts) == 1
+        assert list(parts[0].indices) == [0, 1, 2, 0, 1, 2]
+        assert list(parts[0].uvIndices) == uvIndices
+
+def test_object_line_with_tab(tmp_path):
+    file = writeOBJ(tmp_path, 'o\tA\n' + HEADER + 'f 1 2 3\no B\n' + HEADER + 'f 4 5 6\n')
+    
+    parts = list(OBJReader.iterParts(file))
+    assert [p.name for p in parts] == ['A', 'B']
+    assert list(parts[1].indices) == [3, 4, 5]
+
+def test_statements_with_tabs_and_spaces(tmp_path):
+    file = writeOBJ(tmp_path, 'o A\n' + HEADER.replace('vt ', 'vt\t').replace('v 1', 'v   1') + 'f\t1/1 2/2 3/3\nf  1/1 2/2 3/3\n')
+    
+    for parts in (list(OBJReader.iterParts(file)), OBJReader.readFileByLine(file).parts):
+        assert len(parts) == 1
+        assert list(parts[0].vertices) == [0, 0, 0, 1, 0, 0, 0, 1, 0]
+        assert list(parts[0].uvs) == [0, 0, 1, 1, 0, 1]
+        assert list(parts[0].indices) == [0, 1, 2, 0, 1, 2]
+        assert list(parts[0].uvIndices) == [0, 1, 2, 0, 1, 2]
+
+def test_geometry_before_first_object(tmp_path):
+    file = writeOBJ(tmp_path, '# comment\n' + HEADER + 'f 1 2 3\no B\n' + HEADER + 'f 4 5 6\n')
+    
+    for parts in (list(OBJReader.iterParts(file)), OBJReader.readPartsParallel(file, 2), OBJReader.readFileByLine(file).parts):
+        assert [p.name for p in parts] == [OBJReader.DEFAULT_PART_NAME, 'B']
+        assert list(parts[0].indices) == [0, 1, 2]
+
+def test_no_default_part_without_geometry(tmp_path):
+    file = writeOBJ(tmp_path, '# comment\nmtllib model.mtl\no A\n' + HEADER + 'f 1 2 3\n')
+    
+    assert [p.name for p in OBJReader.iterParts(file)] == ['A']
+
+def test_add_to_parsed_part(tmp_path):
+    file = writeOBJ(tmp_path, 'o A\n' + HEADER + 'f 1/1 2/2 3/3\n')
+    part = next(OBJReader.iterParts(file))
+    
+    part.addVertex(2.0)
+    part.addIndex(3)
+    part.addUV(0.5)
+    part.addUVIndex(1)
+    
+    assert part.getNumIndices() == 4
+    assert part.getNumUVIndices() == 4
+    assert numpy.asarray(part.vertices, dtype=numpy.float32)[-1] == 2.0
+    assert list(part.indices) == [0, 1, 2, 3]
+
+def test_add_to_new_part():
+    part = ModelPart()
+    part.addIndex(0)
+    
+    assert part.indices == [0]
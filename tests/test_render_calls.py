@@ -0,0 +1,108 @@
+import os
+
+import numpy
+import pytest
+
+from etgg2801 import Frustum, GLState, Model, ModelPart, OBJReader, RecordingGL, Scara, Viper
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def recorder():
+    recorder = RecordingGL(gl=None, trace=False)
+    recorder.install()
+    GLState.reset()
+    yield recorder
+    recorder.uninstall()
+    GLState.reset()
+
+def makeModel(numParts):
+    """Returns a Model with numParts one-triangle parts named L0, L1, ...
+    """
+    model = Model()
+    for i in range(numParts):
+        part = ModelPart()
+        part.setName('L%d' % i)
+        part.setData(
+            numpy.array([0, 0, i, 1, 0, i, 0, 1, i], dtype=numpy.float32),
+            numpy.array([3 * i, 3 * i + 1, 3 * i + 2], dtype=numpy.uint32),
+            [], [])
+        model.addPart(part)
+    model.generateNormals()
+    
+    return model
+
+def setUp(robot):
+    robot.model.loadToVRAM()
+    robot.modelview_loc = 0
+    robot.partTransforms_loc = 1
+    robot.frustum = Frustum()
+    
+    # distinct link transforms, so that GLState elides no uniform upload
+    for i, j in enumerate(robot.joints):
+        j.value = 0.05 * (i + 1)
+    
+    return robot
+
+def renderFrame(recorder, render):
+    """Returns the statistics of a frame made of a single call of render,
+    starting from an unknown GL state.
+    """
+    GLState.reset()
+    recorder.endFrame()
+    render()
+    
+    return recorder.endFrame()
+
+@pytest.fixture
+def scara(recorder):
+    return setUp(Scara(OBJReader.readFile(os.path.join(ROOT, 'scara.obj'))))
+
+@pytest.fixture
+def viper(recorder):
+    return setUp(Viper(makeModel(6)))
+
+@pytest.mark.parametrize('robotName, numLinks', [('scara', 4), ('viper', 6)])
+def test_render(request, recorder, robotName, numLinks):
+    robot = request.getfixturevalue(robotName)
+    stats = renderFrame(recorder, robot.render)
+    
+    assert stats['byName']['glBindVertexArray'] == 1
+    assert stats['byName']['glUniformMatrix4fv'] == numLinks
+    assert stats['byName']['glDrawElementsBaseVertex'] == numLinks
+    assert stats['calls'] == 1 + 2 * numLinks
+
+@pytest.mark.parametrize('robotName, numIndexTypes', [('scara', 2), ('viper', 1)])
+def test_render_multi(request, recorder, robotName, numIndexTypes):
+    robot = request.getfixturevalue(robotName)
+    stats = renderFrame(recorder, robot.renderMulti)
+    
+    # one draw per index type in use, however many links
+    assert stats['byName']['glBindVertexArray'] == 1
+    assert stats['byName']['glUniformMatrix4fv'] == 1
+    assert stats['byName']['glMultiDrawElementsBaseVertex'] == numIndexTypes
+    assert stats['calls'] == 2 + numIndexTypes
+
+def test_steady_state_skips_bind(recorder, scara):
+    renderFrame(recorder, scara.render)
+    scara.render()
+    
+    assert recorder.endFrame()['byName']['glBindVertexArray'] == 0
+
+def test_multi_draw_arguments_are_bounded(recorder):
+    model = makeModel(Model.MULTI_DRAW_CACHE_SIZE + 8)
+    model.loadToVRAM()
+    names = ['L%d' % i for i in range(len(model.parts))]
+    cache = model._Model__multiDrawArgs
+    
+    # a new visible subset every frame, with the full set drawn in between
+    for i in range(1, len(names)):
+        model.renderPartsMulti(names[:i])
+        model.renderPartsMulti(names)
+    
+    assert len(cache) == Model.MULTI_DRAW_CACHE_SIZE
+    assert tuple(names) in cache
+    assert tuple(names[:1]) not in cache
+    
+    model.renderPartsMulti(names[:1])
+    assert recorder.endFrame()['byName']['glMultiDrawElementsBaseVertex'] == 2 * len(names) - 1
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+from OpenGL import GL
+from OpenGL.error import GLError
+
+from etgg2801 import GLState, RecordingGL, ShaderProgram
+
+SOURCES = ('void main() {}', 'void main() {}')
+
+@pytest.fixture
+def recorder():
+    recorder = RecordingGL(gl=None, trace=False)
+    recorder.install()
+    GLState.reset()
+    yield recorder
+    recorder.uninstall()
+    GLState.reset()
+
+def writeCache(directory):
+    path = os.path.join(str(directory), ShaderProgram.getCacheKey(SOURCES) + '.shaderbin')
+    with open(path, 'wb') as fp:
+        fp.write(b'\x01\x00\x00\x00binary')
+    
+    return path
+
+def test_cached_binary_skips_compiling(recorder, tmp_path):
+    writeCache(tmp_path)
+    program = ShaderProgram(*SOURCES, cache=str(tmp_path))
+    
+    assert program.isReady()
+    assert recorder.frame['byName']['glProgramBinary'] == 1
+    assert recorder.frame['byName']['glCompileShader'] == 0
+
+def test_rejected_binary_format_falls_back_to_source(recorder, tmp_path):
+    path = writeCache(tmp_path)
+    
+    def glProgramBinary(program, binaryFormat, binary, length):
+        raise GLError(GL.GL_INVALID_ENUM, None, description=b'unsupported binary format')
+    recorder.glProgramBinary = glProgramBinary
+    
+    program = ShaderProgram(*SOURCES, cache=str(tmp_path))
+    program.finish()
+    
+    assert program.ready
+    assert recorder.frame['byName']['glCompileShader'] == 2
+    assert not os.path.exists(path)
@@ -0,0 +1,102 @@
+import numpy
+import pytest
+
+from etgg2801 import Frustum, Matrix4, MeshSimplifier, Model, ModelPart, simplify
+
+def makeSphere(rows=16, columns=32, radius=1.0):
+    """Returns (positions, triangles) of a closed UV sphere.
+    """
+    theta = numpy.linspace(0.0, numpy.pi, rows + 1)[1:-1]
+    phi = numpy.linspace(0.0, 2.0 * numpy.pi, columns, endpoint=False)
+    t, p = numpy.meshgrid(theta, phi, indexing='ij')
+    ring = numpy.stack((numpy.sin(t) * numpy.cos(p), numpy.cos(t), numpy.sin(t) * numpy.sin(p)), axis=-1).reshape(-1, 3)
+    positions = numpy.vstack(([0.0, 1.0, 0.0], ring, [0.0, -1.0, 0.0])) * radius
+    
+    def index(r, c):
+        return 1 + r * columns + c % columns
+    
+    triangles = []
+    bottom = len(positions) - 1
+    for c in range(columns):
+        triangles.append((0, index(0, c + 1), index(0, c)))
+        triangles.append((bottom, index(rows - 2, c), index(rows - 2, c + 1)))
+        for r in range(rows - 2):
+            a, b = index(r, c), index(r, c + 1)
+            d, e = index(r + 1, c), index(r + 1, c + 1)
+            triangles.append((a, b, e))
+            triangles.append((a, e, d))
+    
+    return positions, numpy.array(triangles)
+
+def makeModel():
+    positions, triangles = makeSphere()
+    part = ModelPart()
+    part.setName('sphere')
+    part.setData(positions.astype(numpy.float32).ravel(), triangles.astype(numpy.uint32).ravel(), [], [])
+    model = Model()
+    model.addPart(part)
+    model.computeBounds()
+    model.generateLODs()
+    
+    return model
+
+def test_levels_reach_their_ratios():
+    positions, triangles = makeSphere()
+    ratios = (0.5, 0.25, 0.125)
+    levels = MeshSimplifier.simplify(positions, triangles, ratios)
+    
+    assert len(levels) == len(ratios)
+    for ratio, (indices, error) in zip(ratios, levels):
+        assert len(indices) <= int(len(triangles) * ratio)
+        assert indices.min() >= 0 and indices.max() < len(positions)
+        # no degenerate triangles are left
+        assert (indices[:, 0] != indices[:, 1]).all()
+        assert (indices[:, 1] != indices[:, 2]).all()
+        assert (indices[:, 2] != indices[:, 0]).all()
+
+def test_error_is_monotone():
+    positions, triangles = makeSphere()
+    errors = [error for indices, error in MeshSimplifier.simplify(positions, triangles, (0.75, 0.5, 0.25, 0.125, 0.0625))]
+    
+    assert errors == sorted(errors)
+    assert errors[0] > 0.0
+
+def test_refused_pass_does_not_stop_simplification(monkeypatch):
+    positions, triangles = makeSphere()
+    faceNormals = simplify._faceNormals
+    calls = []
+    
+    # make every collapse selected by the first pass look like a flip
+    def flipFirstPass(points, triangles):
+        calls.append(len(triangles))
+        normals = faceNormals(points, triangles)
+        return -normals if len(calls) == 2 else normals
+    monkeypatch.setattr(simplify, '_faceNormals', flipFirstPass)
+    
+    [(indices, error)] = MeshSimplifier.simplify(positions, triangles, (0.5,))
+    assert len(calls) > 2
+    assert len(indices) <= len(triangles) // 2
+
+def test_select_levels_follows_pixels_per_unit():
+    model = makeModel()
+    errors = numpy.array([error for indices, error in model.parts[0].lods])
+    frustum = Frustum(Matrix4.getPerspective(60.0, 1.0, 0.1, 1000.0))
+    
+    distances = numpy.array([2.0, 10.0, 50.0, 250.0, 900.0])
+    matrices = numpy.tile(numpy.identity(4), (len(distances), 1, 1))[:, numpy.newaxis]
+    matrices[:, 0, 2, 3] = -distances
+    
+    levels = model.selectLevels(['sphere'], matrices, frustum)
+    assert levels.shape == (len(distances), 1)
+    
+    # the coarsest level whose error spans at most LOD_PIXEL_ERROR pixels
+    pixelsPerUnit = frustum.getPixelsPerUnit(numpy.stack((numpy.zeros_like(distances), numpy.zeros_like(distances), -distances), axis=1))
+    expected = (errors[numpy.newaxis, :] * pixelsPerUnit[:, numpy.newaxis] <= Model.LOD_PIXEL_ERROR).sum(axis=1)
+    assert levels[:, 0].tolist() == expected.tolist()
+    assert levels[0, 0] == 0 and levels[-1, 0] == len(errors)
+    assert (numpy.diff(levels[:, 0]) >= 0).all()
+
+def test_select_levels_without_frustum_matrix():
+    model = makeModel()
+    
+    assert model.selectLevels(['sphere'], numpy.identity(4)[numpy.newaxis], Frustum()) is None
@@ -0,0 +1,97 @@
+import threading
+import time
+
+import numpy
+import pytest
+
+from etgg2801 import SimulationThread, TripleBuffer
+
+def test_acquire_returns_latest_published():
+    buffer = TripleBuffer(list)
+    
+    buffer.getBack().append('a')
+    buffer.publish(1.0)
+    buffer.getBack().append('b')
+    buffer.publish(2.0)
+    
+    snapshot, timestamp = buffer.acquire()
+    assert (snapshot, timestamp) == (['b'], 2.0)
+    
+    # nothing new was published, so the same snapshot is returned
+    assert buffer.acquire()[0] is snapshot
+    
+    buffer.getBack().append('c')
+    buffer.publish(3.0)
+    assert buffer.acquire() == (['a', 'c'], 3.0)
+
+def test_writer_never_gets_the_acquired_snapshot():
+    buffer = TripleBuffer(list)
+    
+    for i in range(10):
+        buffer.publish(float(i))
+        front = buffer.acquire()[0]
+        assert buffer.getBack() is not front
+        buffer.publish(float(i) + 0.5)
+        assert buffer.getBack() is not front
+
+def test_concurrent_reads_do_not_tear():
+    buffer = TripleBuffer(lambda: numpy.zeros(1 << 16))
+    count = 2000
+    
+    def write():
+        for i in range(1, count + 1):
+            buffer.getBack()[:] = i
+            buffer.publish(float(i))
+    
+    writer = threading.Thread(target=write)
+    writer.start()
+    
+    last = 0.0
+    while writer.is_alive() or last < count:
+        snapshot, timestamp = buffer.acquire()
+        
+        # every value of a snapshot comes from the same write, the one its
+        # timestamp was published with, and snapshots never go back in time
+        assert (snapshot == timestamp).all()
+        assert timestamp >= last
+        last = timestamp
+    writer.join()
+
+class CountingDelegate(object):
+    def __init__(self, failAt=None):
+        self.steps = 0
+        self.failAt = failAt
+    
+    def update(self, dtime):
+        self.steps += 1
+        if self.steps == self.failAt:
+            raise ValueError("update failed")
+    
+    def createSnapshot(self):
+        return [0]
+    
+    def writeSnapshot(self, snapshot):
+        snapshot[0] = self.steps
+
+def test_simulation_thread_publishes_steps():
+    delegate = CountingDelegate()
+    simulation = SimulationThread(delegate, timeStep=1)
+    simulation.start()
+    assert simulation.getSnapshot()[0] == [0]
+    
+    deadline = time.perf_counter() + 5.0
+    while simulation.getSnapshot()[0][0] < 10 and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    simulation.stop()
+    
+    snapshot, timestamp = simulation.getSnapshot()
+    assert 10 <= snapshot[0] <= delegate.steps
+    assert timestamp <= time.perf_counter()
+
+def test_simulation_thread_raises_update_errors():
+    simulation = SimulationThread(CountingDelegate(failAt=3), timeStep=1)
+    simulation.start()
+    simulation.thread.join(5.0)
+    
+    with pytest.raises(ValueError):
+        simulation.stop()
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from benchmarks.streaming import writeSyntheticOBJ
+
+MB = 2 ** 20
+
+# run in a fresh interpreter, since peak RSS never goes down within a process
+MEASURE = '''
+import sys
+from benchmarks.streaming import peakRSS
+from etgg2801 import OBJReader
+
+baseline = peakRSS()
+for part in OBJReader.iterParts(sys.argv[1]):
+    pass
+print(peakRSS() - baseline)
+'''
+
+def streamingGrowth(tmp_path, size, partSize):
+    """Returns the peak RSS growth in bytes of streaming a synthetic .obj
+    file of size bytes made of parts of partSize bytes.
+    """
+    file = str(tmp_path / ('%d-%d.obj' % (size, partSize)))
+    writeSyntheticOBJ(file, size, partSize)
+    try:
+        result = subprocess.run(
+            [sys.executable, '-c', MEASURE, file],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdout=subprocess.PIPE, check=True)
+    finally:
+        os.remove(file)
+    
+    return int(result.stdout.split()[-1])
+
+@pytest.mark.slow
+@pytest.mark.skipif(sys.platform == 'win32', reason='needs the resource module')
+def test_peak_memory_follows_part_size(tmp_path):
+    small = streamingGrowth(tmp_path, 16 * MB, 1 * MB)
+    large = streamingGrowth(tmp_path, 64 * MB, 1 * MB)
+    largeParts = streamingGrowth(tmp_path, 64 * MB, 4 * MB)
+    
+    # four times the file with the same parts stays well below its size and
+    # within the same bound...
+    assert large < 32 * MB
+    assert large < small + 8 * MB
+    
+    # ...while larger parts need more memory
+    assert largeParts > large + 4 * MB
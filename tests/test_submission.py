@@ -0,0 +1,23 @@
+import json
+import os
+
+import pytest
+
+from benchmarks.suite import BASELINE, SUBMISSION_COUNTS, recordSubmission
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+with open(BASELINE) as fp:
+    STORED = json.load(fp)
+
+@pytest.fixture(scope='module')
+def submission():
+    return recordSubmission(os.path.join(ROOT, STORED['file']))
+
+@pytest.mark.parametrize('name', sorted(STORED['submission']))
+def test_submission_within_baseline(submission, name):
+    """The GL submission per frame is deterministic, so unlike timings it
+    can be checked on any machine.
+    """
+    for key in SUBMISSION_COUNTS:
+        assert submission[name][key] <= STORED['submission'][name][key], key
@@ -0,0 +1,47 @@
+import numpy
+import pytest
+
+from etgg2801 import GLState, RecordingGL, TextureManager
+
+@pytest.fixture
+def manager():
+    recorder = RecordingGL(gl=None, trace=False)
+    recorder.install()
+    GLState.reset()
+    manager = TextureManager(workers=2)
+    yield manager
+    manager.cleanup()
+    recorder.uninstall()
+    GLState.reset()
+
+def test_failed_decode_keeps_placeholder(manager, tmp_path, capsys):
+    corrupt = tmp_path / 'corrupt.png'
+    corrupt.write_bytes(b'not an image')
+    
+    textures = [manager.load(str(tmp_path / 'missing.png')), manager.load(str(corrupt))]
+    manager.finish()
+    
+    assert manager.isIdle()
+    output = capsys.readouterr().out
+    for texture in textures:
+        assert not texture.ready
+        assert texture.textureObject == manager.placeholder
+        assert texture.error is not None
+        assert texture.file in output
+    
+    # the failed entries are dropped, so later frames do not raise again
+    manager.update()
+
+def test_failure_does_not_block_other_textures(manager, tmp_path, monkeypatch):
+    def decodeImage(file):
+        if file.endswith('missing.png'):
+            raise Exception("No such file")
+        return 2, 2, True, numpy.zeros((2, 8), dtype=numpy.uint8)
+    monkeypatch.setattr(TextureManager, 'decodeImage', staticmethod(decodeImage))
+    
+    missing = manager.load('missing.png')
+    good = manager.load('good.png')
+    manager.finish()
+    
+    assert missing.error is not None and not missing.ready
+    assert good.ready and good.textureObject != manager.placeholder
@@ -3,6 +3,7 @@ import sdl2
 from sdl2 import sdlimage
 from math import *
 import random
+import numpy
 from OpenGL import GL
 from etgg2801 import *
 
@@ -50,9 +51,9 @@ class MyDelegate(GLWindowRenderDelegate):
         self.lightPosition = Vector4((0, 0.5, 5, 1.0))
         
         # location of model matrix in shader program
-        self.modelview_loc = GL.glGetUniformLocation(self.shaderProgram, b"modelview");
-        self.projection_loc = GL.glGetUniformLocation(self.shaderProgram, b"projection");
-        self.sampler_loc = GL.glGetUniformLocation(self.shaderProgram, b"sampler")
+        self.modelview_loc = self.shader.getUniformLocation("modelview")
+        self.projection_loc = self.shader.getUniformLocation("projection")
+        self.sampler_loc = self.shader.getUniformLocation("sampler")
         
         # set background color to black
         GL.glClearColor(0.0, 1.0, 0.0, 1.0)
@@ -73,38 +74,15 @@ class MyDelegate(GLWindowRenderDelegate):
         self.scene = Scene()
     
     def initShaders(self):
-        
-        # build vertex shader object
-        self.vertexShader = GL.glCreateShader(GL.GL_VERTEX_SHADER)
-        GL.glShaderSource(self.vertexShader, phong_vsrc)
-        GL.glCompileShader(self.vertexShader)
-        result = GL.glGetShaderiv(self.vertexShader, GL.GL_COMPILE_STATUS)
-        if result != 1:
-            print(GL.glGetShaderInfoLog(self.vertexShader))
-            raise Exception("Error compiling vertex shader")
-        
-        # build fragment shader object
-        self.fragmentShader = GL.glCreateShader(GL.GL_FRAGMENT_SHADER)
-        GL.glShaderSource(self.fragmentShader, phong_fsrc)
-        GL.glCompileShader(self.fragmentShader)
-        result = GL.glGetShaderiv(self.fragmentShader, GL.GL_COMPILE_STATUS)
-        if result != 1:
-            print(GL.glGetShaderInfoLog(self.fragmentShader))
-            raise Exception("Error compiling fragment shader")
-        
-        # build shader program and attach shader objects
-        self.shaderProgram = GL.glCreateProgram()
-        GL.glAttachShader(self.shaderProgram, self.vertexShader)
-        GL.glAttachShader(self.shaderProgram, self.fragmentShader)
-        GL.glLinkProgram(self.shaderProgram)
+        self.shader = ShaderProgram(phong_vsrc, phong_fsrc, cache=True)
     
     def initUV(self):
         self.vertexArrayObject = GL.glGenVertexArrays(1)
-        GL.glBindVertexArray(self.vertexArrayObject)
+        GLState.bindVertexArray(self.vertexArrayObject)
         
         # postition vertex buffer object
         self.positionBuffer = GL.glGenBuffers(1)
-        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.positionBuffer)
+        GLState.bindBuffer(GL.GL_ARRAY_BUFFER, self.positionBuffer)
         
         verts = ctypes.c_float * (3 * 3)
         verts = verts(-0.5, -0.5, -1, 0.5, -0.5, -1, 0.5, 0.5, -1)
@@ -113,7 +91,7 @@ class MyDelegate(GLWindowRenderDelegate):
         GL.glVertexAttribPointer(0, 3, GL.GL_FLOAT, False, 0, None)
         
         self.uvBuffer = GL.glGenBuffers(1)
-        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self.uvBuffer)
+        GLState.bindBuffer(GL.GL_ARRAY_BUFFER, self.uvBuffer)
         
         uv = ctypes.c_float * (2 * 3)
         uv = uv(0.0, 0.0, 1.0, 0.0, 1.0, 1.0)
@@ -124,50 +102,49 @@ class MyDelegate(GLWindowRenderDelegate):
         GL.glEnableVertexAttribArray(0)
         GL.glEnableVertexAttribArray(1)
         
-        GL.glBindVertexArray(0)
+        GLState.bindVertexArray(0)
     
     def initTexture(self):
-        GL.glActiveTexture(GL.GL_TEXTURE0)
         self.textureObject = GL.glGenTextures(1)
         
         rockmanImage = sdlimage.IMG_Load(b'rockman.png')
         pixels = ctypes.cast(rockmanImage.contents.pixels, ctypes.c_void_p)
         
-        GL.glBindTexture(GL.GL_TEXTURE_2D, self.textureObject)
+        GLState.bindTexture(GL.GL_TEXTURE_2D, self.textureObject)
         GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA, 128, 128, 0, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, pixels)
         GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_NEAREST)
         GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_NEAREST)
     
     def cleanup(self):
         self.scene.cleanup()
-        GL.glDeleteTextures(1, self.textureObject)
-        GL.glDeleteShader(self.vertexShader)
-        GL.glDeleteShader(self.fragmentShader)
-        GL.glDeleteProgram(self.shaderProgram)
+        GLState.deleteTexture(self.textureObject)
+        self.shader.cleanup()
     
     def update(self, dtime):
         self.scene.update(dtime)
     
+    def createSnapshot(self):
+        return self.scene.createSnapshot()
+    
+    def writeSnapshot(self, snapshot):
+        self.scene.writeSnapshot(snapshot)
+    
     def render(self):
         GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
         
-        GL.glUseProgram(self.shaderProgram)
+        self.shader.use()
         
         projMatrix = Matrix4.getOrthographic(near=1.0,far=10.0)
         projMatrix.set(0, 0, projMatrix.get(0, 0) * (self.window.size[1] / self.window.size[0]))
-        GL.glUniformMatrix4fv(self.projection_loc, 1, False, projMatrix.getCType())
+        GLState.uniformMatrix4fv(self.projection_loc, 1, False, projMatrix.getCType())
         
-        GL.glUniform1i(self.sampler_loc, 0)
+        GLState.uniform1i(self.sampler_loc, 0)
         
-        GL.glBindVertexArray(self.vertexArrayObject)
+        GLState.bindVertexArray(self.vertexArrayObject)
         
         GL.glDrawArrays(GL.GL_TRIANGLES, 0, 3)
         
-        self.scene.render()
-        
-        GL.glBindVertexArray(0)
-        
-        GL.glUseProgram(0)
+        self.scene.render(self.window.snapshot)
 
 class Scene(object):
     def __init__(self):
@@ -187,9 +164,18 @@ class Scene(object):
         for o in self.objects:
             o.update(dtime)
     
-    def render(self):
-        for o in self.objects:
-            o.render()
+    def createSnapshot(self):
+        return [numpy.zeros(o.getStateSize()) for o in self.objects]
+    
+    def writeSnapshot(self, snapshot):
+        for o, state in zip(self.objects, snapshot):
+            o.writeState(state)
+    
+    def render(self, snapshot=None):
+        """Renders the objects, or their states recorded in snapshot.
+        """
+        for i, o in enumerate(self.objects):
+            o.render(None if snapshot is None else snapshot[i])
 
 window = GLWindow((800, 600))
 